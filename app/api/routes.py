@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timezone
 import time
 from pathlib import Path
-from typing import List
+from typing import List, Optional
+from zipfile import BadZipFile
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from docx.opc.exceptions import PackageNotFoundError
+from fastapi import APIRouter, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 
 from app.domain.plan_categories import PLAN_CATEGORY_LIST, get_plan_category
 from app.models.schemas import (
@@ -15,20 +18,25 @@ from app.models.schemas import (
     APIKeySummary,
     APIKeyUpdateRequest,
     APIKeyUpdateResponse,
+    BatchItem,
+    BatchItemsResponse,
+    BatchJobStatus,
     BatchResultsResponse,
     BatchRunRequest,
     BatchStatusResponse,
+    CacheStatsResponse,
     ConvertPlanResponse,
     GeminiConfig,
     GeminiConfigResponse,
     GeminiConfigUpdateRequest,
-    FloorPlanOptions,
+    GeminiCallStats,
+    GeminiCallStatsResponse,
     GeneratePlanRequest,
     GeneratePlanJobResponse,
     GeneratePlanStatusResponse,
+    PlanJobStatus,
     PlanCategoryDetectRequest,
     PlanCategoryDetectionResponse,
-    Room,
     SystemPromptResponse,
     SystemPromptUpdateRequest,
     StoredPlanDetailResponse,
@@ -37,22 +45,36 @@ from app.models.schemas import (
     TemplateMetadata,
     UploadResponse,
 )
-from app.services.batch_runner import BatchRunner
-from app.services import config_store, plan_store
+from app.services.batch_runner import BatchResumeError, BatchRunner
+from app.services import batch_items, call_ledger, config_store, plan_store
 from app.services.gemini_client import GeminiClient, GeminiServiceError
+from app.services.job_events import JobEventLog, sse_stream
+from app.services.job_queue import BATCH_JOB_WORKERS, JobQueue, WorkerPool
+from app.services.plan_documents import docx_to_text, read_text_file
 from app.services.plan_job_runner import PlanJobRunner
-from app.services.storage import get_file_path, save_upload_file
+from app.services.storage import delete_files, get_file_path, save_upload_file
 
 PROMPT_FILE = Path("prompt.txt")
 DEFAULT_PROMPT_TEXT = (
     PROMPT_FILE.read_text(encoding="utf-8") if PROMPT_FILE.exists() else ""
 )
 
+# /convert-plan inputs sent to Gemini as documents rather than as text.
+DOCUMENT_SUFFIXES = {".pdf", ".png", ".jpg", ".jpeg", ".webp"}
+
 router = APIRouter(prefix="/api")
 
 gemini_client = GeminiClient()
-batch_runner = BatchRunner()
-plan_job_runner = PlanJobRunner(gemini_client)
+job_queue = JobQueue()
+job_events = JobEventLog()
+batch_runner = BatchRunner(gemini_client, job_queue, events=job_events)
+plan_job_runner = PlanJobRunner(gemini_client, job_queue, events=job_events)
+worker_pool = WorkerPool(
+    job_queue,
+    {"plan": plan_job_runner.run_queued, "batch": batch_runner.run_queued},
+    abandon_handlers={"plan": plan_job_runner.abandon, "batch": batch_runner.abandon},
+    kind_limits={"batch": BATCH_JOB_WORKERS},
+)
 
 
 @router.get("/")
@@ -107,11 +129,6 @@ async def detect_plan_category_route(
     )
 
 
-async def _process_single_file(file_id: str, options: FloorPlanOptions) -> List[Room]:
-    file_path = get_file_path(file_id)
-    return await gemini_client.analyze_floorplan(file_path, options)
-
-
 def _handle_gemini_error(exc: GeminiServiceError) -> None:
     status_code = exc.status_code if exc.status_code and exc.status_code >= 400 else 502
     detail = {
@@ -135,10 +152,41 @@ async def generate_plan(request: GeneratePlanRequest) -> GeneratePlanJobResponse
         request.options,
         request.template_id,
         request.model_dump(),
+        stream=request.stream,
     )
     return GeneratePlanJobResponse(job=job)
 
 
+def _job_event_response(
+    job_id: str, finished: bool, last_event_id: Optional[str], after: Optional[int]
+) -> StreamingResponse:
+    # EventSource sends Last-Event-ID on reconnect; ?after= is for clients
+    # that open a fresh stream.
+    try:
+        position = int(last_event_id) if last_event_id else after or 0
+    except ValueError:
+        position = after or 0
+    return StreamingResponse(
+        sse_stream(job_events, job_id, position, finished=finished),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/generate-plan/stream/{job_id}")
+async def stream_generate_plan(
+    job_id: str,
+    last_event_id: Optional[str] = Header(None),
+    after: Optional[int] = Query(None, ge=0),
+) -> StreamingResponse:
+    try:
+        job = plan_job_runner.get_status(job_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Job not found") from exc
+    finished = job.status in (PlanJobStatus.success, PlanJobStatus.failed)
+    return _job_event_response(job_id, finished, last_event_id, after)
+
+
 @router.get(
     "/generate-plan/status/{job_id}", response_model=GeneratePlanStatusResponse
 )
@@ -160,13 +208,25 @@ async def download_file(file_id: str) -> FileResponse:
 @router.post("/convert-plan", response_model=ConvertPlanResponse)
 async def convert_plan(file: UploadFile = File(...)) -> ConvertPlanResponse:
     started = time.perf_counter()
-    raw_bytes = await file.read()
-    try:
-        text = raw_bytes.decode("utf-8")
-    except UnicodeDecodeError:
-        text = raw_bytes.decode("latin-1", errors="ignore")
+    # Spooled to disk in chunks; DOCX/PDF are read from there, never decoded
+    # as text.
+    file_id = save_upload_file(file, category="external")
+    file_path = get_file_path(file_id)
+    suffix = file_path.suffix.lower()
     try:
-        plan = await gemini_client.convert_to_cleansync(text)
+        if suffix in DOCUMENT_SUFFIXES:
+            plan = await gemini_client.convert_document(file_path)
+        else:
+            if suffix == ".docx":
+                try:
+                    text = await asyncio.to_thread(docx_to_text, file_path)
+                except (PackageNotFoundError, BadZipFile, KeyError) as exc:
+                    raise HTTPException(
+                        status_code=400, detail="Kunne ikke lese DOCX-filen"
+                    ) from exc
+            else:
+                text = await asyncio.to_thread(read_text_file, file_path)
+            plan = await gemini_client.convert_to_cleansync(text)
         plan_store.save_plan(
             source="converter",
             request_payload={"filename": file.filename},
@@ -177,6 +237,8 @@ async def convert_plan(file: UploadFile = File(...)) -> ConvertPlanResponse:
         return ConvertPlanResponse(plan=plan)
     except GeminiServiceError as exc:
         _handle_gemini_error(exc)
+    finally:
+        delete_files([file_id])
 
 
 @router.post("/batch/run", response_model=BatchStatusResponse)
@@ -184,30 +246,39 @@ async def run_batch(request: BatchRunRequest) -> BatchStatusResponse:
     if not request.file_ids:
         raise HTTPException(status_code=400, detail="file_ids is required")
 
-    async def processor(file_id: str, options):
-        rooms = await _process_single_file(file_id, options)
-        return await gemini_client.generate_plan(
-            rooms, plan_category_id=options.plan_category
-        )
-
-    async def batch_processor(file_ids: List[str], options: FloorPlanOptions):
-        room_batches = []
-        for file_id in file_ids:
-            room_batches.append(await _process_single_file(file_id, options))
-        return await gemini_client.generate_plan_batch(
-            room_batches, plan_category_id=options.plan_category
-        )
-
     job = await batch_runner.start_job(
         request.file_ids,
         request.options,
-        processor,
         use_batch_api=request.use_batch_api,
-        batch_processor=batch_processor if request.use_batch_api else None,
     )
     return BatchStatusResponse(job=job)
 
 
+@router.post("/batch/{job_id}/resume", response_model=BatchStatusResponse)
+async def resume_batch(job_id: str) -> BatchStatusResponse:
+    try:
+        job = batch_runner.resume_job(job_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Job not found") from exc
+    except BatchResumeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return BatchStatusResponse(job=job)
+
+
+@router.get("/batch/stream/{job_id}")
+async def stream_batch(
+    job_id: str,
+    last_event_id: Optional[str] = Header(None),
+    after: Optional[int] = Query(None, ge=0),
+) -> StreamingResponse:
+    try:
+        job = batch_runner.get_status(job_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Job not found") from exc
+    finished = job.status in (BatchJobStatus.success, BatchJobStatus.failed)
+    return _job_event_response(job_id, finished, last_event_id, after)
+
+
 @router.get("/batch/status/{job_id}", response_model=BatchStatusResponse)
 async def get_batch_status(job_id: str) -> BatchStatusResponse:
     try:
@@ -227,6 +298,16 @@ async def get_batch_results(job_id: str) -> BatchResultsResponse:
     return BatchResultsResponse(job=job, plans=plans)
 
 
+@router.get("/batch/items/{job_id}", response_model=BatchItemsResponse)
+async def get_batch_items(job_id: str) -> BatchItemsResponse:
+    try:
+        job = batch_runner.get_status(job_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Job not found") from exc
+    items = [BatchItem(**item) for item in batch_items.list_items(job_id)]
+    return BatchItemsResponse(job=job, items=items)
+
+
 def _serialize_api_key(name: str, payload: dict) -> APIKeySummary:
     value = payload.get("value") or ""
     last_four = value[-4:] if len(value) >= 4 else (value if value else None)
@@ -279,11 +360,13 @@ async def get_system_prompt() -> SystemPromptResponse:
 async def update_system_prompt(request: SystemPromptUpdateRequest) -> SystemPromptResponse:
     if request.use_default:
         config_store.reset_system_prompt()
+        gemini_client.invalidate_context_caches()
         record = config_store.get_system_prompt(DEFAULT_PROMPT_TEXT)
         return _prompt_response(record)
     if request.prompt is None:
         raise HTTPException(status_code=400, detail="prompt is required")
     record = config_store.set_system_prompt(request.prompt)
+    gemini_client.invalidate_context_caches()
     return _prompt_response(record)
 
 
@@ -307,6 +390,45 @@ async def update_gemini_config_route(request: GeminiConfigUpdateRequest) -> Gemi
     return GeminiConfigResponse(config=GeminiConfig(**updated))
 
 
+@router.get("/admin/extraction-cache", response_model=CacheStatsResponse)
+async def get_extraction_cache_stats() -> CacheStatsResponse:
+    return CacheStatsResponse(**gemini_client.extraction_cache.stats())
+
+
+@router.delete("/admin/extraction-cache", response_model=CacheStatsResponse)
+async def purge_extraction_cache() -> CacheStatsResponse:
+    gemini_client.extraction_cache.purge()
+    return CacheStatsResponse(**gemini_client.extraction_cache.stats())
+
+
+@router.get("/admin/plan-cache", response_model=CacheStatsResponse)
+async def get_plan_cache_stats() -> CacheStatsResponse:
+    return CacheStatsResponse(**gemini_client.plan_cache.stats())
+
+
+@router.delete("/admin/plan-cache", response_model=CacheStatsResponse)
+async def purge_plan_cache() -> CacheStatsResponse:
+    gemini_client.plan_cache.purge()
+    return CacheStatsResponse(**gemini_client.plan_cache.stats())
+
+
+def _call_stats(days: int, by_day: bool) -> GeminiCallStatsResponse:
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days must be at least 1")
+    stats = [GeminiCallStats(**row) for row in call_ledger.summarize(days, by_day=by_day)]
+    return GeminiCallStatsResponse(days=days, stats=stats)
+
+
+@router.get("/admin/gemini-calls/by-stage", response_model=GeminiCallStatsResponse)
+async def get_gemini_call_stats_by_stage(days: int = 30) -> GeminiCallStatsResponse:
+    return _call_stats(days, by_day=False)
+
+
+@router.get("/admin/gemini-calls/by-day", response_model=GeminiCallStatsResponse)
+async def get_gemini_call_stats_by_day(days: int = 30) -> GeminiCallStatsResponse:
+    return _call_stats(days, by_day=True)
+
+
 def _parse_datetime(value: str) -> datetime:
     if not value:
         return datetime.now(timezone.utc)
@@ -19,6 +19,9 @@ def get_connection() -> sqlite3.Connection:
 
 def init_db() -> None:
     with get_connection() as conn:
+        # Persistent setting: lets API workers read job state while another
+        # process writes.
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.executescript(
             """
             CREATE TABLE IF NOT EXISTS api_keys (
@@ -43,6 +46,106 @@ def init_db() -> None:
                 created_at TEXT,
                 generation_ms INTEGER
             );
+            CREATE TABLE IF NOT EXISTS result_cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE TABLE IF NOT EXISTS gemini_files (
+                sha256 TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                name TEXT NOT NULL,
+                uri TEXT NOT NULL,
+                mime_type TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (sha256, scope)
+            );
+            CREATE TABLE IF NOT EXISTS result_cache_stats (
+                namespace TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS gemini_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                day TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                model TEXT NOT NULL,
+                job_id TEXT,
+                prompt_tokens INTEGER,
+                candidates_tokens INTEGER,
+                cached_tokens INTEGER,
+                total_tokens INTEGER,
+                input_bytes INTEGER,
+                latency_ms INTEGER NOT NULL,
+                retries INTEGER NOT NULL DEFAULT 0,
+                outcome TEXT NOT NULL,
+                status_code INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_gemini_calls_day ON gemini_calls (day, stage);
+            CREATE TABLE IF NOT EXISTS gemini_batches (
+                name TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                file_ids TEXT NOT NULL,
+                context TEXT,
+                state TEXT,
+                error TEXT,
+                finished INTEGER NOT NULL DEFAULT 0,
+                claimed_by TEXT,
+                claimed_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS config_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO config_version (id, version) VALUES (1, 0);
+            CREATE TABLE IF NOT EXISTS job_queue (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_queue_status ON job_queue (status, created_at);
+            CREATE TABLE IF NOT EXISTS job_state (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS batch_items (
+                job_id TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                started_at REAL,
+                finished_at REAL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, file_id)
+            );
             """
         )
         # Backfill generation_ms column if database existed before
@@ -52,4 +155,13 @@ def init_db() -> None:
             )
         except sqlite3.OperationalError:
             pass
+        # Job and file provenance, so evicted jobs can be answered from here
+        for column in ("job_id", "file_id"):
+            try:
+                conn.execute(f"ALTER TABLE generated_plans ADD COLUMN {column} TEXT")
+            except sqlite3.OperationalError:
+                pass
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_generated_plans_job ON generated_plans (job_id)"
+        )
         conn.commit()
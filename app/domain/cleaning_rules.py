@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from app.models.schemas import ALL_DAYS, CleaningPlanEntry, Room
+
+# Daily cleaning on weekdays, the prompt's default.
+WEEKDAY_FREQUENCY: Dict[str, bool] = {day: day in ALL_DAYS[:5] for day in ALL_DAYS}
+
+_WORDS = re.compile(r"[^\W\d_]+")
+# The prompt's description blocks: 'For kjøkken:' followed by the quoted text.
+_DESCRIPTION_BLOCK = re.compile(r"^For ([^:\n]+):\s*\n\s*[“\"](.+?)[”\"]\s*$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class RoomRule:
+    group: str
+    keywords: Tuple[str, ...]
+    description: str = ""
+    # Plan categories the rule is never used for.
+    excluded_categories: FrozenSet[str] = frozenset()
+
+    def applies_to(self, plan_category: Optional[str]) -> bool:
+        return plan_category not in self.excluded_categories
+
+    def matches(self, words: List[str]) -> bool:
+        # Norwegian compounds ("tekjøkken", "lagerrom") carry the room word at
+        # either end.
+        return any(
+            word.startswith(keyword) or word.endswith(keyword)
+            for word in words
+            for keyword in self.keywords
+        )
+
+
+# Checked in order; the first matching rule wins. The descriptions come from
+# the active system prompt, see ``rules_from_prompt``.
+RULES: Tuple[RoomRule, ...] = (
+    RoomRule("wc", ("wc", "toalett", "bathroom", "restroom", "toilet")),
+    # A restaurant kitchen is a production kitchen, not a staff pantry.
+    RoomRule(
+        "kitchen",
+        ("kjøkken", "kitchen", "pantry"),
+        excluded_categories=frozenset({"bar_restaurant"}),
+    ),
+    RoomRule("wardrobe", ("garderobe", "wardrobe", "cloakroom")),
+    RoomRule(
+        "standard",
+        (
+            "lekerom",
+            "grupperom",
+            "playroom",
+            "forrom",
+            "kontor",
+            "office",
+            "lager",
+            "storage",
+            "gang",
+            "corridor",
+            "hallway",
+        ),
+    ),
+)
+
+
+def _words(value: Optional[str]) -> List[str]:
+    return _WORDS.findall((value or "").casefold())
+
+
+def _clean_description(text: str) -> str:
+    return re.sub(r"\.{2,}$", ".", " ".join(text.split()))
+
+
+@lru_cache(maxsize=8)
+def rules_from_prompt(prompt_text: str) -> Tuple[RoomRule, ...]:
+    """``RULES`` with the descriptions the prompt gives for their room types.
+
+    A rule whose room types the prompt has no description for is left out,
+    so those rooms go to the model with the rest of the prompt.
+    """
+    blocks = [
+        (_words(label), _clean_description(text))
+        for label, text in _DESCRIPTION_BLOCK.findall(prompt_text)
+    ]
+    rules: List[RoomRule] = []
+    for rule in RULES:
+        description = next((text for words, text in blocks if rule.matches(words)), None)
+        if description:
+            rules.append(replace(rule, description=description))
+    return tuple(rules)
+
+
+def classify_room(
+    room: Room, rules: Tuple[RoomRule, ...], plan_category: Optional[str] = None
+) -> Optional[RoomRule]:
+    """The standard rule for a room, by its type first and then its name."""
+    applicable = [rule for rule in rules if rule.applies_to(plan_category)]
+    for words in (_words(room.type), _words(room.name)):
+        for rule in applicable:
+            if rule.matches(words):
+                return rule
+    return None
+
+
+def _floor_label(floor: Optional[str]) -> Optional[str]:
+    if floor and floor.strip().isdigit():
+        return f"{floor.strip()} ETG"
+    return floor
+
+
+def build_entry(room: Room, rule: RoomRule) -> CleaningPlanEntry:
+    return CleaningPlanEntry(
+        room_name=room.name,
+        area_m2=room.area_m2,
+        floor=_floor_label(room.floor),
+        description=rule.description,
+        frequency=dict(WEEKDAY_FREQUENCY),
+    )
+
+
+def plan_standard_rooms(
+    rooms: List[Room], prompt_text: str, plan_category: Optional[str] = None
+) -> Tuple[List[CleaningPlanEntry], List[Room]]:
+    """Entries for every room a rule covers, and the rooms left for the model."""
+    rules = rules_from_prompt(prompt_text)
+    entries: List[CleaningPlanEntry] = []
+    unclassified: List[Room] = []
+    for room in rooms:
+        rule = classify_room(room, rules, plan_category)
+        if rule is None:
+            unclassified.append(room)
+        else:
+            entries.append(build_entry(room, rule))
+    return entries, unclassified
+
+
+def order_entries(
+    entries: List[CleaningPlanEntry], rooms: List[Room]
+) -> List[CleaningPlanEntry]:
+    """Group entries by floor, in the order floors first appear among ``rooms``."""
+    rank: Dict[Optional[str], int] = {}
+    for room in rooms:
+        rank.setdefault(_floor_label(room.floor), len(rank))
+    return sorted(entries, key=lambda entry: rank.get(entry.floor, len(rank)))
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional
+
+from app.models.schemas import CleaningPlan, Room
+
+# Rooms per generation call; buildings above this are generated in chunks.
+DEFAULT_PLAN_CHUNK_SIZE = int(os.getenv("PLAN_CHUNK_SIZE", "40"))
+
+
+def chunk_rooms(rooms: List[Room], max_rooms: int) -> List[List[Room]]:
+    """Partition rooms into chunks of at most ``max_rooms``, floor by floor.
+
+    Rooms of one floor stay together where they fit; small floors are packed
+    into a shared chunk and large floors are split. Room order is preserved
+    within each floor, and floors keep the order they first appear in.
+    """
+    max_rooms = max(1, max_rooms)
+    floors: Dict[Optional[str], List[Room]] = {}
+    for room in rooms:
+        floors.setdefault(room.floor, []).append(room)
+
+    chunks: List[List[Room]] = []
+    current: List[Room] = []
+    for floor_rooms in floors.values():
+        if current and len(current) + len(floor_rooms) > max_rooms:
+            chunks.append(current)
+            current = []
+        for start in range(0, len(floor_rooms), max_rooms):
+            piece = floor_rooms[start : start + max_rooms]
+            if len(piece) == max_rooms:
+                chunks.append(piece)
+            else:
+                current.extend(piece)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def merge_plans(plans: List[CleaningPlan]) -> CleaningPlan:
+    """Concatenate chunk plans in order, recomputing the total area locally."""
+    entries = [entry for plan in plans for entry in plan.entries]
+    template_name = next((plan.template_name for plan in plans if plan.template_name), None)
+    return CleaningPlan(
+        entries=entries,
+        total_area_m2=round(sum(entry.area_m2 or 0 for entry in entries), 2),
+        template_name=template_name,
+    )
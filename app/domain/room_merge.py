@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.schemas import Room
+
+# Relative difference under which two areas are taken to describe the same room.
+AREA_TOLERANCE = 0.05
+# Share of the smaller box two tile boxes must overlap to be one room.
+TILE_MIN_OVERLAP = 0.25
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: Optional[str]) -> str:
+    return _WHITESPACE.sub(" ", (value or "").strip()).casefold()
+
+
+def _identity(room: Room) -> Optional[Tuple[str, str]]:
+    name = _normalize(room.name)
+    if not name:
+        return None
+    return name, _normalize(room.floor)
+
+
+def _same_area(first: float, second: float) -> bool:
+    largest = max(abs(first), abs(second))
+    if largest == 0:
+        return True
+    return abs(first - second) / largest <= AREA_TOLERANCE
+
+
+def _fill_missing(kept: Room, duplicate: Room) -> Room:
+    updates = {
+        field: getattr(duplicate, field)
+        for field in ("type", "floor", "area_m2", "notes")
+        if getattr(kept, field) in (None, "") and getattr(duplicate, field) not in (None, "")
+    }
+    return kept.model_copy(update=updates) if updates else kept
+
+
+def _compatible_area(kept: Room, candidate: Room) -> bool:
+    """Same room only on a positive signal, never because data is missing.
+
+    The rooms must share a known floor or carry the same id; a drawing set
+    with one unlabelled page per floor repeats its WC and Kontor names on
+    every page. Two known areas must also agree.
+    """
+    if (
+        kept.area_m2 is not None
+        and candidate.area_m2 is not None
+        and not _same_area(kept.area_m2, candidate.area_m2)
+    ):
+        return False
+    floor = _normalize(kept.floor)
+    if floor and floor == _normalize(candidate.floor):
+        return True
+    return bool(kept.id) and kept.id == candidate.id
+
+
+def merge_rooms(
+    room_lists: Iterable[List[Room]],
+    *,
+    same_room: Callable[[Room, Room], bool] = _compatible_area,
+    combine: Callable[[Room, Room], Room] = _fill_missing,
+    score: Optional[Callable[[Room, Room], float]] = None,
+) -> List[Room]:
+    """Concatenate per-source room lists, dropping rooms repeated across sources.
+
+    Sources are pages or tiles of the same drawing set that may overlap. A
+    room is a duplicate when an earlier source already has a room with the
+    same name and floor for which ``same_room`` holds (by default: the
+    same known floor or the same id, and no conflicting areas); the first
+    occurrence is kept and ``combine``d with the duplicate, which fills its
+    missing fields. With several candidates, the one ``score`` rates highest
+    wins (the earliest by default). Rooms sharing a name within one source (e.g. several "WC") are never merged with each other. Colliding
+    ids from different sources are suffixed with the source number.
+    """
+    merged: List[Room] = []
+    origins: List[int] = []
+    by_identity: Dict[Tuple[str, str], List[int]] = {}
+    used_ids: Set[str] = set()
+    for source, rooms in enumerate(room_lists, start=1):
+        claimed: Set[int] = set()
+        for room in rooms:
+            identity = _identity(room)
+            match = None
+            best = float("-inf")
+            if identity is not None:
+                for position in by_identity.get(identity, []):
+                    if (
+                        origins[position] == source
+                        or position in claimed
+                        or not same_room(merged[position], room)
+                    ):
+                        continue
+                    if score is None:
+                        match = position
+                        break
+                    rating = score(merged[position], room)
+                    if rating > best:
+                        match, best = position, rating
+            if match is not None:
+                claimed.add(match)
+                merged[match] = combine(merged[match], room)
+                continue
+            if room.id in used_ids:
+                room = room.model_copy(update={"id": f"{room.id}-{source}"})
+            used_ids.add(room.id)
+            if identity is not None:
+                by_identity.setdefault(identity, []).append(len(merged))
+            merged.append(room)
+            origins.append(source)
+    return merged
+
+
+def _box_overlap(first: List[float], second: List[float]) -> float:
+    """Intersection area as a share of the smaller box (0 when disjoint)."""
+    width = min(first[2], second[2]) - max(first[0], second[0])
+    height = min(first[3], second[3]) - max(first[1], second[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    smaller = min(
+        (first[2] - first[0]) * (first[3] - first[1]),
+        (second[2] - second[0]) * (second[3] - second[1]),
+    )
+    return width * height / smaller if smaller > 0 else 0.0
+
+
+def merge_tile_rooms(
+    room_lists: Iterable[List[Room]], *, min_overlap: float = TILE_MIN_OVERLAP
+) -> List[Room]:
+    """``merge_rooms`` for tiles of one raster, matching duplicates by position.
+
+    Rooms carry a ``bbox`` in whole-image pixels. Same-named rooms from
+    different tiles are one room when their boxes overlap by at least
+    ``min_overlap`` of the smaller box, which happens inside the band two
+    tiles share (a room cut by a tile edge shows up in both). Boxes that
+    merely touch, as neighbours sharing a wall do, never match, rooms with
+    different ids never match, and of several candidates the one overlapping
+    most wins. Boxes are unioned as rooms merge. Rooms without a box fall
+    back to the default rule.
+    """
+
+    def same_room(kept: Room, candidate: Room) -> bool:
+        if kept.id and candidate.id and kept.id != candidate.id:
+            return False
+        kept_box = getattr(kept, "bbox", None)
+        candidate_box = getattr(candidate, "bbox", None)
+        if kept_box and candidate_box:
+            return _box_overlap(kept_box, candidate_box) >= min_overlap
+        return _compatible_area(kept, candidate)
+
+    def overlap(kept: Room, candidate: Room) -> float:
+        kept_box = getattr(kept, "bbox", None)
+        candidate_box = getattr(candidate, "bbox", None)
+        return _box_overlap(kept_box, candidate_box) if kept_box and candidate_box else 0.0
+
+    def combine(kept: Room, duplicate: Room) -> Room:
+        merged = _fill_missing(kept, duplicate)
+        kept_box = getattr(kept, "bbox", None)
+        duplicate_box = getattr(duplicate, "bbox", None)
+        if kept_box and duplicate_box:
+            union = [
+                min(kept_box[0], duplicate_box[0]),
+                min(kept_box[1], duplicate_box[1]),
+                max(kept_box[2], duplicate_box[2]),
+                max(kept_box[3], duplicate_box[3]),
+            ]
+            merged = merged.model_copy(update={"bbox": union})
+        elif duplicate_box:
+            merged = merged.model_copy(update={"bbox": duplicate_box})
+        return merged
+
+    return merge_rooms(room_lists, same_room=same_room, combine=combine, score=overlap)
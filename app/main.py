@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -5,8 +6,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from app.api.routes import router
+from app.api.routes import batch_runner, router, worker_pool
 from app.security import apply_basic_auth
+from app.services.job_retention import purge_finished_jobs_forever
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 STATIC_DIR = BASE_DIR / "static"
@@ -30,6 +32,27 @@ def create_app() -> FastAPI:
 
     app.include_router(router)
 
+    @app.on_event("startup")
+    async def resume_gemini_batches():
+        # Batches submitted before a restart/redeploy keep running remotely;
+        # adopt them so their results are still stored.
+        app.state.batch_watcher = asyncio.create_task(batch_runner.watch_pending())
+
+    @app.on_event("startup")
+    async def start_job_workers():
+        # Also picks up jobs queued or interrupted before a restart/redeploy.
+        worker_pool.start()
+
+    @app.on_event("startup")
+    async def purge_finished_jobs():
+        # Jobs finished by a process that has since restarted are never
+        # evicted by their runner; drop their rows once they are old enough.
+        app.state.job_purger = asyncio.create_task(purge_finished_jobs_forever())
+
+    @app.on_event("shutdown")
+    async def stop_job_workers():
+        await worker_pool.stop()
+
     @app.get("/health")
     async def health_check():
         return {"status": "ok"}
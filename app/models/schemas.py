@@ -5,6 +5,7 @@ from enum import Enum
 from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field, field_validator
+from pydantic.json_schema import SkipJsonSchema
 
 from app.domain.plan_categories import PLAN_CATEGORY_IDS
 
@@ -18,6 +19,9 @@ class Room(BaseModel):
     floor: Optional[str] = None
     area_m2: Optional[float] = None
     notes: Optional[str] = None
+    # Set locally when a multi-page PDF is extracted page by page; hidden from
+    # the schema sent to the model.
+    source_page: SkipJsonSchema[Optional[int]] = None
 
 
 class CleaningPlanEntry(BaseModel):
@@ -42,6 +46,17 @@ class FloorPlanExtraction(BaseModel):
     rooms: List[Room]
 
 
+class TiledRoom(Room):
+    bbox: Optional[List[float]] = Field(
+        default=None,
+        description="Room bounds [x_min, y_min, x_max, y_max] as fractions (0-1) of the image",
+    )
+
+
+class TileExtraction(BaseModel):
+    rooms: List[TiledRoom]
+
+
 class FloorPlanOptions(BaseModel):
     has_room_names: bool = True
     has_area: bool = True
@@ -72,6 +87,10 @@ class GeneratePlanRequest(BaseModel):
     file_ids: List[str]
     template_id: Optional[str] = None
     options: FloorPlanOptions
+    stream: bool = Field(
+        default=False,
+        description="Emit entries over /generate-plan/stream/{job_id} as they arrive",
+    )
 
 
 class GeneratePlanResponse(BaseModel):
@@ -99,7 +118,11 @@ class PlanJobStatus(str, Enum):
 class PlanJob(BaseModel):
     id: str
     status: PlanJobStatus = PlanJobStatus.pending
+    stage: Optional[str] = None
+    total_files: int = 0
+    processed_files: int = 0
     docx_url: Optional[str] = None
+    cache_hit: bool = False
     message: Optional[str] = None
     detail: Optional[Dict[str, Optional[Any]]] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -136,7 +159,31 @@ class BatchJob(BaseModel):
     status: BatchJobStatus = BatchJobStatus.pending
     total_files: int = 0
     processed_files: int = 0
+    failed_files: int = 0
     message: Optional[str] = None
+    # Summary: share of finished files that succeeded, and finished files
+    # per minute since the job started.
+    success_rate: Optional[float] = None
+    files_per_minute: Optional[float] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class BatchItemStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    success = "success"
+    failed = "failed"
+
+
+class BatchItem(BaseModel):
+    file_id: str
+    position: int
+    status: BatchItemStatus
+    attempts: int = 0
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class BatchRunRequest(BaseModel):
@@ -154,6 +201,11 @@ class BatchResultsResponse(BaseModel):
     plans: List[CleaningPlan]
 
 
+class BatchItemsResponse(BaseModel):
+    job: BatchJob
+    items: List[BatchItem]
+
+
 class APIKeySummary(BaseModel):
     name: str
     label: str
@@ -196,6 +248,20 @@ class GeminiConfig(BaseModel):
     temperature: Optional[float] = None
     top_p: Optional[float] = None
     media_resolution: Optional[str] = None
+    extraction_concurrency: Optional[int] = None
+    batch_concurrency: Optional[int] = None
+    max_concurrent_calls: Optional[int] = None
+    use_file_api: Optional[bool] = None
+    context_cache: Optional[bool] = None
+    requests_per_minute: Optional[float] = None
+    max_retries: Optional[int] = None
+    call_deadline_seconds: Optional[float] = None
+    preprocess_images: Optional[bool] = None
+    max_image_edge: Optional[int] = None
+    split_pdf_pages: Optional[bool] = None
+    tile_pixel_threshold: Optional[int] = None
+    plan_chunk_size: Optional[int] = None
+    local_plan_rules: Optional[bool] = None
 
 
 class GeminiConfigResponse(BaseModel):
@@ -206,6 +272,51 @@ class GeminiConfigUpdateRequest(BaseModel):
     temperature: Optional[float] = None
     top_p: Optional[float] = None
     media_resolution: Optional[str] = None
+    extraction_concurrency: Optional[int] = Field(default=None, ge=1, le=16)
+    batch_concurrency: Optional[int] = Field(default=None, ge=1, le=16)
+    max_concurrent_calls: Optional[int] = Field(default=None, ge=1, le=64)
+    use_file_api: Optional[bool] = None
+    context_cache: Optional[bool] = None
+    requests_per_minute: Optional[float] = Field(default=None, gt=0)
+    max_retries: Optional[int] = Field(default=None, ge=0, le=10)
+    call_deadline_seconds: Optional[float] = Field(default=None, gt=0)
+    preprocess_images: Optional[bool] = None
+    max_image_edge: Optional[int] = Field(default=None, ge=512, le=8192)
+    split_pdf_pages: Optional[bool] = None
+    tile_pixel_threshold: Optional[int] = Field(default=None, ge=1_000_000)
+    plan_chunk_size: Optional[int] = Field(default=None, ge=5, le=500)
+    local_plan_rules: Optional[bool] = None
+
+
+class CacheStatsResponse(BaseModel):
+    namespace: str
+    entries: int = 0
+    size_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    hit_rate: Optional[float] = None
+
+
+class GeminiCallStats(BaseModel):
+    stage: str
+    day: Optional[str] = None
+    calls: int = 0
+    failures: int = 0
+    retries: int = 0
+    latency_p50_ms: Optional[int] = None
+    latency_p95_ms: Optional[int] = None
+    latency_p99_ms: Optional[int] = None
+    prompt_tokens: int = 0
+    candidates_tokens: int = 0
+    cached_tokens: int = 0
+    input_bytes: int = 0
+    plans: int = 0
+    tokens_per_plan: Optional[int] = None
+
+
+class GeminiCallStatsResponse(BaseModel):
+    days: int
+    stats: List[GeminiCallStats]
 
 
 class StoredPlanSummary(BaseModel):
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCESS = "success"
+FAILED = "failed"
+
+
+def create_items(job_id: str, file_ids: List[str]) -> None:
+    """Register a job's files as pending items; existing items are kept."""
+    now = time.time()
+    with get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO batch_items (job_id, file_id, position, status, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [(job_id, file_id, position, PENDING, now) for position, file_id in enumerate(file_ids)],
+        )
+        conn.commit()
+
+
+def mark_running(job_id: str, file_id: str, attempt: int) -> None:
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute(
+            """
+            UPDATE batch_items
+            SET status = ?, attempts = ?, error = NULL,
+                started_at = COALESCE(started_at, ?), updated_at = ?
+            WHERE job_id = ? AND file_id = ?
+            """,
+            (RUNNING, attempt, now, now, job_id, file_id),
+        )
+        conn.commit()
+
+
+def mark_submitted(job_id: str, file_ids: List[str]) -> None:
+    """Items sent to the Batch API are running their first attempt."""
+    now = time.time()
+    with get_connection() as conn:
+        conn.executemany(
+            """
+            UPDATE batch_items
+            SET status = ?, attempts = 1, error = NULL,
+                started_at = COALESCE(started_at, ?), updated_at = ?
+            WHERE job_id = ? AND file_id = ?
+            """,
+            [(RUNNING, now, now, job_id, file_id) for file_id in file_ids],
+        )
+        conn.commit()
+
+
+def mark_finished(job_id: str, file_id: str, error: Optional[str] = None) -> None:
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute(
+            """
+            UPDATE batch_items
+            SET status = ?, error = ?, finished_at = ?, updated_at = ?
+            WHERE job_id = ? AND file_id = ?
+            """,
+            (FAILED if error else SUCCESS, error, now, now, job_id, file_id),
+        )
+        conn.commit()
+
+
+def list_items(job_id: str) -> List[Dict[str, Any]]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT file_id, position, status, attempts, error, started_at, finished_at
+            FROM batch_items WHERE job_id = ? ORDER BY position
+            """,
+            (job_id,),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def successful_files(job_id: str) -> List[str]:
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT file_id FROM batch_items WHERE job_id = ? AND status = ? ORDER BY position",
+            (job_id, SUCCESS),
+        ).fetchall()
+    return [row["file_id"] for row in rows]
+
+
+def reset_unfinished(job_id: str) -> int:
+    """Make every item without a plan pending again; returns how many."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            """
+            UPDATE batch_items
+            SET status = ?, error = NULL, attempts = 0, started_at = NULL,
+                finished_at = NULL, updated_at = ?
+            WHERE job_id = ? AND status != ?
+            """,
+            (PENDING, time.time(), job_id, SUCCESS),
+        )
+        conn.commit()
+    return cursor.rowcount
@@ -1,42 +1,160 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, TypeVar
 from uuid import uuid4
 
-from app.models.schemas import BatchJob, BatchJobStatus, CleaningPlan, FloorPlanOptions
-from app.services import plan_store
+from app.models.schemas import (
+    BatchJob,
+    BatchJobStatus,
+    CleaningPlan,
+    FloorPlanOptions,
+    Room,
+)
+from app.services import batch_items, call_ledger, config_store, gemini_batches, plan_store
+from app.services.gemini_client import GeminiClient, GeminiServiceError
+from app.services.job_events import JobEventLog
+from app.services.job_queue import ABANDONED_JOB_MESSAGE, JobQueue, QueuedJob
+from app.services.job_retention import ResultLRU, RetainedJobs
+from app.services.job_state import JobStateStore, SQLiteJobStateStore
+from app.services.rate_limiter import backoff_delay
+from app.services.storage import get_file_path
+
+logger = logging.getLogger(__name__)
+
+# Direct attempts per item, for items processed directly and for items the
+# Batch API failed on.
+BATCH_ITEM_RETRIES = int(os.getenv("BATCH_ITEM_RETRIES", "2"))
+
+DEFAULT_BATCH_CONCURRENCY = 4
+MAX_BATCH_CONCURRENCY = 16
+
+T = TypeVar("T")
+
+TERMINAL_STATUSES = {BatchJobStatus.success, BatchJobStatus.failed}
+QUEUE_STATUS = {
+    "queued": BatchJobStatus.pending,
+    "running": BatchJobStatus.running,
+    "failed": BatchJobStatus.failed,
+}
 
 ProcessorFn = Callable[[str, FloorPlanOptions], Awaitable[CleaningPlan]]
-BatchProcessorFn = Callable[[List[str], FloorPlanOptions], Awaitable[List[CleaningPlan]]]
+ExtractorFn = Callable[[str, FloorPlanOptions], Awaitable[List[Room]]]
+
+
+class BatchResumeError(RuntimeError):
+    """The batch job cannot be resumed in its current state."""
+
+
+def _batch_concurrency() -> int:
+    configured = config_store.get_gemini_config().get("batch_concurrency")
+    try:
+        value = int(configured) if configured is not None else DEFAULT_BATCH_CONCURRENCY
+    except (TypeError, ValueError):
+        value = DEFAULT_BATCH_CONCURRENCY
+    return max(1, min(value, MAX_BATCH_CONCURRENCY))
 
 
 class BatchRunner:
-    def __init__(self) -> None:
-        self.jobs: Dict[str, BatchJob] = {}
-        self.results: Dict[str, List[CleaningPlan]] = {}
+    def __init__(
+        self,
+        gemini_client: GeminiClient,
+        queue: JobQueue,
+        state: Optional[JobStateStore] = None,
+        events: Optional[JobEventLog] = None,
+    ) -> None:
+        self._client = gemini_client
+        self._queue = queue
+        self._state = state or SQLiteJobStateStore()
+        self.events = events or JobEventLog()
+        # Jobs this process is running (or ran recently); every other worker
+        # reads them from the shared state store.
+        self.jobs: RetainedJobs[BatchJob] = RetainedJobs(
+            lambda job: job.status in TERMINAL_STATUSES, on_evict=self._evict
+        )
+        self.results: ResultLRU[List[CleaningPlan]] = ResultLRU()
+        # Set when this process submits a batch, so watch_pending adopts it
+        # without waiting for its next round.
+        self._batch_submitted = asyncio.Event()
+        # Strong references: the event loop only keeps weak ones to tasks.
+        self._batch_tasks: Set[asyncio.Task] = set()
 
     async def start_job(
         self,
         file_ids: List[str],
         options: FloorPlanOptions,
-        processor: ProcessorFn,
         *,
         use_batch_api: bool = False,
-        batch_processor: Optional[BatchProcessorFn] = None,
     ) -> BatchJob:
+        # Items are tracked per file, so each file is processed once.
+        file_ids = list(dict.fromkeys(file_ids))
         job = BatchJob(id=uuid4().hex, total_files=len(file_ids))
-        self.jobs[job.id] = job
-        self.results[job.id] = []
-        if use_batch_api:
-            if batch_processor is None:
-                raise ValueError("batch_processor is required when use_batch_api=True")
-            asyncio.create_task(
-                self._run_batch_api(job.id, file_ids, options, batch_processor)
+        batch_items.create_items(job.id, file_ids)
+        self._save(job)
+        self._queue.enqueue(
+            job.id,
+            "batch",
+            {
+                "file_ids": file_ids,
+                "options": options.model_dump(mode="json"),
+                "use_batch_api": use_batch_api,
+            },
+        )
+        return job
+
+    async def run_queued(self, queued: QueuedJob) -> Optional[str]:
+        """Worker pool entry point; also rebuilds jobs recovered after a restart."""
+        file_ids = queued.payload["file_ids"]
+        options = FloorPlanOptions.model_validate(queued.payload["options"])
+        job = self.jobs.get(queued.id)
+        if job is None:
+            stored = self._state.load(queued.id, "batch")
+            job = (
+                BatchJob.model_validate_json(stored)
+                if stored
+                else BatchJob(id=queued.id, total_files=len(file_ids))
             )
+            self.jobs[queued.id] = job
+        self.results.setdefault(queued.id, [])
+        # Resumed jobs finish their remaining files directly.
+        if not queued.payload.get("use_batch_api") or queued.payload.get("resume"):
+            await self._run(queued.id, file_ids, options, self._process_file)
+        elif gemini_batches.find_batch(queued.id, "extraction"):
+            logger.info("Batch job %s already submitted to the Batch API", queued.id)
         else:
-            asyncio.create_task(self._run(job.id, file_ids, options, processor))
-        return job
+            # Only submits: waiting for the batch (up to its 24 h window) is
+            # left to watch_pending, so it never holds a worker slot.
+            await self._run_batch_api(queued.id, file_ids, options)
+        return job.message if job.status == BatchJobStatus.failed else None
+
+    def abandon(self, job_id: str) -> None:
+        """Fail a job the queue gave up on, e.g. because it kept killing its worker."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            stored = self._state.load(job_id, "batch")
+            job = BatchJob.model_validate_json(stored) if stored else BatchJob(id=job_id)
+        job.status = BatchJobStatus.failed
+        job.message = ABANDONED_JOB_MESSAGE
+        job.finished_at = datetime.now(timezone.utc)
+        self._save(job)
+
+    def _save(self, job: BatchJob) -> None:
+        self._state.save(job.id, "batch", job.model_dump_json())
+        self.events.publish(job.id, "status", job.model_dump(mode="json"))
+        if job.status in TERMINAL_STATUSES:
+            # Clients fetch the results once, on this event's terminal status.
+            self.events.close(job.id)
+
+    def _evict(self, job_id: str) -> None:
+        self.events.discard(job_id)
+        self._state.delete(job_id)
+
+    async def _process_file(self, file_id: str, options: FloorPlanOptions) -> CleaningPlan:
+        rooms = await self._extract_file(file_id, options)
+        return await self._client.generate_plan(rooms, plan_category_id=options.plan_category)
 
     async def _run(
         self,
@@ -45,76 +163,490 @@ class BatchRunner:
         options: FloorPlanOptions,
         processor: ProcessorFn,
     ) -> None:
+        """Process files concurrently; a file that keeps failing fails alone.
+
+        Files that already have a plan (checkpointed in ``batch_items``) are
+        skipped, so recovered and resumed jobs only do the missing work.
+        """
         job = self.jobs[job_id]
+        done = set(batch_items.successful_files(job_id))
+        plans: Dict[str, CleaningPlan] = {
+            stored["file_id"]: stored["plan"]
+            for stored in plan_store.list_job_plans(job_id)
+            if stored["file_id"] in done
+        }
+        failures: Dict[str, str] = {}
         job.status = BatchJobStatus.running
-        for file_id in file_ids:
-            if job.status == BatchJobStatus.failed:
-                return
-            try:
-                started = asyncio.get_running_loop().time()
-                plan = await processor(file_id, options)
-                self.results[job_id].append(plan)
-                plan_store.save_plan(
-                    source="batch",
-                    request_payload={
-                        "job_id": job_id,
-                        "file_id": file_id,
-                        "options": options.model_dump(),
-                    },
-                    plan=plan,
-                    docx_id=None,
-                    metadata={"status": job.status},
-                    generation_ms=int((asyncio.get_running_loop().time() - started) * 1000),
-                )
-                job.processed_files += 1
-            except Exception as exc:  # pragma: no cover - best effort logging
-                job.status = BatchJobStatus.failed
-                job.message = str(exc)
-                return
-        job.status = BatchJobStatus.success
+        job.started_at = job.started_at or datetime.now(timezone.utc)
+        job.finished_at = None
+        job.processed_files = len(done)
+        job.failed_files = 0
+        job.message = None
+        self._save(job)
+        call_ledger.current_job_id.set(job_id)
+        semaphore = asyncio.Semaphore(_batch_concurrency())
+        loop = asyncio.get_running_loop()
+
+        async def _process(file_id: str) -> None:
+            attempts = 0
+
+            def _attempt(attempt: int) -> None:
+                nonlocal attempts
+                attempts = attempt
+                batch_items.mark_running(job_id, file_id, attempt)
+
+            async with semaphore:
+                started = loop.time()
+                try:
+                    plan = await self._retry_item(
+                        file_id, lambda: processor(file_id, options), on_attempt=_attempt
+                    )
+                except Exception as exc:
+                    failures[file_id] = str(exc)
+                    batch_items.mark_finished(job_id, file_id, error=str(exc))
+                    job.failed_files += 1
+                else:
+                    plans[file_id] = plan
+                    plan_store.save_plan(
+                        source="batch",
+                        request_payload={
+                            "job_id": job_id,
+                            "file_id": file_id,
+                            "options": options.model_dump(),
+                        },
+                        plan=plan,
+                        docx_id=None,
+                        metadata={"status": batch_items.SUCCESS, "attempts": attempts},
+                        generation_ms=int((loop.time() - started) * 1000),
+                        job_id=job_id,
+                        file_id=file_id,
+                    )
+                    batch_items.mark_finished(job_id, file_id)
+                    job.processed_files += 1
+                self._update_summary(job)
+                self._save(job)
+
+        remaining = [file_id for file_id in file_ids if file_id not in done]
+        if done:
+            logger.info(
+                "Batch job %s: %s files already done, %s remaining",
+                job_id,
+                len(done),
+                len(remaining),
+            )
+        await asyncio.gather(*(_process(file_id) for file_id in remaining))
+        # In request order, whichever file finished first.
+        self.results[job_id] = [plans[file_id] for file_id in file_ids if file_id in plans]
+        self._complete(job, failures)
+
+    def resume_job(self, job_id: str) -> BatchJob:
+        """Queue a finished batch job again for its files that have no plan."""
+        record = self._queue.get(job_id)
+        if record is None or record["kind"] != "batch":
+            raise KeyError(job_id)
+        if record["status"] in ("queued", "running"):
+            raise BatchResumeError("Batchjobben kjører fortsatt")
+        for stage in ("extraction", "generation"):
+            batch = gemini_batches.find_batch(job_id, stage)
+            if batch and not batch["finished"]:
+                raise BatchResumeError("Batchjobben venter fortsatt på Gemini Batch API")
+        file_ids = record["payload"]["file_ids"]
+        # Jobs from before per-file checkpoints have no items yet.
+        batch_items.create_items(job_id, file_ids)
+        remaining = batch_items.reset_unfinished(job_id)
+        if not remaining:
+            raise BatchResumeError("Alle filer i batchjobben er allerede behandlet")
+        stored = self._state.load(job_id, "batch")
+        job = BatchJob.model_validate_json(stored) if stored else BatchJob(id=job_id)
+        job.status = BatchJobStatus.pending
+        job.total_files = len(file_ids)
+        job.processed_files = len(file_ids) - remaining
+        job.failed_files = 0
+        job.message = f"Gjenopptar {remaining} av {len(file_ids)} filer"
+        job.finished_at = None
+        # Saved first: whichever worker claims the job reloads it from the
+        # state store.
+        self.jobs.pop(job_id, None)
+        self.results.pop(job_id, None)
+        self._save(job)
+        if not self._queue.requeue(job_id, {**record["payload"], "resume": True}):
+            raise BatchResumeError("Batchjobben kjører fortsatt")
+        return job
 
     def get_status(self, job_id: str) -> BatchJob:
-        if job_id not in self.jobs:
+        if job_id in self.jobs:
+            return self.jobs[job_id]
+        stored = self._state.load(job_id, "batch")
+        if stored:
+            return BatchJob.model_validate_json(stored)
+        # Evicted, or lost in a restart before it started.
+        record = self._queue.get(job_id)
+        if record is None or record["kind"] != "batch":
             raise KeyError(job_id)
-        return self.jobs[job_id]
+        total_files = len(record["payload"].get("file_ids") or [])
+        if record["status"] != "done":
+            return BatchJob(
+                id=job_id,
+                status=QUEUE_STATUS[record["status"]],
+                total_files=total_files,
+                message=record["error"],
+            )
+        processed = plan_store.count_job_plans(job_id)
+        return BatchJob(
+            id=job_id,
+            status=BatchJobStatus.success,
+            total_files=total_files,
+            processed_files=processed,
+            failed_files=max(0, total_files - processed),
+        )
 
     def get_results(self, job_id: str) -> List[CleaningPlan]:
-        if job_id not in self.results:
+        if job_id in self.results:
+            return self.results[job_id]
+        if job_id not in self.jobs and self._queue.get(job_id) is None:
             raise KeyError(job_id)
-        return self.results[job_id]
+        return [stored["plan"] for stored in plan_store.list_job_plans(job_id)]
+
+    async def _extract_file(self, file_id: str, options: FloorPlanOptions) -> List[Room]:
+        return await self._client.analyze_floorplan(get_file_path(file_id), options)
+
+    async def _retry_item(
+        self,
+        label: str,
+        call: Callable[[], Awaitable[T]],
+        *,
+        on_attempt: Optional[Callable[[int], None]] = None,
+    ) -> T:
+        """Run one batch item directly, a few times at most.
+
+        Only errors Gemini marks retryable (throttling, 5xx) are tried again,
+        after a jittered backoff; anything else fails the item at once.
+        """
+        for attempt in range(1, BATCH_ITEM_RETRIES + 1):
+            if on_attempt is not None:
+                on_attempt(attempt)
+            try:
+                return await call()
+            except GeminiServiceError as exc:
+                if not exc.is_retryable or attempt == BATCH_ITEM_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, retry_after=exc.retry_after)
+                logger.warning(
+                    "Attempt %s/%s for batch item %s failed, retrying in %.1f s: %s",
+                    attempt,
+                    BATCH_ITEM_RETRIES,
+                    label,
+                    delay,
+                    exc,
+                )
+                await asyncio.sleep(delay)
+        raise RuntimeError(f"No attempts made for batch item {label}")
 
     async def _run_batch_api(
         self,
         job_id: str,
         file_ids: List[str],
         options: FloorPlanOptions,
-        batch_processor: BatchProcessorFn,
     ) -> None:
+        """Submit the extraction batch; ``resume_pending`` finishes the job."""
         job = self.jobs[job_id]
         job.status = BatchJobStatus.running
-        started = asyncio.get_running_loop().time()
+        job.started_at = job.started_at or datetime.now(timezone.utc)
+        self._save(job)
+        call_ledger.current_job_id.set(job_id)
         try:
-            plans = await batch_processor(file_ids, options)
-            if len(plans) != len(file_ids):
-                raise RuntimeError("Batch API returned mismatched number of plans")
-            self.results[job_id].extend(plans)
-            job.processed_files = len(plans)
-            duration_ms = int((asyncio.get_running_loop().time() - started) * 1000)
-            for file_id, plan in zip(file_ids, plans):
-                plan_store.save_plan(
-                    source="batch",
-                    request_payload={
-                        "job_id": job_id,
-                        "file_id": file_id,
-                        "options": options.model_dump(),
-                        "mode": "batch_api",
-                    },
-                    plan=plan,
-                    docx_id=None,
-                    metadata={"status": job.status, "mode": "batch_api"},
-                    generation_ms=duration_ms,
-                )
-            job.status = BatchJobStatus.success
+            name = await self._client.submit_extraction_batch(
+                [get_file_path(file_id) for file_id in file_ids],
+                options,
+                display_name=f"cleansync-{job_id}-extraction",
+            )
+            gemini_batches.save_batch(
+                name,
+                job_id=job_id,
+                stage="extraction",
+                file_ids=file_ids,
+                context={"options": options.model_dump(mode="json")},
+                claimed=False,
+            )
         except Exception as exc:  # pragma: no cover - best effort logging
             job.status = BatchJobStatus.failed
             job.message = str(exc)
+            self._save(job)
+            return
+        batch_items.mark_submitted(job_id, file_ids)
+        self._batch_submitted.set()
+
+    async def _finish_extraction(
+        self,
+        job: BatchJob,
+        name: str,
+        file_ids: List[str],
+        options: FloorPlanOptions,
+        extractor: ExtractorFn,
+    ) -> None:
+        """Stage one: collect extracted rooms, then submit stage two."""
+        call_ledger.current_job_id.set(job.id)
+        try:
+            remote = await self._client.wait_for_batch(name)
+            items = self._client.extraction_batch_results(remote)
+            if len(items) != len(file_ids):
+                raise RuntimeError("Batch API returned mismatched number of extractions")
+        except Exception as exc:
+            # The whole batch is lost; every file falls back to a direct call.
+            logger.warning("Extraction batch %s failed: %s", name, exc)
+            items = [exc] * len(file_ids)
+
+        rooms_by_file: Dict[str, List[Room]] = {}
+        failures: Dict[str, str] = {}
+        semaphore = asyncio.Semaphore(_batch_concurrency())
+
+        async def _extract(file_id: str, item) -> None:
+            if not isinstance(item, Exception):
+                rooms_by_file[file_id] = item
+                return
+            async with semaphore:
+                try:
+                    rooms_by_file[file_id] = await self._retry_item(
+                        file_id,
+                        lambda: extractor(file_id, options),
+                        on_attempt=lambda attempt: batch_items.mark_running(
+                            job.id, file_id, attempt + 1
+                        ),
+                    )
+                except Exception as exc:
+                    failures[file_id] = str(exc)
+                    batch_items.mark_finished(job.id, file_id, error=str(exc))
+
+        # Until stage two is saved, the fallback calls run under this
+        # batch's claim; watch_pending must not adopt it meanwhile.
+        async with gemini_batches.keep_claim(name):
+            await asyncio.gather(
+                *(_extract(file_id, item) for file_id, item in zip(file_ids, items))
+            )
+            extracted = [file_id for file_id in file_ids if file_id in rooms_by_file]
+            if not extracted:
+                gemini_batches.mark_finished(name, error="No floor plans could be extracted")
+                self._complete(job, failures)
+                return
+            try:
+                generation_name = await self._client.submit_plan_batch(
+                    [rooms_by_file[file_id] for file_id in extracted],
+                    plan_category_id=options.plan_category,
+                    display_name=f"cleansync-{job.id}-generation",
+                )
+                gemini_batches.save_batch(
+                    generation_name,
+                    job_id=job.id,
+                    stage="generation",
+                    file_ids=extracted,
+                    context={
+                        "options": options.model_dump(mode="json"),
+                        "rooms": {
+                            file_id: [room.model_dump(mode="json") for room in rooms]
+                            for file_id, rooms in rooms_by_file.items()
+                        },
+                        "failures": failures,
+                    },
+                )
+            except Exception as exc:  # pragma: no cover - best effort logging
+                gemini_batches.mark_finished(name, error=str(exc))
+                job.status = BatchJobStatus.failed
+                job.message = str(exc)
+                self._save(job)
+                return
+            # Only now, so a crash in between resumes stage one rather than losing it.
+            gemini_batches.mark_finished(name)
+        await self._finish_generation(
+            job, generation_name, extracted, options, rooms_by_file, failures
+        )
+
+    async def _finish_generation(
+        self,
+        job: BatchJob,
+        name: str,
+        file_ids: List[str],
+        options: FloorPlanOptions,
+        rooms_by_file: Dict[str, List[Room]],
+        failures: Dict[str, str],
+    ) -> None:
+        """Stage two: store plans, retrying failed items directly."""
+        call_ledger.current_job_id.set(job.id)
+        duration_ms = None
+        try:
+            remote = await self._client.wait_for_batch(name)
+            items = self._client.plan_batch_results(remote)
+            if len(items) != len(file_ids):
+                raise RuntimeError("Batch API returned mismatched number of plans")
+            if remote.create_time and remote.end_time:
+                duration_ms = int(
+                    (remote.end_time - remote.create_time).total_seconds() * 1000
+                )
+        except Exception as exc:
+            logger.warning("Generation batch %s failed: %s", name, exc)
+            items = [exc] * len(file_ids)
+
+        plans: Dict[str, CleaningPlan] = {}
+        # Files the Batch API failed on, planned by direct calls instead.
+        direct: Set[str] = set()
+        semaphore = asyncio.Semaphore(_batch_concurrency())
+
+        async def _generate(file_id: str, item) -> None:
+            if not isinstance(item, Exception):
+                plans[file_id] = item
+                return
+            direct.add(file_id)
+            async with semaphore:
+                try:
+                    plans[file_id] = await self._retry_item(
+                        file_id,
+                        lambda: self._client.generate_plan(
+                            rooms_by_file[file_id], plan_category_id=options.plan_category
+                        ),
+                        on_attempt=lambda attempt: batch_items.mark_running(
+                            job.id, file_id, attempt + 1
+                        ),
+                    )
+                except Exception as exc:
+                    failures[file_id] = str(exc)
+                    batch_items.mark_finished(job.id, file_id, error=str(exc))
+
+        async with gemini_batches.keep_claim(name):
+            await asyncio.gather(
+                *(_generate(file_id, item) for file_id, item in zip(file_ids, items))
+            )
+        results = self.results.setdefault(job.id, [])
+        for file_id in file_ids:
+            if file_id not in plans:
+                continue
+            plan = plans[file_id]
+            results.append(plan)
+            plan_store.save_plan(
+                source="batch",
+                request_payload={
+                    "job_id": job.id,
+                    "file_id": file_id,
+                    "options": options.model_dump(),
+                    "mode": "batch_api",
+                    "batch_name": name,
+                },
+                plan=plan,
+                docx_id=None,
+                metadata={
+                    "status": batch_items.SUCCESS,
+                    "mode": "direct" if file_id in direct else "batch_api",
+                },
+                generation_ms=duration_ms,
+                job_id=job.id,
+                file_id=file_id,
+            )
+            batch_items.mark_finished(job.id, file_id)
+        gemini_batches.mark_finished(
+            name, error=f"{len(failures)} items failed" if failures else None
+        )
+        self._complete(job, failures)
+
+    def _complete(self, job: BatchJob, failures: Dict[str, str]) -> None:
+        job.failed_files = len(failures)
+        job.processed_files = job.total_files - len(failures)
+        for file_id, error in failures.items():
+            logger.warning("Batch job %s: file %s failed: %s", job.id, file_id, error)
+        if job.processed_files == 0:
+            job.status = BatchJobStatus.failed
+            job.message = "Ingen filer kunne behandles"
+        else:
+            job.status = BatchJobStatus.success
+            if failures:
+                job.message = f"{len(failures)} av {job.total_files} filer feilet"
+        job.finished_at = datetime.now(timezone.utc)
+        self._update_summary(job)
+        self._save(job)
+        logger.info(
+            "Batch job %s finished: %s/%s files, success rate %s, %s files/min",
+            job.id,
+            job.processed_files,
+            job.total_files,
+            job.success_rate,
+            job.files_per_minute,
+        )
+
+    @staticmethod
+    def _update_summary(job: BatchJob) -> None:
+        finished = job.processed_files + job.failed_files
+        job.success_rate = round(job.processed_files / finished, 3) if finished else None
+        if job.started_at is None or not finished:
+            return
+        end = job.finished_at or datetime.now(timezone.utc)
+        minutes = (end - job.started_at).total_seconds() / 60
+        job.files_per_minute = round(finished / minutes, 2) if minutes > 0 else None
+
+    async def resume_pending(self) -> int:
+        """Poll batches nobody is polling: new ones, and orphans of a dead process."""
+        records = gemini_batches.claim_stale_batches()
+        for record in records:
+            if record["stage"] == "extraction" and gemini_batches.find_batch(
+                record["job_id"], "generation"
+            ):
+                # Stage two was already submitted; that row resumes on its own.
+                gemini_batches.mark_finished(record["name"])
+                continue
+            context = record["context"]
+            options = FloorPlanOptions.model_validate(context.get("options") or {})
+            job = self.jobs.get(record["job_id"])
+            if job is None:
+                stored = self._state.load(record["job_id"], "batch")
+                if stored:
+                    job = BatchJob.model_validate_json(stored)
+                else:
+                    job = BatchJob(
+                        id=record["job_id"],
+                        status=BatchJobStatus.running,
+                        total_files=len(record["file_ids"])
+                        + len(context.get("failures") or {}),
+                        message="Gjenopptatt etter omstart",
+                    )
+                    self._save(job)
+                self.jobs[job.id] = job
+                self.results.setdefault(job.id, [])
+            logger.info(
+                "Resuming Gemini %s batch %s for job %s",
+                record["stage"],
+                record["name"],
+                job.id,
+            )
+            if record["stage"] == "extraction":
+                task = self._finish_extraction(
+                    job, record["name"], record["file_ids"], options, self._extract_file
+                )
+            else:
+                rooms_by_file = {
+                    file_id: [Room.model_validate(room) for room in rooms]
+                    for file_id, rooms in (context.get("rooms") or {}).items()
+                }
+                task = self._finish_generation(
+                    job,
+                    record["name"],
+                    record["file_ids"],
+                    options,
+                    rooms_by_file,
+                    dict(context.get("failures") or {}),
+                )
+            poller = asyncio.create_task(task)
+            self._batch_tasks.add(poller)
+            poller.add_done_callback(self._batch_tasks.discard)
+        return len(records)
+
+    async def watch_pending(self) -> None:
+        """Keep adopting submitted and orphaned batches."""
+        while True:
+            self._batch_submitted.clear()
+            try:
+                await self.resume_pending()
+            except Exception:  # pragma: no cover - keep the watcher alive
+                logger.exception("Could not resume pending Gemini batches")
+            try:
+                await asyncio.wait_for(
+                    self._batch_submitted.wait(),
+                    gemini_batches.BATCH_CLAIM_LEASE_SECONDS / 2,
+                )
+            except asyncio.TimeoutError:
+                pass
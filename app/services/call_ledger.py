@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+logger = logging.getLogger(__name__)
+
+# Set by the job runners so every Gemini call made on behalf of a job is
+# attributed to it without threading the id through GeminiClient.
+current_job_id: ContextVar[Optional[str]] = ContextVar("gemini_call_job_id", default=None)
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class CallRecord:
+    """One logical Gemini call (all of its retries), filled in as it runs."""
+
+    stage: str
+    model: str
+    input_bytes: Optional[int] = None
+    job_id: Optional[str] = field(default_factory=current_job_id.get)
+    prompt_tokens: Optional[int] = None
+    candidates_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    retries: int = 0
+    outcome: str = "success"
+    status_code: Optional[int] = None
+    started: float = field(default_factory=time.perf_counter)
+    # Set when the latency is not this process's wall time (Batch API items).
+    latency_ms: Optional[int] = None
+
+    def capture_usage(self, usage: Any) -> None:
+        if usage is None:
+            return
+        self.prompt_tokens = getattr(usage, "prompt_token_count", None)
+        self.candidates_tokens = getattr(usage, "candidates_token_count", None)
+        self.cached_tokens = getattr(usage, "cached_content_token_count", None)
+        self.total_tokens = getattr(usage, "total_token_count", None)
+
+
+def record_call(record: CallRecord) -> None:
+    now = datetime.now(timezone.utc)
+    latency_ms = record.latency_ms
+    if latency_ms is None:
+        latency_ms = int((time.perf_counter() - record.started) * 1000)
+    try:
+        with get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO gemini_calls (
+                    created_at, day, stage, model, job_id, prompt_tokens,
+                    candidates_tokens, cached_tokens, total_tokens, input_bytes,
+                    latency_ms, retries, outcome, status_code
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    now.timestamp(),
+                    now.date().isoformat(),
+                    record.stage,
+                    record.model,
+                    record.job_id,
+                    record.prompt_tokens,
+                    record.candidates_tokens,
+                    record.cached_tokens,
+                    record.total_tokens,
+                    record.input_bytes,
+                    latency_ms,
+                    record.retries,
+                    record.outcome,
+                    record.status_code,
+                ),
+            )
+            conn.commit()
+    except sqlite3.Error as exc:  # pragma: no cover - accounting must not fail calls
+        logger.warning("Could not record Gemini call: %s", exc)
+
+
+def _percentile(sorted_values: List[int], percentile: int) -> Optional[int]:
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile.
+    rank = max(1, -(-percentile * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def summarize(days: int = 30, by_day: bool = False) -> List[Dict[str, Any]]:
+    """Latency percentiles and token totals per stage (and per day)."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT day, stage, job_id, prompt_tokens, candidates_tokens,
+                   cached_tokens, total_tokens, input_bytes, latency_ms, retries, outcome
+            FROM gemini_calls
+            WHERE created_at >= ?
+            """,
+            (since,),
+        ).fetchall()
+        job_ids = sorted({row["job_id"] for row in rows if row["job_id"]})
+        # Plans a job actually produced; a batch job makes one per file.
+        plan_counts: Dict[str, int] = {}
+        for start in range(0, len(job_ids), 500):
+            chunk = job_ids[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            plan_counts.update(
+                (row["job_id"], row["plans"])
+                for row in conn.execute(
+                    f"""
+                    SELECT job_id, COUNT(*) AS plans FROM generated_plans
+                    WHERE job_id IN ({placeholders}) GROUP BY job_id
+                    """,
+                    chunk,
+                )
+            )
+    groups: Dict[tuple, List[sqlite3.Row]] = defaultdict(list)
+    for row in rows:
+        groups[(row["day"] if by_day else None, row["stage"])].append(row)
+    summaries: List[Dict[str, Any]] = []
+    for (day, stage), group in sorted(
+        groups.items(), key=lambda item: (item[0][0] or "", item[0][1])
+    ):
+        latencies = sorted(row["latency_ms"] for row in group)
+        jobs = {row["job_id"] for row in group if row["job_id"]}
+        job_tokens = sum(row["total_tokens"] or 0 for row in group if row["job_id"])
+        plans = sum(plan_counts.get(job_id, 0) for job_id in jobs)
+        summary: Dict[str, Any] = {
+            "day": day,
+            "stage": stage,
+            "calls": len(group),
+            "failures": sum(1 for row in group if row["outcome"] != "success"),
+            "retries": sum(row["retries"] for row in group),
+            "prompt_tokens": sum(row["prompt_tokens"] or 0 for row in group),
+            "candidates_tokens": sum(row["candidates_tokens"] or 0 for row in group),
+            "cached_tokens": sum(row["cached_tokens"] or 0 for row in group),
+            "input_bytes": sum(row["input_bytes"] or 0 for row in group),
+            "plans": plans,
+            "tokens_per_plan": round(job_tokens / plans) if plans else None,
+        }
+        for percentile in PERCENTILES:
+            summary[f"latency_p{percentile}_ms"] = _percentile(latencies, percentile)
+        summaries.append(summary)
+    return summaries
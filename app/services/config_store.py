@@ -2,6 +2,9 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 import json
+import os
+import threading
+import time
 from typing import Dict, Optional
 
 from app.db.database import get_connection, init_db
@@ -11,6 +14,59 @@ init_db()
 PROMPT_SETTING_NAME = "system_prompt"
 GEMINI_CONFIG_NAME = "gemini_config"
 
+# How often a process re-reads the shared version row to notice writes made
+# by other workers; reads in between are served from memory without SQL.
+CONFIG_VERSION_CHECK_SECONDS = float(os.getenv("CONFIG_VERSION_CHECK_SECONDS", "1.0"))
+
+# Read-through caches for the settings and api_keys tables. Writes in this
+# process invalidate them immediately; writes from other workers are picked up
+# once the persisted ``config_version`` row is seen to change. Values derived
+# from the config (prompts, request configs) can be cached against
+# ``config_version()`` the same way.
+_lock = threading.Lock()
+_config_version = 0
+_version_checked_at = 0.0
+_settings_cache: Dict[str, Optional[dict]] = {}
+_api_key_cache: Dict[str, Optional[str]] = {}
+
+
+def _invalidate(version: int) -> None:
+    global _config_version
+    _settings_cache.clear()
+    _api_key_cache.clear()
+    _config_version = version
+
+
+def _sync_version(force: bool = False) -> None:
+    global _version_checked_at
+    now = time.monotonic()
+    if not force and now - _version_checked_at < CONFIG_VERSION_CHECK_SECONDS:
+        return
+    with get_connection() as conn:
+        row = conn.execute("SELECT version FROM config_version WHERE id = 1").fetchone()
+    version = row["version"] if row else 0
+    with _lock:
+        if version != _config_version:
+            _invalidate(version)
+        _version_checked_at = now
+
+
+def config_version() -> int:
+    _sync_version()
+    return _config_version
+
+
+def _commit_config_change(conn) -> None:
+    # The version bump shares the writing transaction so the data and its
+    # version land together; the caches are cleared only once both are
+    # committed, or a concurrent read could re-cache the old values.
+    conn.execute("UPDATE config_version SET version = version + 1 WHERE id = 1")
+    row = conn.execute("SELECT version FROM config_version WHERE id = 1").fetchone()
+    conn.commit()
+    with _lock:
+        _invalidate(row["version"])
+
+
 def _row_to_dict(row) -> dict:
     return {
         "name": row["name"],
@@ -52,7 +108,7 @@ def set_api_key(name: str, value: str, label: Optional[str] = None) -> dict:
             """,
             (normalized, effective_label, value, now, now),
         )
-        conn.commit()
+        _commit_config_change(conn)
         row = conn.execute(
             "SELECT name, label, value, created_at, updated_at FROM api_keys WHERE name = ?",
             (normalized,),
@@ -66,18 +122,27 @@ def delete_api_key(name: str) -> None:
     normalized = name.strip().lower()
     with get_connection() as conn:
         conn.execute("DELETE FROM api_keys WHERE name = ?", (normalized,))
-        conn.commit()
+        _commit_config_change(conn)
 
 
 def get_api_key_value(name: str) -> Optional[str]:
     if not name:
         return None
     normalized = name.strip().lower()
+    _sync_version()
+    if normalized in _api_key_cache:
+        return _api_key_cache[normalized]
+    version = _config_version
     with get_connection() as conn:
         row = conn.execute(
             "SELECT value FROM api_keys WHERE name = ?", (normalized,)
         ).fetchone()
-    return row["value"] if row else None
+    value = row["value"] if row else None
+    with _lock:
+        # Skip the fill if a write invalidated the cache while we were reading.
+        if version == _config_version:
+            _api_key_cache[normalized] = value
+    return value
 
 
 def _setting_row_to_dict(row) -> dict:
@@ -87,11 +152,20 @@ def _setting_row_to_dict(row) -> dict:
 def get_setting(name: str) -> Optional[dict]:
     if not name:
         return None
+    _sync_version()
+    if name in _settings_cache:
+        record = _settings_cache[name]
+        return dict(record) if record else None
+    version = _config_version
     with get_connection() as conn:
         row = conn.execute(
             "SELECT name, value, updated_at FROM settings WHERE name = ?", (name,)
         ).fetchone()
-    return _setting_row_to_dict(row) if row else None
+    record = _setting_row_to_dict(row) if row else None
+    with _lock:
+        if version == _config_version:
+            _settings_cache[name] = record
+    return dict(record) if record else None
 
 
 def set_setting(name: str, value: str) -> dict:
@@ -109,7 +183,7 @@ def set_setting(name: str, value: str) -> dict:
             """,
             (name, value, now),
         )
-        conn.commit()
+        _commit_config_change(conn)
         row = conn.execute(
             "SELECT name, value, updated_at FROM settings WHERE name = ?", (name,)
         ).fetchone()
@@ -139,7 +213,7 @@ def delete_setting(name: str) -> None:
         return
     with get_connection() as conn:
         conn.execute("DELETE FROM settings WHERE name = ?", (name,))
-        conn.commit()
+        _commit_config_change(conn)
 
 
 def reset_system_prompt() -> None:
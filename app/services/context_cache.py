@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set
+
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TTL_SECONDS = 3600
+REFRESH_MARGIN_SECONDS = 300
+# Errors that mean the account/model cannot use explicit caching at all.
+_UNSUPPORTED_STATUS = {401, 403, 404}
+
+
+@dataclass
+class CachedInstruction:
+    name: str
+    expires_at: float
+
+
+class ContextCacheManager:
+    """Keeps system instructions in Gemini context caches.
+
+    Entries are keyed by ``GeminiClient._cache_key`` (label + SHA-1 of the
+    instruction text), so an edited system prompt naturally maps to a new
+    entry. Entries are extended shortly before they expire. When the account
+    lacks caching privileges the manager disables itself and callers fall
+    back to sending the instruction inline.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], genai.Client],
+        model_name: str,
+        *,
+        ttl_seconds: int = DEFAULT_CACHE_TTL_SECONDS,
+    ) -> None:
+        self._client_factory = client_factory
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[str, CachedInstruction] = {}
+        self.disabled_reason: Optional[str] = None
+        self._uncacheable: Set[str] = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._scope: Optional[str] = None
+
+    async def ensure(
+        self, key: str, label: str, instruction_text: str, *, scope: str
+    ) -> Optional[str]:
+        if scope != self._scope:
+            # Caches (and caching privileges) belong to the project of the API
+            # key that created them.
+            self.entries.clear()
+            self._uncacheable.clear()
+            self.disabled_reason = None
+            self._scope = scope
+        if self.disabled_reason is not None or key in self._uncacheable:
+            return None
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self.entries.get(key)
+            now = time.time()
+            if entry and entry.expires_at - REFRESH_MARGIN_SECONDS > now:
+                return entry.name
+            try:
+                if entry and entry.expires_at > now:
+                    entry = await self._extend(entry)
+                else:
+                    entry = await self._create(label, instruction_text)
+            except genai_errors.APIError as exc:
+                self._handle_error(key, label, exc)
+                return None
+            self.entries[key] = entry
+            return entry.name
+
+    async def _create(self, label: str, instruction_text: str) -> CachedInstruction:
+        client = self._client_factory()
+        cached = await client.aio.caches.create(
+            model=self.model_name,
+            config=types.CreateCachedContentConfig(
+                contents=[
+                    types.Content(role="user", parts=[types.Part(text=instruction_text)])
+                ],
+                ttl=f"{self.ttl_seconds}s",
+                display_name=label,
+            ),
+        )
+        logger.info("Created Gemini context cache %s for %s", cached.name, label)
+        return CachedInstruction(name=cached.name, expires_at=self._expiry(cached))
+
+    async def _extend(self, entry: CachedInstruction) -> CachedInstruction:
+        client = self._client_factory()
+        cached = await client.aio.caches.update(
+            name=entry.name,
+            config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"),
+        )
+        return CachedInstruction(name=entry.name, expires_at=self._expiry(cached))
+
+    def _expiry(self, cached: types.CachedContent) -> float:
+        if cached.expire_time:
+            return cached.expire_time.timestamp()
+        return time.time() + self.ttl_seconds
+
+    def _handle_error(self, key: str, label: str, exc: genai_errors.APIError) -> None:
+        status = getattr(exc, "code", None)
+        self.entries.pop(key, None)
+        if status in _UNSUPPORTED_STATUS:
+            self.disabled_reason = str(exc)
+            logger.warning(
+                "Context caching unavailable (status=%s); sending instructions inline: %s",
+                status,
+                exc,
+            )
+        elif status == 400:
+            # Typically the instruction is below the model's minimum cacheable size.
+            self._uncacheable.add(key)
+            logger.info("Instruction %s cannot be cached: %s", label, exc)
+        else:
+            logger.warning("Could not create context cache for %s: %s", label, exc)
+
+    def forget(self, name: str) -> None:
+        for key, entry in list(self.entries.items()):
+            if entry.name == name:
+                self.entries.pop(key, None)
+
+    def invalidate_all(self) -> None:
+        """Stop using the current caches, e.g. after the system prompt changed.
+
+        The caches are not deleted: calls already in flight still reference
+        them, and they expire on their own after ``ttl_seconds``.
+        """
+        self.entries.clear()
+        self._uncacheable.clear()
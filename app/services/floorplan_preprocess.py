@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+try:  # Pillow is optional; without it images are sent unchanged.
+    from PIL import Image, ImageFilter, ImageOps, ImageStat
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
+from app.services.result_cache import ResultCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_EDGE = 3072
+# Pixels lighter than this count as blank paper when cropping margins.
+BLANK_THRESHOLD = 245
+CROP_PADDING = 16
+PALETTE_COLORS = 16
+# Mean edge intensity (0-255) of a 512 px preview above which a drawing is
+# dense enough (small labels, hatching) to need ``high`` media resolution.
+HIGH_DETAIL_EDGE_MEAN = 12.0
+DETAIL_SAMPLE_EDGE = 512
+# Bumped when the pipeline changes so stale variants are not reused.
+PIPELINE_VERSION = 1
+
+PREPROCESS_CACHE_MAX_ENTRIES = int(os.getenv("PREPROCESS_CACHE_MAX_ENTRIES", "500"))
+PREPROCESS_CACHE_MAX_BYTES = int(
+    os.getenv("PREPROCESS_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+
+
+@dataclass(frozen=True)
+class PreparedDocument:
+    data: bytes
+    mime_type: str
+    media_resolution: Optional[str] = None
+
+
+class FloorPlanPreprocessor:
+    """Shrinks raster floor plans before they are sent to Gemini.
+
+    Blank margins are cropped, the drawing is reduced to a small grayscale
+    palette, the longest edge is capped and the result re-encoded as PNG. The
+    drawing's detail level picks the media resolution (sparse drawings do not
+    need ``high``). Variants are cached by content hash; PDFs and other
+    documents pass through untouched.
+    """
+
+    def __init__(self) -> None:
+        self.cache = ResultCache(
+            "floorplan-preprocess",
+            max_entries=PREPROCESS_CACHE_MAX_ENTRIES,
+            max_bytes=PREPROCESS_CACHE_MAX_BYTES,
+        )
+
+    @staticmethod
+    def available() -> bool:
+        return Image is not None
+
+    def prepare(
+        self,
+        data: bytes,
+        mime_type: str,
+        *,
+        name: str = "",
+        max_edge: int = DEFAULT_MAX_EDGE,
+        crop: bool = True,
+    ) -> PreparedDocument:
+        if Image is None or not mime_type.startswith("image/"):
+            return PreparedDocument(data, mime_type)
+        started = time.perf_counter()
+        key = make_cache_key(
+            hashlib.sha256(data).hexdigest(), max_edge, crop, PIPELINE_VERSION
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            payload = json.loads(cached)
+            prepared = PreparedDocument(
+                base64.b64decode(payload["data"]),
+                payload["mime_type"],
+                payload.get("media_resolution"),
+            )
+        else:
+            try:
+                prepared = self._process(data, mime_type, max_edge, crop)
+            except (OSError, ValueError, Image.DecompressionBombError) as exc:
+                logger.warning("Could not preprocess %s, sending as is: %s", name, exc)
+                return PreparedDocument(data, mime_type)
+            self.cache.put(
+                key,
+                json.dumps(
+                    {
+                        "data": base64.b64encode(prepared.data).decode("ascii"),
+                        "mime_type": prepared.mime_type,
+                        "media_resolution": prepared.media_resolution,
+                    }
+                ),
+            )
+        saved = len(data) - len(prepared.data)
+        logger.info(
+            "Preprocessed %s: %s -> %s bytes (%.0f%% saved) in %.1f ms, "
+            "media_resolution=%s, cached=%s",
+            name,
+            len(data),
+            len(prepared.data),
+            100.0 * saved / len(data) if data else 0.0,
+            (time.perf_counter() - started) * 1000,
+            prepared.media_resolution,
+            cached is not None,
+        )
+        return prepared
+
+    def _process(
+        self, data: bytes, mime_type: str, max_edge: int, crop: bool
+    ) -> PreparedDocument:
+        with Image.open(io.BytesIO(data)) as source:
+            image = ImageOps.exif_transpose(source)
+            if image.mode in ("RGBA", "LA", "P"):
+                # Transparent areas become paper, not black.
+                rgba = image.convert("RGBA")
+                background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+                image = Image.alpha_composite(background, rgba)
+            gray = image.convert("L")
+        if crop:
+            gray = self._crop_margins(gray)
+        if max(gray.size) > max_edge:
+            gray.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        media_resolution = self._detail_level(gray)
+        encoded = io.BytesIO()
+        gray.quantize(colors=PALETTE_COLORS).save(encoded, format="PNG", optimize=True)
+        processed = encoded.getvalue()
+        if len(processed) >= len(data):
+            # Already compact; keep the original bytes but still use the grading.
+            return PreparedDocument(data, mime_type, media_resolution)
+        return PreparedDocument(processed, "image/png", media_resolution)
+
+    @staticmethod
+    def _crop_margins(gray: "Image.Image") -> "Image.Image":
+        ink = gray.point(lambda value: 255 if value < BLANK_THRESHOLD else 0)
+        bbox = ink.getbbox()
+        if not bbox:
+            return gray
+        left, top, right, bottom = bbox
+        return gray.crop(
+            (
+                max(0, left - CROP_PADDING),
+                max(0, top - CROP_PADDING),
+                min(gray.width, right + CROP_PADDING),
+                min(gray.height, bottom + CROP_PADDING),
+            )
+        )
+
+    @staticmethod
+    def _detail_level(gray: "Image.Image") -> str:
+        sample = gray.copy()
+        sample.thumbnail((DETAIL_SAMPLE_EDGE, DETAIL_SAMPLE_EDGE))
+        edge_mean = ImageStat.Stat(sample.filter(ImageFilter.FIND_EDGES)).mean[0]
+        # ``low`` is too coarse for room labels, so it is never chosen.
+        return "high" if edge_mean >= HIGH_DETAIL_EDGE_MEAN else "medium"
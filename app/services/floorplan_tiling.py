@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import io
+import logging
+import math
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+try:  # Pillow is optional; without it large rasters are sent whole.
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Rasters above this many pixels are extracted tile by tile.
+DEFAULT_TILE_PIXEL_THRESHOLD = int(os.getenv("TILE_PIXEL_THRESHOLD", str(24_000_000)))
+TILE_EDGE = 3072
+# Wide enough that a room label cut by one tile edge is whole in the neighbour.
+TILE_OVERLAP = 384
+# Decoded size a raster may take in memory while it is cut; larger JPEGs are
+# decoded at reduced scale, anything else is refused.
+TILE_MEMORY_BUDGET_BYTES = int(
+    os.getenv("TILE_MEMORY_BUDGET_BYTES", str(192 * 1024 * 1024))
+)
+# Pillow's in-memory bytes per pixel: one for palette/gray modes, four otherwise.
+_COMPACT_MODES = {"1", "L", "P"}
+
+_pixel_limit_lock = threading.Lock()
+
+
+@contextmanager
+def _open_raster(data: bytes) -> Iterator["Image.Image"]:
+    """Open a raster past Pillow's decompression-bomb guard, header only.
+
+    The guard is lifted just for the ``open`` call and restored at once, so
+    every other image path keeps Pillow's default; nothing is decoded until
+    the caller has checked the size against ``TILE_MEMORY_BUDGET_BYTES``.
+    """
+    with _pixel_limit_lock:
+        saved = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None
+        try:
+            image = Image.open(io.BytesIO(data))
+        finally:
+            Image.MAX_IMAGE_PIXELS = saved
+    with image:
+        yield image
+
+
+def _decoded_bytes(image: "Image.Image") -> int:
+    width, height = image.size
+    return width * height * (1 if image.mode in _COMPACT_MODES else 4)
+
+
+@dataclass(frozen=True)
+class Tile:
+    left: int
+    top: int
+    width: int
+    height: int
+    data: bytes
+
+    def to_image_box(self, bbox: List[float]) -> List[float]:
+        """Map a tile-relative 0-1 box to whole-image pixels."""
+        x_min, y_min, x_max, y_max = (min(1.0, max(0.0, value)) for value in bbox)
+        return [
+            self.left + x_min * self.width,
+            self.top + y_min * self.height,
+            self.left + x_max * self.width,
+            self.top + y_max * self.height,
+        ]
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Pixel size from the image header, or ``None`` if it cannot be read."""
+    if Image is None:
+        return None
+    try:
+        with _open_raster(data) as image:
+            return image.size
+    except (OSError, ValueError) as exc:
+        logger.warning("Could not read raster size, sending it untiled: %s", exc)
+        return None
+
+
+def _offsets(length: int, edge: int, overlap: int) -> List[int]:
+    if length <= edge:
+        return [0]
+    step = edge - overlap
+    count = math.ceil((length - overlap) / step)
+    # The last tile is pulled back so it ends exactly on the image edge.
+    return [min(index * step, length - edge) for index in range(count)]
+
+
+def cut_tiles(
+    data: bytes, *, edge: int = TILE_EDGE, overlap: int = TILE_OVERLAP
+) -> List[Tile]:
+    """Cut a raster into overlapping ``edge``-sized PNG tiles, row by row.
+
+    Raises ``ValueError`` when the decoded raster would not fit
+    ``TILE_MEMORY_BUDGET_BYTES`` (JPEGs are first decoded at 1/2, 1/4 or 1/8
+    scale in grayscale to fit).
+    """
+    if Image is None:
+        return []
+    tiles: List[Tile] = []
+    with _open_raster(data) as image:
+        width, height = image.size
+        if _decoded_bytes(image) > TILE_MEMORY_BUDGET_BYTES and image.format == "JPEG":
+            for scale in (1, 2, 4, 8):
+                if width * height // (scale * scale) <= TILE_MEMORY_BUDGET_BYTES:
+                    image.draft("L", (math.ceil(width / scale), math.ceil(height / scale)))
+                    logger.info(
+                        "Decoding %sx%s JPEG as %sx%s grayscale to fit the tiling budget",
+                        width,
+                        height,
+                        *image.size,
+                    )
+                    break
+        if _decoded_bytes(image) > TILE_MEMORY_BUDGET_BYTES:
+            raise ValueError(
+                f"Plantegningen er for stor til å behandles ({width}x{height} piksler)"
+            )
+        image.load()
+        width, height = image.size
+        for top in _offsets(height, edge, overlap):
+            for left in _offsets(width, edge, overlap):
+                box = (left, top, min(width, left + edge), min(height, top + edge))
+                buffer = io.BytesIO()
+                # Fast encode; the preprocessing stage re-encodes compactly.
+                image.crop(box).save(buffer, format="PNG", compress_level=1)
+                tiles.append(
+                    Tile(left, top, box[2] - left, box[3] - top, buffer.getvalue())
+                )
+    logger.info(
+        "Cut %sx%s raster into %s tiles of up to %s px", width, height, len(tiles), edge
+    )
+    return tiles
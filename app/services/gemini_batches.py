@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from uuid import uuid4
+
+import httpx
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+logger = logging.getLogger(__name__)
+
+BATCH_POLL_INITIAL_SECONDS = float(os.getenv("BATCH_POLL_INITIAL_SECONDS", "5"))
+BATCH_POLL_MAX_SECONDS = float(os.getenv("BATCH_POLL_MAX_SECONDS", "120"))
+BATCH_POLL_BACKOFF = 1.5
+# A worker that stops heart-beating a batch for this long loses it to another
+# worker (or to itself after a restart).
+BATCH_CLAIM_LEASE_SECONDS = float(os.getenv("BATCH_CLAIM_LEASE_SECONDS", "300"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class GeminiBatchesBackend:
+    """Gemini Batch API through the SDK's async client."""
+
+    def __init__(self, client_factory: Callable[[], genai.Client]) -> None:
+        self._client_factory = client_factory
+
+    async def create(
+        self, model: str, requests: List[types.InlinedRequest], display_name: str
+    ) -> types.BatchJob:
+        client = self._client_factory()
+        return await client.aio.batches.create(
+            model=model,
+            src=requests,
+            config=types.CreateBatchJobConfig(display_name=display_name),
+        )
+
+    async def get(self, name: str) -> types.BatchJob:
+        client = self._client_factory()
+        return await client.aio.batches.get(name=name)
+
+
+class LocalBatchesBackend:
+    """In-process stand-in for the Batch API, for tests and local runs.
+
+    ``responder`` turns each inlined request into the response text (or raises
+    to fail that item); jobs complete after ``polls_until_done`` polls.
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[types.InlinedRequest], str],
+        *,
+        polls_until_done: int = 1,
+    ) -> None:
+        self._responder = responder
+        self.polls_until_done = polls_until_done
+        self.jobs: Dict[str, List[types.InlinedRequest]] = {}
+        self._polls: Dict[str, int] = {}
+
+    async def create(
+        self, model: str, requests: List[types.InlinedRequest], display_name: str
+    ) -> types.BatchJob:
+        name = f"batches/local-{uuid4().hex[:12]}"
+        self.jobs[name] = list(requests)
+        self._polls[name] = 0
+        return types.BatchJob(
+            name=name, display_name=display_name, state=types.JobState.JOB_STATE_PENDING
+        )
+
+    async def get(self, name: str) -> types.BatchJob:
+        if name not in self.jobs:
+            raise genai_errors.ClientError(
+                404, {"error": {"message": f"{name} not found", "status": "NOT_FOUND"}}
+            )
+        self._polls[name] += 1
+        if self._polls[name] < self.polls_until_done:
+            return types.BatchJob(name=name, state=types.JobState.JOB_STATE_RUNNING)
+        responses: List[types.InlinedResponse] = []
+        for request in self.jobs[name]:
+            try:
+                text = self._responder(request)
+            except Exception as exc:  # noqa: BLE001 - becomes the item's error
+                responses.append(
+                    types.InlinedResponse(error=types.JobError(message=str(exc), code=500))
+                )
+                continue
+            responses.append(
+                types.InlinedResponse(
+                    response=types.GenerateContentResponse(
+                        candidates=[
+                            types.Candidate(
+                                content=types.Content(
+                                    role="model", parts=[types.Part(text=text)]
+                                )
+                            )
+                        ]
+                    )
+                )
+            )
+        return types.BatchJob(
+            name=name,
+            state=types.JobState.JOB_STATE_SUCCEEDED,
+            dest=types.BatchJobDestination(inlined_responses=responses),
+        )
+
+
+def _row_to_dict(row) -> Dict[str, Any]:
+    return {
+        "name": row["name"],
+        "job_id": row["job_id"],
+        "stage": row["stage"],
+        "file_ids": json.loads(row["file_ids"]),
+        "context": json.loads(row["context"]) if row["context"] else {},
+        "state": row["state"],
+        "error": row["error"],
+        "finished": bool(row["finished"]),
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def save_batch(
+    name: str,
+    *,
+    job_id: str,
+    stage: str,
+    file_ids: List[str],
+    context: Optional[Dict[str, Any]] = None,
+    state: Optional[str] = None,
+    claimed: bool = True,
+) -> None:
+    """Persist a submitted batch; ``file_ids[i]`` is the item of request ``i``.
+
+    An unclaimed batch is left for the next ``claim_stale_batches`` call.
+    """
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO gemini_batches (
+                name, job_id, stage, file_ids, context, state,
+                claimed_by, claimed_at, created_at, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                name,
+                job_id,
+                stage,
+                json.dumps(file_ids),
+                json.dumps(context or {}, ensure_ascii=True, default=str),
+                state,
+                WORKER_ID if claimed else None,
+                now if claimed else None,
+                now,
+                now,
+            ),
+        )
+        conn.commit()
+
+
+def get_batch(name: str) -> Optional[Dict[str, Any]]:
+    with get_connection() as conn:
+        row = conn.execute("SELECT * FROM gemini_batches WHERE name = ?", (name,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def find_batch(job_id: str, stage: str) -> Optional[Dict[str, Any]]:
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT * FROM gemini_batches WHERE job_id = ? AND stage = ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (job_id, stage),
+        ).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def _touch(name: str, state: Optional[str]) -> None:
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute(
+            """
+            UPDATE gemini_batches
+            SET state = COALESCE(?, state), claimed_at = ?, updated_at = ?
+            WHERE name = ? AND claimed_by = ?
+            """,
+            (state, now, now, name, WORKER_ID),
+        )
+        conn.commit()
+
+
+def mark_finished(name: str, error: Optional[str] = None) -> None:
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute(
+            """
+            UPDATE gemini_batches
+            SET finished = 1, error = ?, claimed_by = NULL, updated_at = ?
+            WHERE name = ?
+            """,
+            (error, now, name),
+        )
+        conn.commit()
+
+
+def claim_stale_batches() -> List[Dict[str, Any]]:
+    """Claim unfinished batches nobody has polled within the lease."""
+    now = time.time()
+    stale_before = now - BATCH_CLAIM_LEASE_SECONDS
+    claimed: List[Dict[str, Any]] = []
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT name FROM gemini_batches
+            WHERE finished = 0 AND (claimed_at IS NULL OR claimed_at < ?)
+            ORDER BY created_at
+            """,
+            (stale_before,),
+        ).fetchall()
+        for row in rows:
+            cursor = conn.execute(
+                """
+                UPDATE gemini_batches SET claimed_by = ?, claimed_at = ?
+                WHERE name = ? AND finished = 0 AND (claimed_at IS NULL OR claimed_at < ?)
+                """,
+                (WORKER_ID, now, row["name"], stale_before),
+            )
+            if cursor.rowcount == 1:
+                claimed.append(row["name"])
+        conn.commit()
+    return [record for name in claimed if (record := get_batch(name))]
+
+
+@asynccontextmanager
+async def keep_claim(name: str) -> AsyncIterator[None]:
+    """Renew this worker's claim on ``name`` while the block runs.
+
+    Finishing a batch (direct fallback calls, submitting the next stage) can
+    outlast the lease; without renewals another worker would adopt the batch
+    and repeat that work.
+    """
+
+    async def _renew() -> None:
+        while True:
+            await asyncio.sleep(BATCH_CLAIM_LEASE_SECONDS / 3)
+            _touch(name, None)
+
+    renewer = asyncio.create_task(_renew())
+    try:
+        yield
+    finally:
+        renewer.cancel()
+
+
+async def poll_batch(backend: Any, name: str) -> types.BatchJob:
+    """Poll until the batch ends, backing off from the initial to the max interval.
+
+    Each poll records the remote state and renews this worker's claim.
+    """
+    interval = BATCH_POLL_INITIAL_SECONDS
+    while True:
+        try:
+            job = await backend.get(name)
+        except genai_errors.APIError as exc:
+            if getattr(exc, "code", None) in {400, 401, 403, 404}:
+                raise
+            logger.warning("Polling batch %s failed, will retry: %s", name, exc)
+            job = None
+        except httpx.HTTPError as exc:
+            # Connection drops and timeouts; the remote batch keeps running.
+            logger.warning("Polling batch %s failed, will retry: %r", name, exc)
+            job = None
+        state = job.state.name if job is not None and job.state else None
+        _touch(name, state)
+        if job is not None and job.done:
+            return job
+        await asyncio.sleep(interval)
+        interval = min(interval * BATCH_POLL_BACKOFF, BATCH_POLL_MAX_SECONDS)
@@ -8,19 +8,82 @@ import logging
 import mimetypes
 import os
 import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
 
+import httpx
 from google import genai
 from google.genai import errors as genai_errors
 from google.genai import types
+from pydantic import BaseModel
 
+from app.domain.cleaning_rules import order_entries, plan_standard_rooms
 from app.domain.plan_categories import PLAN_CATEGORY_LIST, get_plan_category
-from app.models.schemas import CleaningPlan, FloorPlanExtraction, FloorPlanOptions, Room
-from app.services import config_store
+from app.domain.plan_chunks import DEFAULT_PLAN_CHUNK_SIZE, chunk_rooms, merge_plans
+from app.domain.room_merge import merge_rooms, merge_tile_rooms
+from app.models.schemas import (
+    CleaningPlan,
+    CleaningPlanEntry,
+    FloorPlanExtraction,
+    FloorPlanOptions,
+    Room,
+    TileExtraction,
+)
+from app.services import call_ledger, config_store
+from app.services.call_ledger import CallRecord
+from app.services.context_cache import ContextCacheManager
+from app.services.floorplan_preprocess import (
+    DEFAULT_MAX_EDGE,
+    FloorPlanPreprocessor,
+    PreparedDocument,
+)
+from app.services.floorplan_tiling import (
+    DEFAULT_TILE_PIXEL_THRESHOLD,
+    cut_tiles,
+    image_size,
+)
+from app.services.gemini_batches import GeminiBatchesBackend, poll_batch
+from app.services.gemini_files import FileReferenceRegistry, GeminiFilesBackend
+from app.services.json_stream import JsonArrayItemParser
+from app.services.pdf_pages import split_pdf_pages
+from app.services.plan_documents import (
+    CONVERT_PDF_PAGES_PER_CHUNK,
+    chunk_text,
+    estimate_tokens,
+)
+from app.services.rate_limiter import (
+    DEFAULT_REQUESTS_PER_MINUTE,
+    AdaptiveRateLimiter,
+    backoff_delay,
+)
+from app.services.result_cache import ResultCache, make_cache_key
 
 DEFAULT_MODEL = "gemini-3-pro-preview"
 DEFAULT_KEY_NAME = "gemini"
+DEFAULT_MAX_CONCURRENT_CALLS = 8
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_CALL_DEADLINE_SECONDS = 300.0
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_connections=32,
+    max_keepalive_connections=16,
+    keepalive_expiry=120.0,
+)
+EXTRACTION_CACHE_TTL_SECONDS = float(
+    os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(30 * 24 * 3600))
+)
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "2000"))
+EXTRACTION_CACHE_MAX_BYTES = int(
+    os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000"))
+PLAN_CACHE_MAX_BYTES = int(os.getenv("PLAN_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Settings that change a generated plan; part of the plan cache key.
+PLAN_CACHE_SETTINGS = ("temperature", "top_p", "plan_chunk_size", "local_plan_rules")
+# Settings that change what the model sees of a drawing; part of the
+# extraction cache key.
+EXTRACTION_CACHE_SETTINGS = ("media_resolution", "preprocess_images", "max_image_edge")
 
 try:
     MODALITY_TEXT = types.Modality.TEXT
@@ -29,6 +92,59 @@ except AttributeError:  # pragma: no cover - fallback if enum missing
 
 logger = logging.getLogger(__name__)
 
+_CATEGORY_LINES = "\n".join(
+    f"- {entry['id']}: {entry['en']} (norsk: {entry['no']})"
+    for entry in PLAN_CATEGORY_LIST
+)
+
+# Per-stage instruction suffix (appended to the system prompt), context cache
+# label and response model.
+STAGE_SPECS: Dict[str, tuple[str, str, Optional[type]]] = {
+    "extraction": (
+        "floorplan-analysis",
+        "Du får en plantegning som bilde eller PDF. Ekstraher et strukturert JSON-objekt med nøkkelen 'rooms'. "
+        "Hver room skal ha feltene id, name, type, floor, area_m2 (kan være null) og notes (kan være tomt). "
+        "Svar kun med JSON.",
+        FloorPlanExtraction,
+    ),
+    "tile_extraction": (
+        "floorplan-tile-analysis",
+        "Du får ett utsnitt (en flis) av en stor plantegning. Ekstraher et strukturert JSON-objekt med nøkkelen 'rooms' "
+        "for rommene som er synlige i utsnittet, også rom som bare delvis er med. "
+        "Hver room skal ha feltene id, name, type, floor, area_m2 (kan være null), notes (kan være tomt) og bbox: "
+        "[x_min, y_min, x_max, y_max] for rommets synlige del som andel (0-1) av utsnittets bredde og høyde. "
+        "Bruk romnummeret på tegningen som id når det finnes. "
+        "Svar kun med JSON.",
+        TileExtraction,
+    ),
+    "detection": (
+        "plan-category-detection",
+        "Du får en plantegning som bilde eller PDF. "
+        "Velg nøyaktig én kategori som best beskriver bygget basert på listen under. "
+        "Svar som JSON med formatet {\"category_id\": \"office\"}.\n"
+        "Tillatte kategorier:\n"
+        f"{_CATEGORY_LINES}",
+        None,
+    ),
+    "generation": (
+        "plan-generation",
+        "Du får en liste med rom i JSON-format. Returner et JSON-objekt med nøklene 'entries', "
+        "'total_area_m2' og 'template_name'. "
+        "Hver entry skal inneholde room_name, area_m2, floor, description, frequency (map med MAN..SON), "
+        "og optional notes. Svar kun som JSON.",
+        CleaningPlan,
+    ),
+    "conversion": (
+        "plan-converter",
+        "Normaliser teksten til Cleansync-standard og returner JSON med samme format som generate_plan "
+        "(entries/total_area_m2/template_name).",
+        CleaningPlan,
+    ),
+}
+
+T = TypeVar("T")
+EntryCallback = Callable[[CleaningPlanEntry], Awaitable[None]]
+
 
 class GeminiServiceError(RuntimeError):
     def __init__(
@@ -38,11 +154,41 @@ class GeminiServiceError(RuntimeError):
         status_code: Optional[int] = None,
         reason: Optional[str] = None,
         is_retryable: bool = False,
+        retry_after: Optional[float] = None,
     ) -> None:
         super().__init__(message)
         self.status_code = status_code
         self.reason = reason
         self.is_retryable = is_retryable
+        self.retry_after = retry_after
+
+
+def _content_bytes(contents: List[types.Content]) -> int:
+    total = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                total += len(part.text.encode("utf-8"))
+            if part.inline_data is not None and part.inline_data.data:
+                total += len(part.inline_data.data)
+    return total
+
+
+@dataclass(frozen=True)
+class StageArtifacts:
+    """Request inputs for one pipeline stage that only change with the config.
+
+    Built once per ``config_store.config_version()`` so a model call only
+    assembles its per-request parts.
+    """
+
+    stage: str
+    label: str
+    instruction: str
+    instruction_part: types.Part
+    cache_key: str
+    instruction_sha256: str
+    config: types.GenerateContentConfig
 
 
 class GeminiClient:
@@ -61,11 +207,75 @@ class GeminiClient:
         self._client: Optional[genai.Client] = None
         self._cached_key: Optional[str] = None
         self._prompt_path = prompt_file
-        self._context_cache_ids: Dict[str, str] = {}
+        self.context_cache = ContextCacheManager(self._get_client, self.model_name)
+        self.file_refs = FileReferenceRegistry(GeminiFilesBackend(self._get_client))
+        self.batch_backend = GeminiBatchesBackend(self._get_client)
+        self.rate_limiter = AdaptiveRateLimiter()
+        self.preprocessor = FloorPlanPreprocessor()
+        self._call_semaphore: Optional[asyncio.Semaphore] = None
+        self._call_limit = 0
+        self._artifacts: Dict[str, StageArtifacts] = {}
+        self._settings_snapshot: Dict[str, Any] = {}
+        self._artifacts_version: Optional[int] = None
+        self.extraction_cache = ResultCache(
+            "floorplan-extraction",
+            ttl_seconds=EXTRACTION_CACHE_TTL_SECONDS,
+            max_entries=EXTRACTION_CACHE_MAX_ENTRIES,
+            max_bytes=EXTRACTION_CACHE_MAX_BYTES,
+        )
+        self.plan_cache = ResultCache(
+            "plan-generation",
+            ttl_seconds=PLAN_CACHE_TTL_SECONDS,
+            max_entries=PLAN_CACHE_MAX_ENTRIES,
+            max_bytes=PLAN_CACHE_MAX_BYTES,
+        )
 
     def _get_prompt_text(self) -> str:
         return config_store.get_system_prompt_text(self.default_prompt_text)
 
+    def _refresh_artifacts(self) -> None:
+        version = config_store.config_version()
+        if version == self._artifacts_version:
+            return
+        settings = config_store.get_gemini_config()
+        base_prompt = self._get_prompt_text()
+        self._artifacts = {
+            stage: self._compile_stage(stage, base_prompt, settings)
+            for stage in STAGE_SPECS
+        }
+        self._settings_snapshot = settings
+        self._artifacts_version = version
+
+    def _compile_stage(
+        self, stage: str, base_prompt: str, settings: Dict[str, Any]
+    ) -> StageArtifacts:
+        label, suffix, response_model = STAGE_SPECS[stage]
+        instruction = f"{base_prompt}\n{suffix}"
+        return StageArtifacts(
+            stage=stage,
+            label=label,
+            instruction=instruction,
+            instruction_part=types.Part(text=instruction),
+            cache_key=self._cache_key(label, instruction),
+            instruction_sha256=hashlib.sha256(instruction.encode("utf-8")).hexdigest(),
+            config=self._build_generation_config(
+                settings,
+                response_mime_type="application/json",
+                response_json_schema=(
+                    response_model.model_json_schema() if response_model else None
+                ),
+            ),
+        )
+
+    def _stage_artifacts(self, stage: str) -> StageArtifacts:
+        self._refresh_artifacts()
+        return self._artifacts[stage]
+
+    def _settings(self) -> Dict[str, Any]:
+        """``gemini_config`` as of the current config version; do not mutate."""
+        self._refresh_artifacts()
+        return self._settings_snapshot
+
     def _resolve_api_key(self) -> str:
         env_value = os.getenv("GEMINI_API_KEY")
         if env_value:
@@ -80,22 +290,151 @@ class GeminiClient:
     def _get_client(self) -> genai.Client:
         key = self._resolve_api_key()
         if self._client is None or self._cached_key != key:
+            # One pooled async HTTP client per API key; every aio call shares
+            # its keep-alive connections.
             self._client = genai.Client(
-                api_key=key, http_options={"api_version": "v1alpha"}
+                api_key=key,
+                http_options=types.HttpOptions(
+                    api_version="v1alpha",
+                    async_client_args={"limits": HTTP_POOL_LIMITS},
+                ),
             )
             self._cached_key = key
         return self._client
 
+    def _get_call_semaphore(self) -> asyncio.Semaphore:
+        configured = self._settings().get("max_concurrent_calls")
+        try:
+            limit = int(configured) if configured else DEFAULT_MAX_CONCURRENT_CALLS
+        except (TypeError, ValueError):
+            limit = DEFAULT_MAX_CONCURRENT_CALLS
+        limit = max(1, limit)
+        if self._call_semaphore is None or self._call_limit != limit:
+            # Calls already holding the previous semaphore finish normally.
+            self._call_semaphore = asyncio.Semaphore(limit)
+            self._call_limit = limit
+        return self._call_semaphore
+
+    def _key_scope(self) -> str:
+        self._get_client()
+        return hashlib.sha256((self._cached_key or "").encode("utf-8")).hexdigest()[:16]
+
+    async def _document_part(
+        self,
+        data: bytes,
+        mime: str,
+        display_name: str,
+        media_kwargs: Dict[str, Any],
+        *,
+        refresh: bool = False,
+    ) -> types.Part:
+        if self._settings().get("use_file_api", True):
+            try:
+                handle = await self.file_refs.resolve(
+                    data,
+                    mime,
+                    display_name,
+                    scope=self._key_scope(),
+                    refresh=refresh,
+                )
+            except (genai_errors.APIError, RuntimeError) as exc:
+                logger.warning(
+                    "Files API upload failed for %s, sending inline: %s",
+                    display_name,
+                    exc,
+                )
+            else:
+                return types.Part(
+                    file_data=types.FileData(
+                        file_uri=handle.uri, mime_type=handle.mime_type
+                    ),
+                    **media_kwargs,
+                )
+        return types.Part(
+            inline_data=types.Blob(mime_type=mime, data=data),
+            **media_kwargs,
+        )
+
+    async def _prepare_document(
+        self, data: bytes, mime: str, display_name: str, *, crop: bool = True
+    ) -> PreparedDocument:
+        settings = self._settings()
+        if not settings.get("preprocess_images", True):
+            return PreparedDocument(data, mime)
+        max_edge = int(settings.get("max_image_edge") or DEFAULT_MAX_EDGE)
+        return await asyncio.to_thread(
+            self.preprocessor.prepare,
+            data,
+            mime,
+            name=display_name,
+            max_edge=max_edge,
+            crop=crop,
+        )
+
+    @staticmethod
+    def _default_media_level(mime: str) -> Optional[str]:
+        if mime.startswith("image/"):
+            return "high"
+        if mime == "application/pdf":
+            return "medium"
+        return None
+
+    async def _call_model_with_document(
+        self,
+        leading_parts: List[types.Part],
+        data: bytes,
+        mime: str,
+        display_name: str,
+        media_kwargs: Dict[str, Any],
+        **call_kwargs: Any,
+    ) -> str:
+        for attempt in range(2):
+            if attempt and call_kwargs.get("cached_content"):
+                # The 403/404 may have come from the cache as well; the retry
+                # carries the instruction inline rather than the old cache.
+                leading_parts = [
+                    self._stage_artifacts(call_kwargs["stage"]).instruction_part,
+                    *leading_parts,
+                ]
+                call_kwargs = {**call_kwargs, "cached_content": None}
+            document = await self._document_part(
+                data, mime, display_name, media_kwargs, refresh=attempt > 0
+            )
+            content = types.Content(role="user", parts=[*leading_parts, document])
+            # A file_data part only carries a URI; count the document itself.
+            input_bytes = _content_bytes([content]) + (
+                len(data) if document.file_data is not None else 0
+            )
+            try:
+                return await self._call_model(
+                    [content], input_bytes=input_bytes, **call_kwargs
+                )
+            except GeminiServiceError as exc:
+                stale_handle = document.file_data is not None and exc.status_code in {403, 404}
+                if attempt or not stale_handle:
+                    raise
+                logger.info("Gemini rejected file handle for %s; re-uploading", display_name)
+        raise AssertionError("unreachable")  # pragma: no cover
+
     @staticmethod
     def _cache_key(label: str, payload: str) -> str:
         digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
         return f"{label}:{digest}"
 
     async def _ensure_cached_instruction(
-        self, label: str, instruction_text: str
+        self, artifacts: StageArtifacts
     ) -> Optional[str]:
-        # Context caching requires additional Gemini privileges; disabled for now.
-        return None
+        if not self._settings().get("context_cache", True):
+            return None
+        return await self.context_cache.ensure(
+            artifacts.cache_key,
+            artifacts.label,
+            artifacts.instruction,
+            scope=self._key_scope(),
+        )
+
+    def invalidate_context_caches(self) -> None:
+        self.context_cache.invalidate_all()
 
     @staticmethod
     def _media_resolution_value(
@@ -126,8 +465,11 @@ class GeminiClient:
 
     @staticmethod
     def _translate_api_error(exc: genai_errors.APIError) -> GeminiServiceError:
-        status_code = getattr(exc, "status_code", None)
+        status_code = getattr(exc, "status_code", None) or getattr(exc, "code", None)
         response_json = getattr(exc, "response_json", None)
+        if response_json is None:
+            # google-genai keeps the parsed error body on ``details``.
+            response_json = getattr(exc, "details", None)
         if response_json is None:
             response = getattr(exc, "response", None)
             if response is not None:
@@ -137,13 +479,23 @@ class GeminiClient:
                     response_json = None
 
         reason: Optional[str] = None
+        retry_after: Optional[float] = None
         message = str(exc)
         if isinstance(response_json, dict):
             error_payload = response_json.get("error") or response_json
             message = error_payload.get("message") or message
             reason = error_payload.get("status") or error_payload.get("code") or reason
+            for detail in error_payload.get("details") or []:
+                if isinstance(detail, dict) and str(detail.get("@type", "")).endswith(
+                    "RetryInfo"
+                ):
+                    retry_after = GeminiClient._parse_seconds(detail.get("retryDelay"))
         elif hasattr(exc, "message"):
             message = getattr(exc, "message") or message
+        if retry_after is None:
+            headers = getattr(getattr(exc, "response", None), "headers", None)
+            if headers is not None:
+                retry_after = GeminiClient._parse_seconds(headers.get("retry-after"))
 
         retryable_status = {408, 425, 429, 500, 502, 503, 504}
         is_retryable = status_code in retryable_status
@@ -159,14 +511,26 @@ class GeminiClient:
             status_code=status_code,
             reason=reason,
             is_retryable=is_retryable,
+            retry_after=retry_after,
         )
 
+    @staticmethod
+    def _parse_seconds(value: Any) -> Optional[float]:
+        if value is None:
+            return None
+        text = str(value).strip().lower().rstrip("s")
+        try:
+            seconds = float(text)
+        except ValueError:
+            return None
+        return seconds if seconds >= 0 else None
+
     def _build_generation_config(
         self,
+        overrides: Dict[str, Any],
         *,
         response_mime_type: Optional[str] = None,
         response_json_schema: Optional[Dict[str, Any]] = None,
-        cached_content: Optional[str] = None,
     ) -> types.GenerateContentConfig:
         base_config = types.GenerateContentConfig(
             response_modalities=[MODALITY_TEXT],
@@ -179,7 +543,6 @@ class GeminiClient:
             "model_fields",
             getattr(types.GenerateContentConfig, "__fields__", {}),
         )
-        overrides = config_store.get_gemini_config()
         if overrides.get("temperature") is not None:
             config_data["temperature"] = overrides["temperature"]
         if overrides.get("top_p") is not None:
@@ -188,45 +551,203 @@ class GeminiClient:
             config_data["response_mime_type"] = response_mime_type
         if response_json_schema and "response_json_schema" in config_fields:
             config_data["response_json_schema"] = response_json_schema
-        if cached_content:
-            config_data["cached_content"] = cached_content
         return types.GenerateContentConfig(**config_data)
 
+    def _generation_config(
+        self, stage: str, cached_content: Optional[str] = None
+    ) -> types.GenerateContentConfig:
+        config = self._stage_artifacts(stage).config
+        if cached_content:
+            # Shallow copy; the precompiled schema dict is shared, not rebuilt.
+            return config.model_copy(update={"cached_content": cached_content})
+        return config
+
     async def _call_model(
         self,
         contents: List[types.Content],
         *,
-        response_mime_type: Optional[str] = None,
-        response_json_schema: Optional[Dict[str, Any]] = None,
+        stage: str,
         cached_content: Optional[str] = None,
+        input_bytes: Optional[int] = None,
     ) -> str:
-        def _run() -> str:
-            client = self._get_client()
-            config = self._build_generation_config(
-                response_mime_type=response_mime_type,
-                response_json_schema=response_json_schema,
-                cached_content=cached_content,
+        client = self._get_client()
+        config = self._generation_config(stage, cached_content)
+        if logger.isEnabledFor(logging.DEBUG):  # pragma: no cover - debug only
+            logger.debug(
+                "Calling model %s with config: %s",
+                self.model_name,
+                config.model_dump(exclude_none=True),
             )
-            if logger.isEnabledFor(logging.DEBUG):  # pragma: no cover - debug only
-                logger.debug(
-                    "Calling model %s with config: %s",
-                    self.model_name,
-                    config.model_dump(exclude_none=True),
-                )
-            response = client.models.generate_content(
+        record = CallRecord(
+            stage=stage,
+            model=self.model_name,
+            input_bytes=input_bytes if input_bytes is not None else _content_bytes(contents),
+        )
+
+        async def _send(cached: Optional[str]) -> types.GenerateContentResponse:
+            request_contents, request_config = contents, config
+            if cached is None and cached_content is not None:
+                request_contents, request_config = self._uncached_request(contents, stage)
+            response = await client.aio.models.generate_content(
                 model=self.model_name,
-                contents=contents,
-                config=config,
+                contents=request_contents,
+                config=request_config,
             )
-            # Thought signatures are managed by the SDK for these single-turn calls.
-            return getattr(response, "text", None) or getattr(
-                response, "output_text", ""
+            record.capture_usage(getattr(response, "usage_metadata", None))
+            return response
+
+        response = await self._with_retries(
+            _send, record=record, cached_content=cached_content
+        )
+        # Thought signatures are managed by the SDK for these single-turn calls.
+        return getattr(response, "text", None) or getattr(response, "output_text", "")
+
+    async def _call_model_streaming(
+        self,
+        contents: List[types.Content],
+        *,
+        item_key: str,
+        on_item: Callable[[Dict[str, Any]], Awaitable[None]],
+        stage: str,
+        cached_content: Optional[str] = None,
+    ) -> str:
+        client = self._get_client()
+        config = self._generation_config(stage, cached_content)
+        record = CallRecord(
+            stage=stage, model=self.model_name, input_bytes=_content_bytes(contents)
+        )
+
+        async def _consume(cached: Optional[str]) -> str:
+            request_contents, request_config = contents, config
+            if cached is None and cached_content is not None:
+                request_contents, request_config = self._uncached_request(contents, stage)
+            parser = JsonArrayItemParser(item_key)
+            chunks: List[str] = []
+            stream = await client.aio.models.generate_content_stream(
+                model=self.model_name,
+                contents=request_contents,
+                config=request_config,
             )
+            try:
+                async for chunk in stream:
+                    # Usage is cumulative; the last chunk carries the totals.
+                    record.capture_usage(getattr(chunk, "usage_metadata", None))
+                    text = getattr(chunk, "text", None) or ""
+                    chunks.append(text)
+                    for item in parser.feed(text):
+                        await on_item(item)
+            except genai_errors.APIError as exc:
+                if parser.emitted:
+                    # Items already reached the caller; a retry would replay them.
+                    raise self._translate_api_error(exc) from exc
+                raise
+            return "".join(chunks)
+
+        return await self._with_retries(
+            _consume, record=record, cached_content=cached_content
+        )
 
+    def _uncached_request(
+        self, contents: List[types.Content], stage: str
+    ) -> tuple[List[types.Content], types.GenerateContentConfig]:
+        """``contents`` and config with the stage instruction sent inline,
+        for when the context cache that carried it is gone."""
+        first, *rest = contents
+        inline = types.Content(
+            role=first.role,
+            parts=[self._stage_artifacts(stage).instruction_part, *(first.parts or [])],
+        )
+        return [inline, *rest], self._generation_config(stage, None)
+
+    async def _with_retries(
+        self,
+        send: Callable[[Optional[str]], Awaitable[T]],
+        *,
+        record: CallRecord,
+        cached_content: Optional[str] = None,
+    ) -> T:
+        """Run ``send`` with retries and write one ``gemini_calls`` ledger row.
+
+        ``send`` gets the context cache to use; it is called with ``None``
+        once the cache turned out to be gone and must then inline the
+        instruction.
+        """
         try:
-            return await asyncio.to_thread(_run)
-        except genai_errors.APIError as exc:
-            raise self._translate_api_error(exc) from exc
+            return await self._retry_loop(send, record, cached_content)
+        except GeminiServiceError as exc:
+            record.outcome = "timeout" if exc.reason == "DEADLINE_EXCEEDED" else "error"
+            record.status_code = exc.status_code
+            raise
+        except asyncio.CancelledError:
+            record.outcome = "cancelled"
+            raise
+        except Exception:
+            record.outcome = "error"
+            raise
+        finally:
+            call_ledger.record_call(record)
+
+    async def _retry_loop(
+        self,
+        send: Callable[[Optional[str]], Awaitable[T]],
+        record: CallRecord,
+        cached_content: Optional[str],
+    ) -> T:
+        settings = self._settings()
+        max_retries = settings.get("max_retries")
+        if max_retries is None:
+            max_retries = DEFAULT_MAX_RETRIES
+        deadline_seconds = settings.get("call_deadline_seconds") or DEFAULT_CALL_DEADLINE_SECONDS
+        self.rate_limiter.configure(
+            settings.get("requests_per_minute") or DEFAULT_REQUESTS_PER_MINUTE
+        )
+        attempt = 0
+        while True:
+            # Waiting for a token and a call slot is not part of the call:
+            # the deadline and the ledger latency start once it is sent.
+            await self.rate_limiter.acquire()
+            async with self._get_call_semaphore():
+                if attempt == 0:
+                    record.started = time.perf_counter()
+                try:
+                    async with asyncio.timeout(float(deadline_seconds)):
+                        result = await send(cached_content)
+                except TimeoutError as exc:
+                    raise GeminiServiceError(
+                        "Gemini svarte ikke innen tidsfristen.",
+                        status_code=504,
+                        reason="DEADLINE_EXCEEDED",
+                    ) from exc
+                except genai_errors.APIError as exc:
+                    failure = exc
+                else:
+                    self.rate_limiter.on_success()
+                    return result
+            if cached_content and getattr(failure, "code", None) in {403, 404}:
+                # The cache expired or was evicted server-side: recreate it on
+                # the next call, and resend this one once without it.
+                self.context_cache.forget(cached_content)
+                logger.info("Context cache %s is gone; resending inline", cached_content)
+                cached_content = None
+                attempt += 1
+                record.retries = attempt
+                continue
+            error = self._translate_api_error(failure)
+            if error.status_code == 429:
+                self.rate_limiter.on_throttle(error.retry_after)
+            if not error.is_retryable or attempt >= max_retries:
+                raise error from failure
+            delay = backoff_delay(attempt, retry_after=error.retry_after)
+            attempt += 1
+            record.retries = attempt
+            logger.info(
+                "Retrying Gemini call in %.1f s (attempt %s/%s, status=%s)",
+                delay,
+                attempt,
+                max_retries,
+                error.status_code,
+            )
+            await asyncio.sleep(delay)
 
     @staticmethod
     def _to_bool(value: Any) -> bool:
@@ -240,16 +761,111 @@ class GeminiClient:
         file_bytes = file_path.read_bytes()
         mime_type, _ = mimetypes.guess_type(file_path.name)
         mime = mime_type or "application/octet-stream"
-        base_prompt = self._get_prompt_text()
-        base_instruction = (
-            f"{base_prompt}\n"
-            "Du får en plantegning som bilde eller PDF. Ekstraher et strukturert JSON-objekt med nøkkelen 'rooms'. "
-            "Hver room skal ha feltene id, name, type, floor, area_m2 (kan være null) og notes (kan være tomt). "
-            "Svar kun med JSON."
+        if mime.startswith("image/"):
+            size = image_size(file_bytes)
+            threshold = int(
+                self._settings().get("tile_pixel_threshold") or DEFAULT_TILE_PIXEL_THRESHOLD
+            )
+            if size and size[0] * size[1] > threshold:
+                return await self._extract_tiled_rooms(file_bytes, file_path.name, options)
+        pages: List[bytes] = []
+        if mime == "application/pdf" and self._settings().get("split_pdf_pages", True):
+            pages = await asyncio.to_thread(split_pdf_pages, file_bytes)
+        if len(pages) < 2:
+            return await self._extract_document_rooms(
+                file_bytes, mime, file_path.name, options
+            )
+        logger.info("Extracting %s page by page (%s pages)", file_path.name, len(pages))
+        # Pages run concurrently; the shared call semaphore bounds the fan-out.
+        page_rooms = await asyncio.gather(
+            *(
+                self._extract_document_rooms(
+                    page, mime, f"{file_path.name} (page {number})", options
+                )
+                for number, page in enumerate(pages, start=1)
+            )
+        )
+        return merge_rooms(
+            [room.model_copy(update={"source_page": number}) for room in rooms]
+            for number, rooms in enumerate(page_rooms, start=1)
+        )
+
+    async def _extract_tiled_rooms(
+        self, file_bytes: bytes, display_name: str, options: FloorPlanOptions
+    ) -> List[Room]:
+        tiles = await asyncio.to_thread(cut_tiles, file_bytes)
+        tile_rooms = await asyncio.gather(
+            *(
+                self._extract_document_rooms(
+                    tile.data,
+                    "image/png",
+                    f"{display_name} (tile {number})",
+                    options,
+                    stage="tile_extraction",
+                )
+                for number, tile in enumerate(tiles, start=1)
+            )
+        )
+        placed = [
+            [
+                room.model_copy(
+                    update={
+                        "bbox": tile.to_image_box(room.bbox)
+                        if room.bbox and len(room.bbox) == 4
+                        else None
+                    }
+                )
+                for room in rooms
+            ]
+            for tile, rooms in zip(tiles, tile_rooms)
+        ]
+        merged = merge_tile_rooms(placed)
+        return [Room.model_validate(room.model_dump(exclude={"bbox"})) for room in merged]
+
+    async def _extract_document_rooms(
+        self,
+        file_bytes: bytes,
+        mime: str,
+        display_name: str,
+        options: FloorPlanOptions,
+        *,
+        stage: str = "extraction",
+    ) -> List[Room]:
+        response_model = STAGE_SPECS[stage][2]
+        artifacts = self._stage_artifacts(stage)
+        overrides = self._settings()
+        extraction_key = self._extraction_cache_key(
+            file_bytes, options, artifacts.instruction_sha256, overrides
+        )
+        cached_rooms = self.extraction_cache.get(extraction_key)
+        if cached_rooms is not None:
+            logger.info("Floor plan extraction cache hit for %s", display_name)
+            return response_model.model_validate_json(cached_rooms).rooms
+        cached_instruction = await self._ensure_cached_instruction(artifacts)
+        parts = self._extraction_parts(
+            artifacts, options, inline_instruction=cached_instruction is None
         )
-        cached_instruction = await self._ensure_cached_instruction(
-            "floorplan-analysis", base_instruction
+        # Tile boxes are relative to the tile, so tiles must not be cropped.
+        document, inline_kwargs = await self._extraction_document(
+            file_bytes, mime, display_name, crop=stage != "tile_extraction"
+        )
+        raw_response = await self._call_model_with_document(
+            parts,
+            document.data,
+            document.mime_type,
+            display_name,
+            inline_kwargs,
+            stage=stage,
+            cached_content=cached_instruction,
         )
+        extraction = response_model.model_validate_json(raw_response)
+        self.extraction_cache.put(extraction_key, extraction.model_dump_json())
+        return extraction.rooms
+
+    @staticmethod
+    def _extraction_parts(
+        artifacts: StageArtifacts, options: FloorPlanOptions, *, inline_instruction: bool
+    ) -> List[types.Part]:
         details = [
             f"has_room_names={options.has_room_names}, has_area={options.has_area}, reference_unit={options.reference_unit}."
         ]
@@ -275,44 +891,51 @@ class GeminiClient:
                 "reference_width": options.reference_width,
             }
         }
-        overrides = config_store.get_gemini_config()
-        override_media = self._media_resolution_value(overrides.get("media_resolution"))
         parts: List[types.Part] = []
-        if cached_instruction is None:
-            parts.append(types.Part(text=base_instruction))
-        media_level = None
-        if mime.startswith("image/"):
-            media_level = self._media_resolution_value("high")
-        elif mime == "application/pdf":
-            media_level = self._media_resolution_value("medium")
-        resolved_media = override_media or media_level
-        inline_kwargs: Dict[str, Any] = {}
-        if resolved_media is not None:
-            inline_kwargs["media_resolution"] = types.PartMediaResolution(
-                level=resolved_media
-            )
+        if inline_instruction:
+            parts.append(artifacts.instruction_part)
         parts.extend(
             [
                 types.Part(text=json.dumps(config_payload, ensure_ascii=True)),
                 types.Part(text="\n".join(details)),
-                types.Part(
-                    inline_data=types.Blob(
-                        mime_type=mime,
-                        data=file_bytes,
-                    ),
-                    **inline_kwargs,
-                ),
             ]
         )
-        content = types.Content(role="user", parts=parts)
-        raw_response = await self._call_model(
-            [content],
-            response_mime_type="application/json",
-            response_json_schema=FloorPlanExtraction.model_json_schema(),
-            cached_content=cached_instruction,
+        return parts
+
+    async def _extraction_document(
+        self, file_bytes: bytes, mime: str, display_name: str, *, crop: bool = True
+    ) -> tuple[PreparedDocument, Dict[str, Any]]:
+        override_media = self._media_resolution_value(
+            self._settings().get("media_resolution")
+        )
+        document = await self._prepare_document(file_bytes, mime, display_name, crop=crop)
+        media_level = self._media_resolution_value(
+            document.media_resolution or self._default_media_level(mime)
+        )
+        resolved_media = override_media or media_level
+        inline_kwargs: Dict[str, Any] = {}
+        if resolved_media is not None:
+            inline_kwargs["media_resolution"] = types.PartMediaResolution(
+                level=resolved_media
+            )
+        return document, inline_kwargs
+
+    def _extraction_cache_key(
+        self,
+        file_bytes: bytes,
+        options: FloorPlanOptions,
+        instruction_sha256: str,
+        settings: Dict[str, Any],
+    ) -> str:
+        # plan_category is not part of the extraction prompt, so it must not
+        # split the cache.
+        return make_cache_key(
+            hashlib.sha256(file_bytes).hexdigest(),
+            options.model_dump(mode="json", exclude={"plan_category"}),
+            instruction_sha256,
+            self.model_name,
+            {name: settings.get(name) for name in EXTRACTION_CACHE_SETTINGS},
         )
-        extraction = FloorPlanExtraction.model_validate_json(raw_response)
-        return extraction.rooms
 
     async def analyze_template(self, template_path: Path) -> str:
         return template_path.stem.replace("_", " ")
@@ -321,47 +944,26 @@ class GeminiClient:
         file_bytes = file_path.read_bytes()
         mime_type, _ = mimetypes.guess_type(file_path.name)
         mime = mime_type or "application/octet-stream"
-        categories_lines = "\n".join(
-            f"- {entry['id']}: {entry['en']} (norsk: {entry['no']})"
-            for entry in PLAN_CATEGORY_LIST
-        )
-        base_prompt = self._get_prompt_text()
-        instruction = (
-            f"{base_prompt}\n"
-            "Du får en plantegning som bilde eller PDF. "
-            "Velg nøyaktig én kategori som best beskriver bygget basert på listen under. "
-            "Svar som JSON med formatet {\"category_id\": \"office\"}.\n"
-            "Tillatte kategorier:\n"
-            f"{categories_lines}"
-        )
-        cached_instruction = await self._ensure_cached_instruction(
-            "plan-category-detection", instruction
-        )
+        artifacts = self._stage_artifacts("detection")
+        cached_instruction = await self._ensure_cached_instruction(artifacts)
         parts: List[types.Part] = []
         if cached_instruction is None:
-            parts.append(types.Part(text=instruction))
+            parts.append(artifacts.instruction_part)
+        # Same preprocessed bytes as extraction, so both stages share one upload.
+        document = await self._prepare_document(file_bytes, mime, file_path.name)
         inline_kwargs: Dict[str, Any] = {}
-        if mime.startswith("image/"):
-            inline_kwargs["media_resolution"] = types.PartMediaResolution(
-                level=self._media_resolution_value("high")
-            )
-        elif mime == "application/pdf":
+        media_level = document.media_resolution or self._default_media_level(mime)
+        if media_level:
             inline_kwargs["media_resolution"] = types.PartMediaResolution(
-                level=self._media_resolution_value("medium")
+                level=self._media_resolution_value(media_level)
             )
-        parts.append(
-            types.Part(
-                inline_data=types.Blob(
-                    mime_type=mime,
-                    data=file_bytes,
-                ),
-                **inline_kwargs,
-            )
-        )
-        content = types.Content(role="user", parts=parts)
-        raw_response = await self._call_model(
-            [content],
-            response_mime_type="application/json",
+        raw_response = await self._call_model_with_document(
+            parts,
+            document.data,
+            document.mime_type,
+            file_path.name,
+            inline_kwargs,
+            stage="detection",
             cached_content=cached_instruction,
         )
         try:
@@ -378,21 +980,15 @@ class GeminiClient:
         plan_payload: str,
         template_label: str,
         plan_category_id: Optional[str] = None,
+        use_context_cache: bool = True,
     ) -> tuple[List[types.Part], Optional[str]]:
-        base_prompt = self._get_prompt_text()
-        base_instruction = (
-            f"{base_prompt}\n"
-            "Du får en liste med rom i JSON-format. Returner et JSON-objekt med nøklene 'entries', "
-            "'total_area_m2' og 'template_name'. "
-            "Hver entry skal inneholde room_name, area_m2, floor, description, frequency (map med MAN..SON), "
-            "og optional notes. Svar kun som JSON."
-        )
-        cached_instruction = await self._ensure_cached_instruction(
-            "plan-generation", base_instruction
-        )
+        artifacts = self._stage_artifacts("generation")
+        cached_instruction = None
+        if use_context_cache:
+            cached_instruction = await self._ensure_cached_instruction(artifacts)
         parts: List[types.Part] = []
         if cached_instruction is None:
-            parts.append(types.Part(text=base_instruction))
+            parts.append(artifacts.instruction_part)
         category_instruction = None
         if plan_category_id:
             category_entry = get_plan_category(plan_category_id)
@@ -416,45 +1012,188 @@ class GeminiClient:
         rooms: List[Room],
         template_name: Optional[str] = None,
         plan_category_id: Optional[str] = None,
+        on_entry: Optional[EntryCallback] = None,
+        on_cache_hit: Optional[Callable[[], None]] = None,
     ) -> CleaningPlan:
-        rooms_payload = [room.model_dump() for room in rooms]
+        """Generate a plan; with ``on_entry`` the response is streamed and each
+        entry is handed over as soon as its JSON object is complete.
+
+        Plans are cached on the room set, category, template, prompt and model
+        settings; ``on_cache_hit`` is called when the cache served the plan.
+
+        Rooms of the types the system prompt gives a standard description for
+        are planned locally by ``cleaning_rules``; only the rest go to the model. Room lists above
+        ``plan_chunk_size`` are split by floor and generated concurrently,
+        then merged with the total area recomputed locally.
+        """
         template_label = template_name or "Cleansync Standard"
+        cache_key = self._plan_cache_key(rooms, template_label, plan_category_id)
+        cached_plan = self.plan_cache.get(cache_key)
+        if cached_plan is not None:
+            logger.info("Plan cache hit for %s rooms", len(rooms))
+            plan = CleaningPlan.model_validate_json(cached_plan)
+            if on_entry is not None:
+                for entry in plan.entries:
+                    await on_entry(entry)
+            if on_cache_hit is not None:
+                on_cache_hit()
+            return plan
+        plan = await self._generate_plan(rooms, template_label, plan_category_id, on_entry)
+        self.plan_cache.put(cache_key, plan.model_dump_json())
+        return plan
+
+    def _plan_cache_key(
+        self, rooms: List[Room], template_label: str, plan_category_id: Optional[str]
+    ) -> str:
+        # Canonical room set: extraction order and page provenance do not
+        # change the plan.
+        room_set = sorted(
+            json.dumps(
+                room.model_dump(mode="json", exclude={"source_page"}),
+                ensure_ascii=True,
+                sort_keys=True,
+            )
+            for room in rooms
+        )
+        settings = self._settings()
+        return make_cache_key(
+            hashlib.sha256("\n".join(room_set).encode("utf-8")).hexdigest(),
+            plan_category_id,
+            template_label,
+            self._stage_artifacts("generation").instruction_sha256,
+            self.model_name,
+            {name: settings.get(name) for name in PLAN_CACHE_SETTINGS},
+        )
+
+    async def _generate_plan(
+        self,
+        rooms: List[Room],
+        template_label: str,
+        plan_category_id: Optional[str],
+        on_entry: Optional[EntryCallback],
+    ) -> CleaningPlan:
+        if not self._settings().get("local_plan_rules", True):
+            return await self._generate_model_plan(
+                rooms, template_label, plan_category_id, on_entry
+            )
+        local_entries, unclassified = plan_standard_rooms(
+            rooms, self._get_prompt_text(), plan_category_id
+        )
+        logger.info(
+            "Planned %s of %s rooms locally, %s left for the model",
+            len(local_entries),
+            len(rooms),
+            len(unclassified),
+        )
+        if on_entry is not None:
+            for entry in local_entries:
+                await on_entry(entry)
+        plans = [
+            CleaningPlan(
+                entries=local_entries, total_area_m2=0, template_name=template_label
+            )
+        ]
+        if unclassified:
+            plans.append(
+                await self._generate_model_plan(
+                    unclassified, template_label, plan_category_id, on_entry
+                )
+            )
+        plan = merge_plans(plans)
+        return plan.model_copy(update={"entries": order_entries(plan.entries, rooms)})
+
+    async def _generate_model_plan(
+        self,
+        rooms: List[Room],
+        template_label: str,
+        plan_category_id: Optional[str],
+        on_entry: Optional[EntryCallback],
+    ) -> CleaningPlan:
+        chunk_size = self._settings().get("plan_chunk_size") or DEFAULT_PLAN_CHUNK_SIZE
+        if len(rooms) <= chunk_size:
+            return await self._generate_plan_chunk(
+                rooms, template_label, plan_category_id, on_entry
+            )
+        chunks = chunk_rooms(rooms, chunk_size)
+        logger.info(
+            "Generating plan for %s rooms in %s chunks of up to %s",
+            len(rooms),
+            len(chunks),
+            chunk_size,
+        )
+        plans = await asyncio.gather(
+            *(
+                self._generate_plan_chunk(chunk, template_label, plan_category_id, on_entry)
+                for chunk in chunks
+            )
+        )
+        return merge_plans(plans)
+
+    async def _generate_plan_chunk(
+        self,
+        rooms: List[Room],
+        template_label: str,
+        plan_category_id: Optional[str],
+        on_entry: Optional[EntryCallback],
+    ) -> CleaningPlan:
+        rooms_payload = [room.model_dump() for room in rooms]
         plan_payload = json.dumps({"rooms": rooms_payload}, ensure_ascii=True)
         parts, cached_instruction = await self._build_plan_request_parts(
             plan_payload, template_label, plan_category_id=plan_category_id
         )
         content = types.Content(role="user", parts=parts)
-        raw_response = await self._call_model(
+        if on_entry is None:
+            raw_response = await self._call_model(
+                [content],
+                stage="generation",
+                cached_content=cached_instruction,
+            )
+            return CleaningPlan.model_validate_json(raw_response)
+
+        async def _emit(item: Dict[str, Any]) -> None:
+            try:
+                entry = CleaningPlanEntry.model_validate(item)
+            except ValueError:
+                logger.debug("Skipping invalid streamed entry: %s", item)
+                return
+            await on_entry(entry)
+
+        raw_response = await self._call_model_streaming(
             [content],
-            response_mime_type="application/json",
-            response_json_schema=CleaningPlan.model_json_schema(),
+            item_key="entries",
+            on_item=_emit,
+            stage="generation",
             cached_content=cached_instruction,
         )
         return CleaningPlan.model_validate_json(raw_response)
 
-    async def generate_plan_batch(
+    async def submit_plan_batch(
         self,
         room_batches: List[List[Room]],
         template_name: Optional[str] = None,
         plan_category_id: Optional[str] = None,
-    ) -> List[CleaningPlan]:
-        if not room_batches:
-            return []
+        *,
+        display_name: str = "cleansync-plans",
+    ) -> str:
+        """Submit one plan generation per room list as a Batch API job.
+
+        Returns the remote batch name; responses come back in request order.
+        """
         template_label = template_name or "Cleansync Standard"
         inlined_requests: List[types.InlinedRequest] = []
         for rooms in room_batches:
             plan_payload = json.dumps(
                 {"rooms": [room.model_dump() for room in rooms]}, ensure_ascii=True
             )
+            # Batch jobs can queue for hours, longer than a context cache lives.
             parts, cached_instruction = await self._build_plan_request_parts(
-                plan_payload, template_label, plan_category_id=plan_category_id
+                plan_payload,
+                template_label,
+                plan_category_id=plan_category_id,
+                use_context_cache=False,
             )
             content = types.Content(role="user", parts=parts)
-            config = self._build_generation_config(
-                response_mime_type="application/json",
-                response_json_schema=CleaningPlan.model_json_schema(),
-                cached_content=cached_instruction,
-            )
+            config = self._generation_config("generation", cached_instruction)
             inlined_requests.append(
                 types.InlinedRequest(
                     model=self.model_name,
@@ -462,55 +1201,207 @@ class GeminiClient:
                     config=config,
                 )
             )
+        return await self._create_batch(inlined_requests, display_name)
 
-        def _run_requests() -> types.BatchJob:
-            client = self._get_client()
-            job = client.batches.create(model=self.model_name, src=inlined_requests)
-            while not job.done:
-                time.sleep(2)
-                job = client.batches.get(name=job.name)
-            if job.error:
-                raise RuntimeError(job.error.message or "Batch job failed")
-            return job
-
-        job = await asyncio.to_thread(_run_requests)
+    async def submit_extraction_batch(
+        self,
+        file_paths: List[Path],
+        options: FloorPlanOptions,
+        *,
+        display_name: str = "cleansync-extraction",
+    ) -> str:
+        """Submit one floor-plan extraction per file as a Batch API job.
+
+        Documents are referenced through the Files API when enabled, so the
+        batch request itself stays small; each file is sent whole (no page
+        splitting or tiling).
+        """
+        artifacts = self._stage_artifacts("extraction")
+        config = self._generation_config("extraction")
+        inlined_requests: List[types.InlinedRequest] = []
+        for file_path in file_paths:
+            file_bytes = file_path.read_bytes()
+            mime_type, _ = mimetypes.guess_type(file_path.name)
+            mime = mime_type or "application/octet-stream"
+            parts = self._extraction_parts(artifacts, options, inline_instruction=True)
+            document, inline_kwargs = await self._extraction_document(
+                file_bytes, mime, file_path.name
+            )
+            parts.append(
+                await self._document_part(
+                    document.data, document.mime_type, file_path.name, inline_kwargs
+                )
+            )
+            inlined_requests.append(
+                types.InlinedRequest(
+                    model=self.model_name,
+                    contents=[types.Content(role="user", parts=parts)],
+                    config=config,
+                )
+            )
+        return await self._create_batch(inlined_requests, display_name)
+
+    async def _create_batch(
+        self, inlined_requests: List[types.InlinedRequest], display_name: str
+    ) -> str:
+        try:
+            job = await self.batch_backend.create(
+                self.model_name, inlined_requests, display_name
+            )
+        except genai_errors.APIError as exc:
+            raise self._translate_api_error(exc) from exc
+        logger.info(
+            "Submitted Gemini batch %s (%s) with %s requests",
+            job.name,
+            display_name,
+            len(inlined_requests),
+        )
+        return job.name
+
+    async def wait_for_batch(self, name: str) -> types.BatchJob:
+        try:
+            job = await poll_batch(self.batch_backend, name)
+        except genai_errors.APIError as exc:
+            raise self._translate_api_error(exc) from exc
+        if job.error:
+            raise RuntimeError(job.error.message or "Batch job failed")
+        if job.state != types.JobState.JOB_STATE_SUCCEEDED:
+            raise RuntimeError(f"Batch job ended in state {job.state}")
+        return job
+
+    def _batch_items(
+        self, job: types.BatchJob, response_model: type[BaseModel], stage: str
+    ) -> List[Union[BaseModel, Exception]]:
+        """Parse each inlined response on its own; failures stay per item.
+
+        Every item also gets a ``gemini_calls`` row under ``batch_<stage>``,
+        with the batch's queue-to-finish time as its latency.
+        """
         if not job.dest or not job.dest.inlined_responses:
             raise RuntimeError("Batch job returned no inline responses")
-        plans: List[CleaningPlan] = []
+        latency_ms = None
+        if job.create_time and job.end_time:
+            latency_ms = int((job.end_time - job.create_time).total_seconds() * 1000)
+        items: List[Union[BaseModel, Exception]] = []
         for index, inline in enumerate(job.dest.inlined_responses):
+            record = CallRecord(
+                stage=f"batch_{stage}", model=self.model_name, latency_ms=latency_ms
+            )
             if inline.error:
-                raise RuntimeError(
-                    inline.error.message or f"Batch item {index} failed unexpectedly"
+                record.outcome = "error"
+                record.status_code = inline.error.code
+                call_ledger.record_call(record)
+                items.append(
+                    RuntimeError(
+                        inline.error.message or f"Batch item {index} failed unexpectedly"
+                    )
                 )
+                continue
             if not inline.response:
-                raise RuntimeError(f"Batch item {index} did not return a response")
+                record.outcome = "error"
+                call_ledger.record_call(record)
+                items.append(RuntimeError(f"Batch item {index} did not return a response"))
+                continue
             response = inline.response
-            if response.parsed:
-                plans.append(CleaningPlan.model_validate(response.parsed))
-            else:
-                text_payload = response.text or getattr(response, "output_text", "")
-                plans.append(CleaningPlan.model_validate_json(text_payload))
-        return plans
+            record.capture_usage(response.usage_metadata)
+            try:
+                if response.parsed:
+                    items.append(response_model.model_validate(response.parsed))
+                else:
+                    text_payload = response.text or getattr(response, "output_text", "")
+                    items.append(response_model.model_validate_json(text_payload))
+            except ValueError as exc:
+                record.outcome = "error"
+                items.append(exc)
+            call_ledger.record_call(record)
+        return items
+
+    def plan_batch_results(
+        self, job: types.BatchJob
+    ) -> List[Union[CleaningPlan, Exception]]:
+        return self._batch_items(job, CleaningPlan, "generation")
+
+    def extraction_batch_results(
+        self, job: types.BatchJob
+    ) -> List[Union[List[Room], Exception]]:
+        return [
+            item if isinstance(item, Exception) else item.rooms
+            for item in self._batch_items(job, FloorPlanExtraction, "extraction")
+        ]
 
     async def convert_to_cleansync(self, raw_text: str) -> CleaningPlan:
-        base_prompt = self._get_prompt_text()
-        base_instruction = (
-            f"{base_prompt}\n"
-            "Normaliser teksten til Cleansync-standard og returner JSON med samme format som generate_plan "
-            "(entries/total_area_m2/template_name)."
-        )
-        cached_instruction = await self._ensure_cached_instruction(
-            "plan-converter", base_instruction
+        """Convert plan text; text over ``CONVERT_TOKEN_BUDGET`` is converted
+        in parallel chunks and merged."""
+        chunks = chunk_text(raw_text)
+        if len(chunks) <= 1:
+            return await self._convert_text(raw_text)
+        logger.info(
+            "Converting %s estimated tokens of plan text in %s chunks",
+            estimate_tokens(raw_text),
+            len(chunks),
         )
+        plans = await asyncio.gather(*(self._convert_text(chunk) for chunk in chunks))
+        return merge_plans(plans)
+
+    async def _convert_text(self, raw_text: str) -> CleaningPlan:
+        artifacts = self._stage_artifacts("conversion")
+        cached_instruction = await self._ensure_cached_instruction(artifacts)
         parts: List[types.Part] = []
         if cached_instruction is None:
-            parts.append(types.Part(text=base_instruction))
+            parts.append(artifacts.instruction_part)
         parts.append(types.Part(text=raw_text))
         content = types.Content(role="user", parts=parts)
         raw_response = await self._call_model(
             [content],
-            response_mime_type="application/json",
-            response_json_schema=CleaningPlan.model_json_schema(),
+            stage="conversion",
+            cached_content=cached_instruction,
+        )
+        return CleaningPlan.model_validate_json(raw_response)
+
+    async def convert_document(self, file_path: Path) -> CleaningPlan:
+        """Convert a PDF/image plan sent as a document rather than as text.
+
+        PDFs longer than ``CONVERT_PDF_PAGES_PER_CHUNK`` pages are converted
+        in parallel page ranges and merged.
+        """
+        file_bytes = await asyncio.to_thread(file_path.read_bytes)
+        mime_type, _ = mimetypes.guess_type(file_path.name)
+        mime = mime_type or "application/octet-stream"
+        parts = [file_bytes]
+        if mime == "application/pdf":
+            parts = await asyncio.to_thread(
+                split_pdf_pages, file_bytes, CONVERT_PDF_PAGES_PER_CHUNK
+            ) or [file_bytes]
+        if len(parts) == 1:
+            return await self._convert_document_part(file_bytes, mime, file_path.name)
+        logger.info("Converting %s in %s page ranges", file_path.name, len(parts))
+        plans = await asyncio.gather(
+            *(
+                self._convert_document_part(part, mime, f"{file_path.name} (part {index})")
+                for index, part in enumerate(parts, start=1)
+            )
+        )
+        return merge_plans(plans)
+
+    async def _convert_document_part(
+        self, data: bytes, mime: str, display_name: str
+    ) -> CleaningPlan:
+        artifacts = self._stage_artifacts("conversion")
+        cached_instruction = await self._ensure_cached_instruction(artifacts)
+        parts: List[types.Part] = []
+        if cached_instruction is None:
+            parts.append(artifacts.instruction_part)
+        parts.append(types.Part(text="Renholdsplanen ligger vedlagt som dokument."))
+        document, inline_kwargs = await self._extraction_document(
+            data, mime, display_name, crop=False
+        )
+        raw_response = await self._call_model_with_document(
+            parts,
+            document.data,
+            document.mime_type,
+            display_name,
+            inline_kwargs,
+            stage="conversion",
             cached_content=cached_instruction,
         )
         return CleaningPlan.model_validate_json(raw_response)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from google import genai
+from google.genai import types
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+logger = logging.getLogger(__name__)
+
+# The Files API keeps uploads for 48 hours; stop handing out a handle well
+# before that so an in-flight request never races the expiry.
+DEFAULT_FILE_TTL_SECONDS = 48 * 3600
+EXPIRY_MARGIN_SECONDS = 2 * 3600
+ACTIVE_POLL_INTERVAL_SECONDS = 1.0
+ACTIVE_POLL_TIMEOUT_SECONDS = 120.0
+
+
+@dataclass(frozen=True)
+class FileHandle:
+    name: str
+    uri: str
+    mime_type: str
+    expires_at: float
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        current = now if now is not None else time.time()
+        return self.expires_at - EXPIRY_MARGIN_SECONDS > current
+
+
+class GeminiFilesBackend:
+    """Uploads through the Gemini Files API using the client's aio surface."""
+
+    def __init__(self, client_factory: Callable[[], genai.Client]) -> None:
+        self._client_factory = client_factory
+
+    async def upload(self, data: bytes, mime_type: str, display_name: str) -> FileHandle:
+        client = self._client_factory()
+        uploaded = await client.aio.files.upload(
+            file=io.BytesIO(data),
+            config=types.UploadFileConfig(mime_type=mime_type, display_name=display_name),
+        )
+        uploaded = await self._wait_until_active(client, uploaded)
+        expires_at = (
+            uploaded.expiration_time.timestamp()
+            if uploaded.expiration_time
+            else time.time() + DEFAULT_FILE_TTL_SECONDS
+        )
+        return FileHandle(
+            name=uploaded.name,
+            uri=uploaded.uri,
+            mime_type=uploaded.mime_type or mime_type,
+            expires_at=expires_at,
+        )
+
+    @staticmethod
+    async def _wait_until_active(client: genai.Client, uploaded: types.File) -> types.File:
+        deadline = time.monotonic() + ACTIVE_POLL_TIMEOUT_SECONDS
+        while uploaded.state == types.FileState.PROCESSING:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"File {uploaded.name} is still processing")
+            await asyncio.sleep(ACTIVE_POLL_INTERVAL_SECONDS)
+            uploaded = await client.aio.files.get(name=uploaded.name)
+        if uploaded.state == types.FileState.FAILED:
+            message = uploaded.error.message if uploaded.error else None
+            raise RuntimeError(message or f"File {uploaded.name} failed processing")
+        return uploaded
+
+
+class LocalFilesBackend:
+    """In-process stand-in for the Files API, for tests and offline runs."""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_FILE_TTL_SECONDS) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.files: Dict[str, bytes] = {}
+        self.upload_count = 0
+
+    async def upload(self, data: bytes, mime_type: str, display_name: str) -> FileHandle:
+        self.upload_count += 1
+        name = f"files/local-{self.upload_count}"
+        self.files[name] = data
+        return FileHandle(
+            name=name,
+            uri=f"local://{name}",
+            mime_type=mime_type,
+            expires_at=time.time() + self.ttl_seconds,
+        )
+
+
+class FileReferenceRegistry:
+    """Maps file content to a remote handle so each drawing is uploaded once.
+
+    Handles are remembered per API key scope (uploads are private to the
+    project that made them), persisted in SQLite so other workers and restarts
+    reuse them, and re-uploaded transparently once they near expiry.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self._handles: Dict[Tuple[str, str], FileHandle] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    async def resolve(
+        self,
+        data: bytes,
+        mime_type: str,
+        display_name: str,
+        *,
+        scope: str = "",
+        refresh: bool = False,
+    ) -> FileHandle:
+        key = (self.content_hash(data), scope)
+        if refresh:
+            self.invalidate(*key)
+        handle = self._lookup(key)
+        if handle is not None:
+            return handle
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another coroutine may have uploaded while we waited.
+            handle = self._lookup(key)
+            if handle is not None:
+                return handle
+            started = time.perf_counter()
+            handle = await self.backend.upload(data, mime_type, display_name)
+            logger.info(
+                "Uploaded %s (%s bytes) to Gemini Files as %s in %.0f ms",
+                display_name,
+                len(data),
+                handle.name,
+                (time.perf_counter() - started) * 1000,
+            )
+            self._store(key, handle)
+            return handle
+
+    def invalidate(self, content_hash: str, scope: str = "") -> None:
+        self._handles.pop((content_hash, scope), None)
+        with get_connection() as conn:
+            conn.execute(
+                "DELETE FROM gemini_files WHERE sha256 = ? AND scope = ?",
+                (content_hash, scope),
+            )
+            conn.commit()
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[FileHandle]:
+        handle = self._handles.get(key)
+        if handle is None:
+            with get_connection() as conn:
+                row = conn.execute(
+                    """
+                    SELECT name, uri, mime_type, expires_at FROM gemini_files
+                    WHERE sha256 = ? AND scope = ?
+                    """,
+                    key,
+                ).fetchone()
+            if row:
+                handle = FileHandle(
+                    name=row["name"],
+                    uri=row["uri"],
+                    mime_type=row["mime_type"],
+                    expires_at=row["expires_at"],
+                )
+                self._handles[key] = handle
+        if handle is not None and not handle.is_fresh():
+            self.invalidate(*key)
+            return None
+        return handle
+
+    def _store(self, key: Tuple[str, str], handle: FileHandle) -> None:
+        self._handles[key] = handle
+        with get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO gemini_files (sha256, scope, name, uri, mime_type, expires_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(sha256, scope) DO UPDATE
+                SET name=excluded.name,
+                    uri=excluded.uri,
+                    mime_type=excluded.mime_type,
+                    expires_at=excluded.expires_at,
+                    created_at=excluded.created_at
+                """,
+                (*key, handle.name, handle.uri, handle.mime_type, handle.expires_at, time.time()),
+            )
+            conn.commit()
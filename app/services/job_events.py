@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol, Tuple
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+JobEvent = Tuple[int, str, Dict[str, Any]]
+
+# Subscribers on another worker than the one running the job re-read the
+# event table this often; the owning worker wakes them immediately.
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "1.0"))
+# Comment lines keep idle connections open through proxies.
+SSE_KEEPALIVE_SECONDS = 15.0
+# Last event of a finished job; subscribers stop after it.
+END_EVENT = "end"
+
+
+class JobEventStore(Protocol):
+    """Per-job event sequence shared by every API worker process."""
+
+    def append(self, job_id: str, event: str, data_json: str) -> int: ...
+
+    def since(self, job_id: str, after: int) -> List[Tuple[int, str, str]]: ...
+
+    def delete(self, job_id: str) -> None: ...
+
+
+class SQLiteJobEventStore:
+    """``job_events`` table; ids are a per-job sequence, used as SSE ids."""
+
+    def append(self, job_id: str, event: str, data_json: str) -> int:
+        with get_connection() as conn:
+            row = conn.execute(
+                """
+                INSERT INTO job_events (job_id, seq, event, data, created_at)
+                SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ?
+                FROM job_events WHERE job_id = ?
+                RETURNING seq
+                """,
+                (job_id, event, data_json, time.time(), job_id),
+            ).fetchone()
+            conn.commit()
+        return row["seq"]
+
+    def since(self, job_id: str, after: int) -> List[Tuple[int, str, str]]:
+        with get_connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT seq, event, data FROM job_events
+                WHERE job_id = ? AND seq > ? ORDER BY seq
+                """,
+                (job_id, after),
+            ).fetchall()
+        return [(row["seq"], row["event"], row["data"]) for row in rows]
+
+    def delete(self, job_id: str) -> None:
+        with get_connection() as conn:
+            conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            conn.commit()
+
+
+class InMemoryJobEventStore:
+    """Single-process stand-in for tests and local runs."""
+
+    def __init__(self) -> None:
+        self._events: Dict[str, List[Tuple[int, str, str]]] = {}
+
+    def append(self, job_id: str, event: str, data_json: str) -> int:
+        events = self._events.setdefault(job_id, [])
+        events.append((len(events) + 1, event, data_json))
+        return len(events)
+
+    def since(self, job_id: str, after: int) -> List[Tuple[int, str, str]]:
+        return self._events.get(job_id, [])[after:]
+
+    def delete(self, job_id: str) -> None:
+        self._events.pop(job_id, None)
+
+
+class JobEventLog:
+    """Append-only, per-job event log that SSE subscribers can tail.
+
+    Events are stored so a subscriber on any worker can read them and a
+    reconnecting client can resume after the last id it saw.
+    """
+
+    def __init__(
+        self,
+        store: Optional[JobEventStore] = None,
+        *,
+        poll_seconds: float = JOB_EVENTS_POLL_SECONDS,
+    ) -> None:
+        self._store = store or SQLiteJobEventStore()
+        self.poll_seconds = poll_seconds
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+
+    def publish(self, job_id: str, event: str, data: Dict[str, Any]) -> int:
+        event_id = self._store.append(
+            job_id, event, json.dumps(data, ensure_ascii=False, default=str)
+        )
+        wakeup = self._wakeups.pop(job_id, None)
+        if wakeup is not None:
+            wakeup.set()
+        return event_id
+
+    def close(self, job_id: str) -> None:
+        self.publish(job_id, END_EVENT, {})
+
+    def discard(self, job_id: str) -> None:
+        self._store.delete(job_id)
+        wakeup = self._wakeups.pop(job_id, None)
+        if wakeup is not None:
+            wakeup.set()
+
+    def events(self, job_id: str, after: int = 0) -> List[JobEvent]:
+        return [
+            (event_id, event, json.loads(data))
+            for event_id, event, data in self._store.since(job_id, after)
+        ]
+
+    async def _wait(self, job_id: str, timeout: float) -> None:
+        wakeup = self._wakeups.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                if self._wakeups.get(job_id) is wakeup:
+                    del self._wakeups[job_id]
+
+    def _has_event(self, job_id: str, event_id: int, event: Optional[str] = None) -> bool:
+        found = self._store.since(job_id, event_id - 1)[:1]
+        return bool(found) and found[0][0] == event_id and event in (None, found[0][1])
+
+    async def subscribe(
+        self, job_id: str, after: int = 0, *, finished: bool = False
+    ) -> AsyncIterator[Optional[JobEvent]]:
+        """Events after ``after``, up to and including the job's end event.
+
+        Yields ``None`` when nothing happened for ``SSE_KEEPALIVE_SECONDS``.
+        Resuming after the end event returns at once, as does a ``finished``
+        job whose events were already discarded. An end event followed by
+        more events (the job was resumed) is skipped.
+        """
+        if (
+            after
+            and self._has_event(job_id, after, END_EVENT)
+            and not self._store.since(job_id, after)
+        ):
+            return
+        if finished and not self._store.since(job_id, 0):
+            return
+        position = after
+        idle = 0.0
+        while True:
+            events = self.events(job_id, position)
+            for index, (event_id, event, data) in enumerate(events):
+                position = event_id
+                if event == END_EVENT and index < len(events) - 1:
+                    continue
+                yield event_id, event, data
+                if event == END_EVENT:
+                    return
+            if events:
+                idle = 0.0
+            elif position and not self._has_event(job_id, position):
+                # Discarded while we were waiting.
+                return
+            if idle >= SSE_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield None
+            await self._wait(job_id, self.poll_seconds)
+            idle += self.poll_seconds
+
+
+def format_sse(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+async def sse_stream(
+    log: JobEventLog, job_id: str, after: int = 0, *, finished: bool = False
+) -> AsyncIterator[str]:
+    ended = False
+    async for item in log.subscribe(job_id, after, finished=finished):
+        if item is None:
+            yield ": keep-alive\n\n"
+            continue
+        ended = item[1] == END_EVENT
+        yield format_sse(*item)
+    if not ended:
+        # Finished before this (re)connect; tells the client not to retry.
+        yield f"event: {END_EVENT}\ndata: {{}}\n\n"
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Batch jobs can keep a worker for a long time; at most this many workers of
+# a pool take them, so plan jobs always find a free one.
+BATCH_JOB_WORKERS = int(os.getenv("BATCH_JOB_WORKERS", "1"))
+# A running job whose lease is not renewed for this long is re-queued.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+ABANDONED_ERROR = "Lease expired too many times"
+# Job status message for users when the queue gives up on a job.
+ABANDONED_JOB_MESSAGE = "Jobben ble avbrutt for mange ganger og er stoppet"
+
+# Returns None on success or the failure message recorded on the queue row.
+JobHandler = Callable[["QueuedJob"], Awaitable[Optional[str]]]
+# Records a job the queue gave up on in the runner's own job state.
+AbandonHandler = Callable[[str], None]
+
+
+@dataclass(frozen=True)
+class QueuedJob:
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+    @property
+    def recovered(self) -> bool:
+        """True when an earlier attempt was lost (crash, redeploy)."""
+        return self.attempts > 1
+
+
+class JobQueue:
+    """Persistent job queue in SQLite with time-limited leases.
+
+    Jobs move ``queued`` → ``running`` → ``done``/``failed``. A running job
+    holds a lease that its worker renews; when the lease runs out the job is
+    claimed again, up to ``max_attempts`` times.
+    """
+
+    def __init__(
+        self,
+        *,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> None:
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        # Called with (job_id, kind) for every job given up on in claim().
+        self.on_abandoned: Optional[Callable[[str, str], None]] = None
+
+    def enqueue(self, job_id: str, kind: str, payload: Dict[str, Any]) -> None:
+        now = time.time()
+        with get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO job_queue (id, kind, payload, status, created_at, updated_at)
+                VALUES (?, ?, ?, 'queued', ?, ?)
+                """,
+                (job_id, kind, json.dumps(payload, ensure_ascii=True, default=str), now, now),
+            )
+            conn.commit()
+        self._wakeup.set()
+
+    def claim(
+        self, owner: str, *, skip_kinds: Collection[str] = ()
+    ) -> Optional[QueuedJob]:
+        """Claim the oldest claimable job whose kind is not in ``skip_kinds``."""
+        now = time.time()
+        skipped = sorted(skip_kinds)
+        kind_filter = f"AND kind NOT IN ({', '.join('?' * len(skipped))})" if skipped else ""
+        with get_connection() as conn:
+            expired = conn.execute(
+                """
+                UPDATE job_queue
+                SET status = 'failed', error = ?, lease_owner = NULL, updated_at = ?
+                WHERE status = 'running' AND lease_expires < ? AND attempts >= ?
+                RETURNING id, kind
+                """,
+                (ABANDONED_ERROR, now, now, self.max_attempts),
+            ).fetchall()
+            for row in expired:
+                logger.warning("Job %s abandoned after %s attempts", row["id"], self.max_attempts)
+            # One statement, so two workers cannot claim the same row.
+            row = conn.execute(
+                """
+                UPDATE job_queue
+                SET status = 'running', attempts = attempts + 1, lease_owner = ?,
+                    lease_expires = ?, updated_at = ?
+                WHERE id = (
+                    SELECT id FROM job_queue
+                    WHERE (status = 'queued' OR (status = 'running' AND lease_expires < ?))
+                    {kind_filter}
+                    ORDER BY created_at
+                    LIMIT 1
+                )
+                RETURNING id, kind, payload, attempts
+                """.format(kind_filter=kind_filter),
+                (owner, now + self.lease_seconds, now, now, *skipped),
+            ).fetchone()
+            conn.commit()
+        for abandoned in expired:
+            if self.on_abandoned is not None:
+                self.on_abandoned(abandoned["id"], abandoned["kind"])
+        if row is None:
+            return None
+        return QueuedJob(
+            id=row["id"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            attempts=row["attempts"],
+        )
+
+    def renew(self, job_id: str, owner: str) -> bool:
+        now = time.time()
+        with get_connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE job_queue SET lease_expires = ?, updated_at = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+                """,
+                (now + self.lease_seconds, now, job_id, owner),
+            )
+            conn.commit()
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, owner: str, error: Optional[str] = None) -> None:
+        with get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE job_queue
+                SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL,
+                    updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+                """,
+                ("failed" if error else "done", error, time.time(), job_id, owner),
+            )
+            conn.commit()
+
+    def release(self, job_id: str, owner: str) -> None:
+        """Hand a running job back to the queue, e.g. on shutdown."""
+        with get_connection() as conn:
+            conn.execute(
+                """
+                UPDATE job_queue
+                SET status = 'queued', attempts = MAX(attempts - 1, 0),
+                    lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+                """,
+                (time.time(), job_id, owner),
+            )
+            conn.commit()
+
+    def requeue(self, job_id: str, payload: Dict[str, Any]) -> bool:
+        """Queue a finished job again, e.g. to resume it; False if it is still live."""
+        with get_connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE job_queue
+                SET status = 'queued', payload = ?, attempts = 0, error = NULL,
+                    lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND status IN ('done', 'failed')
+                """,
+                (json.dumps(payload, ensure_ascii=True, default=str), time.time(), job_id),
+            )
+            conn.commit()
+        if cursor.rowcount != 1:
+            return False
+        self._wakeup.set()
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT id, kind, payload, status, attempts, error FROM job_queue WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {**dict(row), "payload": json.loads(row["payload"])}
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+class WorkerPool:
+    """``size`` asyncio workers draining a ``JobQueue``, one job each.
+
+    ``kind_limits`` caps how many workers run jobs of a kind at once; the
+    other workers skip that kind until one of them is done.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        *,
+        size: int = JOB_WORKERS,
+        abandon_handlers: Optional[Dict[str, AbandonHandler]] = None,
+        kind_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.queue = queue
+        self.handlers = handlers
+        self.abandon_handlers = abandon_handlers or {}
+        self.size = max(1, size)
+        self.kind_limits = kind_limits or {}
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, str] = {}
+        self._running_kinds: Dict[str, int] = {}
+        queue.on_abandoned = self._abandoned
+
+    def _abandoned(self, job_id: str, kind: str) -> None:
+        handler = self.abandon_handlers.get(kind)
+        if handler is None:
+            return
+        try:
+            handler(job_id)
+        except Exception:  # pragma: no cover - the queue row is already failed
+            logger.exception("Could not record abandoned job %s", job_id)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._work(f"{WORKER_ID}:{index}"))
+            for index in range(self.size)
+        ]
+        logger.info("Started %s job workers", self.size)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs interrupted by a deploy go straight back to the queue rather
+        # than waiting for their lease to expire.
+        for job_id, owner in list(self._running.items()):
+            self.queue.release(job_id, owner)
+        self._running.clear()
+
+    async def _work(self, owner: str) -> None:
+        while True:
+            try:
+                job = self.queue.claim(owner, skip_kinds=self._saturated_kinds())
+            except Exception:  # pragma: no cover - keep the worker alive
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                await self.queue.wait(JOB_POLL_SECONDS)
+                continue
+            await self._execute(job, owner)
+
+    def _saturated_kinds(self) -> List[str]:
+        return [
+            kind
+            for kind, limit in self.kind_limits.items()
+            if self._running_kinds.get(kind, 0) >= limit
+        ]
+
+    async def _execute(self, job: QueuedJob, owner: str) -> None:
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self.queue.finish(job.id, owner, error=f"No handler for job kind {job.kind}")
+            return
+        if job.recovered:
+            logger.info("Recovering job %s (attempt %s)", job.id, job.attempts)
+        self._running[job.id] = owner
+        self._running_kinds[job.kind] = self._running_kinds.get(job.kind, 0) + 1
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, owner))
+        try:
+            error = await handler(job)
+        except asyncio.CancelledError:
+            # Left in _running so stop() hands it back to the queue.
+            heartbeat.cancel()
+            raise
+        except Exception as exc:
+            logger.exception("Job %s failed", job.id)
+            self.queue.finish(job.id, owner, error=str(exc))
+        else:
+            self.queue.finish(job.id, owner, error=error)
+        finally:
+            self._running_kinds[job.kind] -= 1
+        heartbeat.cancel()
+        self._running.pop(job.id, None)
+
+    async def _heartbeat(self, job_id: str, owner: str) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                self.queue.renew(job_id, owner)
+            except Exception:  # pragma: no cover - next beat retries
+                logger.warning("Could not renew lease for job %s", job_id)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Iterator, MutableMapping, Optional, TypeVar
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs stay in memory this long; after that status lookups are
+# answered from the job queue and plan_store.
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "900"))
+# Most recently used job results kept in memory.
+JOB_RESULTS_MAX = int(os.getenv("JOB_RESULTS_MAX", "100"))
+RETENTION_SWEEP_SECONDS = 30.0
+# How often each process purges finished jobs from the shared tables.
+RETENTION_PURGE_SECONDS = float(os.getenv("RETENTION_PURGE_SECONDS", "600"))
+
+J = TypeVar("J")
+R = TypeVar("R")
+
+
+class RetainedJobs(MutableMapping[str, J], Generic[J]):
+    """Job registry that forgets terminal jobs ``ttl_seconds`` after they end.
+
+    Jobs are checked with ``is_terminal`` on a periodic sweep (at most every
+    ``RETENTION_SWEEP_SECONDS``, triggered by access), so runners can keep
+    mutating job status in place. ``on_evict`` is called with each dropped id.
+    """
+
+    def __init__(
+        self,
+        is_terminal: Callable[[J], bool],
+        *,
+        ttl_seconds: float = JOB_RETENTION_SECONDS,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self._is_terminal = is_terminal
+        self.ttl_seconds = ttl_seconds
+        self._on_evict = on_evict
+        self._jobs: Dict[str, J] = {}
+        self._finished_at: Dict[str, float] = {}
+        self._swept_at = 0.0
+
+    def sweep(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._swept_at = now
+        for job_id, job in list(self._jobs.items()):
+            if not self._is_terminal(job):
+                continue
+            finished_at = self._finished_at.setdefault(job_id, now)
+            if now - finished_at >= self.ttl_seconds:
+                del self[job_id]
+                if self._on_evict is not None:
+                    self._on_evict(job_id)
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._swept_at >= min(RETENTION_SWEEP_SECONDS, self.ttl_seconds):
+            self.sweep(now)
+
+    def __getitem__(self, job_id: str) -> J:
+        self._maybe_sweep()
+        return self._jobs[job_id]
+
+    def __setitem__(self, job_id: str, job: J) -> None:
+        self._maybe_sweep()
+        self._jobs[job_id] = job
+        self._finished_at.pop(job_id, None)
+
+    def __delitem__(self, job_id: str) -> None:
+        del self._jobs[job_id]
+        self._finished_at.pop(job_id, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._jobs)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, job_id: object) -> bool:
+        self._maybe_sweep()
+        return job_id in self._jobs
+
+
+class ResultLRU(MutableMapping[str, R], Generic[R]):
+    """At most ``max_entries`` results, least recently used evicted first."""
+
+    def __init__(self, max_entries: int = JOB_RESULTS_MAX) -> None:
+        self.max_entries = max(1, max_entries)
+        self._results: "OrderedDict[str, R]" = OrderedDict()
+
+    def __getitem__(self, job_id: str) -> R:
+        result = self._results[job_id]
+        self._results.move_to_end(job_id)
+        return result
+
+    def __setitem__(self, job_id: str, result: R) -> None:
+        self._results[job_id] = result
+        self._results.move_to_end(job_id)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def __delitem__(self, job_id: str) -> None:
+        del self._results[job_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._results)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __contains__(self, job_id: object) -> bool:
+        return job_id in self._results
+
+
+def purge_finished_jobs(
+    ttl_seconds: float = JOB_RETENTION_SECONDS, now: Optional[float] = None
+) -> int:
+    """Delete ``job_state`` and ``job_events`` rows of long-finished jobs.
+
+    Runners delete a job's rows when they evict it, but only while the
+    process that ran it is alive; this catches jobs whose owner restarted or
+    died. Returns the number of job states deleted.
+    """
+    cutoff = (time.time() if now is None else now) - ttl_seconds
+    with get_connection() as conn:
+        cursor = conn.execute(
+            """
+            DELETE FROM job_state
+            WHERE updated_at < ? AND json_extract(state, '$.status') IN ('success', 'failed')
+            """,
+            (cutoff,),
+        )
+        # Events are published after the state they describe is saved, so
+        # old events without a state row belong to purged jobs.
+        conn.execute(
+            """
+            DELETE FROM job_events
+            WHERE created_at < ? AND job_id NOT IN (SELECT id FROM job_state)
+            """,
+            (cutoff,),
+        )
+        conn.commit()
+    return cursor.rowcount
+
+
+async def purge_finished_jobs_forever(interval: float = RETENTION_PURGE_SECONDS) -> None:
+    """Purge on startup and every ``interval`` seconds after it."""
+    while True:
+        try:
+            purged = purge_finished_jobs()
+        except Exception:  # pragma: no cover - keep the loop alive
+            logger.exception("Could not purge finished jobs")
+        else:
+            if purged:
+                logger.info("Purged %s finished jobs from the job tables", purged)
+        await asyncio.sleep(interval)
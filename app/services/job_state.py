@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional, Protocol, Tuple
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+
+class JobStateStore(Protocol):
+    """Job status shared by every API worker process."""
+
+    def save(self, job_id: str, kind: str, state_json: str) -> None: ...
+
+    def load(self, job_id: str, kind: str) -> Optional[str]: ...
+
+    def delete(self, job_id: str) -> None: ...
+
+
+class SQLiteJobStateStore:
+    """``job_state`` table in the shared database (WAL, so readers never block)."""
+
+    def save(self, job_id: str, kind: str, state_json: str) -> None:
+        with get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO job_state (id, kind, state, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE
+                SET state = excluded.state, updated_at = excluded.updated_at
+                """,
+                (job_id, kind, state_json, time.time()),
+            )
+            conn.commit()
+
+    def load(self, job_id: str, kind: str) -> Optional[str]:
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT state FROM job_state WHERE id = ? AND kind = ?", (job_id, kind)
+            ).fetchone()
+        return row["state"] if row else None
+
+    def delete(self, job_id: str) -> None:
+        with get_connection() as conn:
+            conn.execute("DELETE FROM job_state WHERE id = ?", (job_id,))
+            conn.commit()
+
+
+class InMemoryJobStateStore:
+    """Single-process stand-in for tests and local runs."""
+
+    def __init__(self) -> None:
+        self._states: Dict[str, Tuple[str, str]] = {}
+
+    def save(self, job_id: str, kind: str, state_json: str) -> None:
+        self._states[job_id] = (kind, state_json)
+
+    def load(self, job_id: str, kind: str) -> Optional[str]:
+        stored = self._states.get(job_id)
+        return stored[1] if stored and stored[0] == kind else None
+
+    def delete(self, job_id: str) -> None:
+        self._states.pop(job_id, None)
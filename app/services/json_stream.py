@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayItemParser:
+    """Incrementally pulls complete objects out of a top-level JSON array field.
+
+    Feed it the model's streamed text chunk by chunk; every call returns the
+    objects of ``{"<key>": [ {...}, {...} ]}`` that became complete since the
+    previous call. Nothing else in the document is interpreted, and the full
+    text is still validated by the caller once the stream ends.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.emitted = 0
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if not chunk:
+            return []
+        self._text += chunk
+        items: List[Dict[str, Any]] = []
+        text = self._text
+        for index in range(self._pos, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start : index]
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = index + 1
+            elif char in "{[":
+                if (
+                    char == "["
+                    and self._depth == 1
+                    and self._array_depth is None
+                    and self._last_key == self.key
+                ):
+                    self._array_depth = self._depth + 1
+                elif char == "{" and self._depth == self._array_depth:
+                    self._item_start = index
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if (
+                    char == "}"
+                    and self._item_start is not None
+                    and self._depth == self._array_depth
+                ):
+                    item = self._decode(text[self._item_start : index + 1])
+                    self._item_start = None
+                    if item is not None:
+                        items.append(item)
+                elif (
+                    char == "]"
+                    and self._array_depth is not None
+                    and self._depth == self._array_depth - 1
+                ):
+                    # The array is closed; ignore anything that follows.
+                    self._array_depth = -1
+        self._pos = len(text)
+        # Keep only what an unfinished item still needs.
+        if self._item_start is not None:
+            self._text = text[self._item_start :]
+            self._string_start -= self._item_start
+            self._pos -= self._item_start
+            self._item_start = 0
+        elif not self._in_string:
+            self._text = ""
+            self._pos = 0
+        self.emitted += len(items)
+        return items
+
+    @staticmethod
+    def _decode(raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:  # pragma: no cover - defensive
+            logger.debug("Skipping undecodable streamed item: %s", raw[:200])
+            return None
+        return value if isinstance(value, dict) else None
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import io
+import logging
+from typing import List
+
+try:  # pypdf is optional; without it PDFs are extracted as one document.
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.errors import PyPdfError
+except ImportError:  # pragma: no cover - depends on the environment
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+
+def split_pdf_pages(data: bytes, pages_per_part: int = 1) -> List[bytes]:
+    """Return ``data`` as standalone PDFs of ``pages_per_part`` pages each.
+
+    Returns an empty list when pypdf is missing or the file cannot be parsed,
+    in which case callers should treat the PDF as a single document.
+    """
+    if PdfReader is None:
+        return []
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        pages: List[bytes] = []
+        step = max(1, pages_per_part)
+        for start in range(0, len(reader.pages), step):
+            writer = PdfWriter()
+            for page in reader.pages[start : start + step]:
+                writer.add_page(page)
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            pages.append(buffer.getvalue())
+    except (PyPdfError, ValueError, OSError) as exc:
+        logger.warning("Could not split PDF into pages: %s", exc)
+        return []
+    return pages
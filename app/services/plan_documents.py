@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+from pathlib import Path
+from typing import List
+
+from docx import Document
+from docx.table import Table
+
+logger = logging.getLogger(__name__)
+
+# Inputs to /convert-plan above this many (estimated) tokens are converted
+# in parallel chunks.
+CONVERT_TOKEN_BUDGET = int(os.getenv("CONVERT_TOKEN_BUDGET", "24000"))
+CONVERT_PDF_PAGES_PER_CHUNK = int(os.getenv("CONVERT_PDF_PAGES_PER_CHUNK", "10"))
+# Rough ratio for Norwegian prose and table rows.
+CHARS_PER_TOKEN = 4
+
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+
+
+def _compact(value: str) -> str:
+    return _SPACES.sub(" ", value.replace("\n", " ")).strip()
+
+
+def _table_rows(table: Table) -> List[str]:
+    rows: List[str] = []
+    for row in table.rows:
+        cells: List[str] = []
+        for cell in row.cells:
+            text = _compact(cell.text)
+            # Merged cells are repeated once per grid column.
+            if cells and cells[-1] == text:
+                continue
+            cells.append(text)
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return rows
+
+
+def docx_to_text(path: Path) -> str:
+    """Paragraphs and table rows of a DOCX in document order, one per line."""
+    document = Document(str(path))
+    lines: List[str] = []
+    for block in document.iter_inner_content():
+        if isinstance(block, Table):
+            lines.extend(_table_rows(block))
+        else:
+            text = _compact(block.text)
+            if text:
+                lines.append(text)
+    return "\n".join(lines)
+
+
+def read_text_file(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8")
+    except UnicodeDecodeError:
+        return path.read_text(encoding="latin-1")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_text(text: str, max_tokens: int = CONVERT_TOKEN_BUDGET) -> List[str]:
+    """Split ``text`` on line boundaries into pieces within ``max_tokens``."""
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in text.splitlines():
+        if len(line) > max_chars:
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            while len(line) > max_chars:
+                chunks.append(line[:max_chars])
+                line = line[max_chars:]
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
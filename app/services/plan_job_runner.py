@@ -9,23 +9,74 @@ from uuid import uuid4
 
 from app.models.schemas import (
     CleaningPlan,
+    CleaningPlanEntry,
     FloorPlanOptions,
     PlanJob,
     PlanJobStatus,
+    Room,
 )
-from app.services import plan_store
+from app.services import call_ledger, config_store, plan_store
 from app.services.docx_generator import plan_to_docx_bytes
 from app.services.gemini_client import GeminiClient, GeminiServiceError
+from app.services.job_events import JobEventLog
+from app.services.job_queue import ABANDONED_JOB_MESSAGE, JobQueue, QueuedJob
+from app.services.job_retention import ResultLRU, RetainedJobs
+from app.services.job_state import JobStateStore, SQLiteJobStateStore
 from app.services.storage import get_file_path, save_bytes
 
 logger = logging.getLogger(__name__)
 
+TERMINAL_STATUSES = {PlanJobStatus.success, PlanJobStatus.failed}
+QUEUE_STATUS = {
+    "queued": PlanJobStatus.pending,
+    "running": PlanJobStatus.running,
+    "failed": PlanJobStatus.failed,
+}
+
+DEFAULT_EXTRACTION_CONCURRENCY = 4
+MAX_EXTRACTION_CONCURRENCY = 16
+
+
+class FloorPlanExtractionError(RuntimeError):
+    def __init__(
+        self, file_id: str, position: int, total: int, cause: BaseException
+    ) -> None:
+        super().__init__(
+            f"Plantegning {position}/{total} ({file_id}) kunne ikke analyseres: {cause}"
+        )
+        self.file_id = file_id
+        self.position = position
+        self.total = total
+        self.cause = cause
+
+
+def _extraction_concurrency() -> int:
+    configured = config_store.get_gemini_config().get("extraction_concurrency")
+    try:
+        value = int(configured) if configured is not None else DEFAULT_EXTRACTION_CONCURRENCY
+    except (TypeError, ValueError):
+        value = DEFAULT_EXTRACTION_CONCURRENCY
+    return max(1, min(value, MAX_EXTRACTION_CONCURRENCY))
+
 
 class PlanJobRunner:
-    def __init__(self, gemini_client: GeminiClient) -> None:
+    def __init__(
+        self,
+        gemini_client: GeminiClient,
+        queue: JobQueue,
+        state: Optional[JobStateStore] = None,
+        events: Optional[JobEventLog] = None,
+    ) -> None:
         self._client = gemini_client
-        self.jobs: Dict[str, PlanJob] = {}
-        self._results: Dict[str, CleaningPlan] = {}
+        self._queue = queue
+        self._state = state or SQLiteJobStateStore()
+        self.events = events or JobEventLog()
+        # Jobs this process is running (or ran recently); every other worker
+        # reads them from the shared state store.
+        self.jobs: RetainedJobs[PlanJob] = RetainedJobs(
+            lambda job: job.status in TERMINAL_STATUSES, on_evict=self._evict
+        )
+        self._results: ResultLRU[CleaningPlan] = ResultLRU()
 
     async def start_job(
         self,
@@ -33,37 +84,154 @@ class PlanJobRunner:
         options: FloorPlanOptions,
         template_id: Optional[str],
         request_payload: Dict,
+        *,
+        stream: bool = False,
     ) -> PlanJob:
-        job = PlanJob(id=uuid4().hex)
-        self.jobs[job.id] = job
-        asyncio.create_task(
-            self._run_job(job.id, file_ids, options, template_id, request_payload)
+        job = PlanJob(id=uuid4().hex, total_files=len(file_ids))
+        self._save(job)
+        self._queue.enqueue(
+            job.id,
+            "plan",
+            {
+                "file_ids": file_ids,
+                "options": options.model_dump(mode="json"),
+                "template_id": template_id,
+                "request_payload": request_payload,
+                "stream": stream,
+            },
         )
         return job
 
+    async def run_queued(self, queued: QueuedJob) -> Optional[str]:
+        """Worker pool entry point; also rebuilds jobs recovered after a restart."""
+        payload = queued.payload
+        job = self.jobs.get(queued.id)
+        if job is None:
+            stored = self._state.load(queued.id, "plan")
+            job = (
+                PlanJob.model_validate_json(stored)
+                if stored
+                else PlanJob(id=queued.id, total_files=len(payload["file_ids"]))
+            )
+            self.jobs[queued.id] = job
+        await self._run_job(
+            queued.id,
+            payload["file_ids"],
+            FloorPlanOptions.model_validate(payload["options"]),
+            payload.get("template_id"),
+            payload.get("request_payload") or {},
+            stream=payload.get("stream", False),
+        )
+        return job.message if job.status == PlanJobStatus.failed else None
+
+    def abandon(self, job_id: str) -> None:
+        """Fail a job the queue gave up on, e.g. because it kept killing its worker."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            stored = self._state.load(job_id, "plan")
+            job = PlanJob.model_validate_json(stored) if stored else PlanJob(id=job_id)
+        self._update_job(
+            job,
+            status=PlanJobStatus.failed,
+            message=ABANDONED_JOB_MESSAGE,
+            detail={"message": ABANDONED_JOB_MESSAGE, "source": "queue"},
+        )
+        self._publish_outcome(job)
+
+    def _save(self, job: PlanJob) -> None:
+        self._state.save(job.id, "plan", job.model_dump_json())
+        self.events.publish(job.id, "status", job.model_dump(mode="json"))
+
+    def _evict(self, job_id: str) -> None:
+        self.events.discard(job_id)
+        self._state.delete(job_id)
+
     def get_status(self, job_id: str) -> PlanJob:
-        if job_id not in self.jobs:
+        if job_id in self.jobs:
+            return self.jobs[job_id]
+        stored = self._state.load(job_id, "plan")
+        if stored:
+            return PlanJob.model_validate_json(stored)
+        # Evicted, or lost in a restart before it started.
+        record = self._queue.get(job_id)
+        if record is None or record["kind"] != "plan":
             raise KeyError(job_id)
-        return self.jobs[job_id]
+        total_files = len(record["payload"].get("file_ids") or [])
+        if record["status"] != "done":
+            return PlanJob(
+                id=job_id,
+                status=QUEUE_STATUS[record["status"]],
+                total_files=total_files,
+                message=record["error"],
+            )
+        stored = plan_store.list_job_plans(job_id)
+        if not stored:
+            raise KeyError(job_id)
+        metadata = stored[-1]["metadata"] or {}
+        docx_id = stored[-1]["docx_id"]
+        return PlanJob(
+            id=job_id,
+            status=PlanJobStatus.success,
+            total_files=total_files,
+            processed_files=total_files,
+            docx_url=f"/download/{docx_id}" if docx_id else None,
+            cache_hit=bool(metadata.get("cache_hit")),
+        )
 
     def get_plan(self, job_id: str) -> Optional[CleaningPlan]:
-        return self._results.get(job_id)
+        if job_id in self._results:
+            return self._results[job_id]
+        # Also for jobs still retained whose result left the LRU.
+        stored = plan_store.list_job_plans(job_id)
+        return stored[-1]["plan"] if stored else None
 
     def _update_job(
         self,
         job: PlanJob,
         *,
         status: PlanJobStatus,
+        stage: Optional[str] = None,
         docx_url: Optional[str] = None,
         message: Optional[str] = None,
         detail: Optional[Dict] = None,
     ) -> None:
         job.status = status
+        if stage is not None:
+            job.stage = stage
         if docx_url is not None:
             job.docx_url = docx_url
         job.message = message
         job.detail = detail
         job.updated_at = datetime.now(timezone.utc)
+        self._save(job)
+
+    async def _extract_rooms(
+        self, job: PlanJob, file_ids: List[str], options: FloorPlanOptions
+    ) -> List[Room]:
+        semaphore = asyncio.Semaphore(_extraction_concurrency())
+
+        async def _extract(file_id: str) -> List[Room]:
+            async with semaphore:
+                file_path = get_file_path(file_id)
+                rooms = await self._client.analyze_floorplan(file_path, options)
+            job.processed_files += 1
+            job.updated_at = datetime.now(timezone.utc)
+            self._save(job)
+            return rooms
+
+        results = await asyncio.gather(
+            *(_extract(file_id) for file_id in file_ids), return_exceptions=True
+        )
+        rooms: List[Room] = []
+        # Merge in request order so the plan is stable regardless of which
+        # floor finished first.
+        for position, (file_id, result) in enumerate(zip(file_ids, results), start=1):
+            if isinstance(result, BaseException):
+                raise FloorPlanExtractionError(
+                    file_id, position, len(file_ids), result
+                ) from result
+            rooms.extend(result)
+        return rooms
 
     async def _run_job(
         self,
@@ -72,36 +240,51 @@ class PlanJobRunner:
         options: FloorPlanOptions,
         template_id: Optional[str],
         request_payload: Dict,
+        *,
+        stream: bool = False,
     ) -> None:
         job = self.jobs[job_id]
-        self._update_job(job, status=PlanJobStatus.running)
+        # Scoped to this task: attributes its Gemini calls to the job.
+        call_ledger.current_job_id.set(job_id)
+        job.total_files = len(file_ids)
+        # A recovered job starts over; counts from the lost attempt would
+        # overshoot.
+        job.processed_files = 0
+        job.cache_hit = False
+        self._update_job(job, status=PlanJobStatus.running, stage="extraction")
         started = time.perf_counter()
 
         try:
-            rooms = []
-            for file_id in file_ids:
-                file_path = get_file_path(file_id)
-                rooms.extend(await self._client.analyze_floorplan(file_path, options))
+            rooms = await self._extract_rooms(job, file_ids, options)
 
+            self._update_job(job, status=PlanJobStatus.running, stage="generation")
             template_name = None
             if template_id:
                 template_path = get_file_path(template_id)
                 template_name = await self._client.analyze_template(template_path)
 
+            async def _publish_entry(entry: CleaningPlanEntry) -> None:
+                self.events.publish(job_id, "entry", entry.model_dump(mode="json"))
+
+            def _mark_cache_hit() -> None:
+                job.cache_hit = True
+
             plan = await self._client.generate_plan(
                 rooms,
                 template_name=template_name,
                 plan_category_id=options.plan_category,
+                on_entry=_publish_entry if stream else None,
+                on_cache_hit=_mark_cache_hit,
             )
             docx_bytes = plan_to_docx_bytes(plan)
             docx_id = save_bytes(docx_bytes, suffix=".docx", category="docx")
             docx_url = f"/download/{docx_id}"
             self._results[job_id] = plan
-            self._update_job(job, status=PlanJobStatus.success, docx_url=docx_url)
             metadata = {
                 "template_id": template_id,
                 "file_count": len(file_ids),
                 "plan_category": options.plan_category,
+                "cache_hit": job.cache_hit,
             }
             plan_store.save_plan(
                 source="generator",
@@ -110,6 +293,31 @@ class PlanJobRunner:
                 docx_id=docx_id,
                 metadata=metadata,
                 generation_ms=int((time.perf_counter() - started) * 1000),
+                job_id=job_id,
+            )
+            # Only after the plan is stored: other workers answer /status from
+            # job_state and look the plan up in plan_store.
+            self._update_job(job, status=PlanJobStatus.success, docx_url=docx_url)
+        except FloorPlanExtractionError as exc:
+            detail = {
+                "message": str(exc),
+                "file_id": exc.file_id,
+                "file_position": exc.position,
+            }
+            if isinstance(exc.cause, GeminiServiceError):
+                detail.update(
+                    {
+                        "source": "gemini",
+                        "status_code": exc.cause.status_code,
+                        "reason": exc.cause.reason,
+                        "retryable": exc.cause.is_retryable,
+                    }
+                )
+            self._update_job(
+                job,
+                status=PlanJobStatus.failed,
+                message=str(exc),
+                detail=detail,
             )
         except GeminiServiceError as exc:
             detail = {
@@ -133,3 +341,23 @@ class PlanJobRunner:
                 message="Uventet feil under generering",
                 detail={"message": str(exc)},
             )
+        finally:
+            self._publish_outcome(job)
+
+    def _publish_outcome(self, job: PlanJob) -> None:
+        # The plan goes out once, here; status events only carry progress.
+        if job.status == PlanJobStatus.success:
+            plan = self._results.get(job.id)
+            self.events.publish(
+                job.id,
+                "plan",
+                {
+                    "plan": plan.model_dump(mode="json") if plan else None,
+                    "docx_url": job.docx_url,
+                },
+            )
+        else:
+            self.events.publish(
+                job.id, "error", {"message": job.message, "detail": job.detail}
+            )
+        self.events.close(job.id)
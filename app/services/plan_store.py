@@ -27,6 +27,8 @@ def save_plan(
     docx_id: Optional[str] = None,
     metadata: Optional[dict] = None,
     generation_ms: Optional[int] = None,
+    job_id: Optional[str] = None,
+    file_id: Optional[str] = None,
 ) -> str:
     plan_id = uuid4().hex
     now = datetime.now(timezone.utc).isoformat()
@@ -34,10 +36,20 @@ def save_plan(
     metadata_json = _serialize_payload(metadata)
     plan_json = plan.model_dump_json()
     with get_connection() as conn:
+        if job_id and file_id:
+            # One plan per job and file: a file regenerated after a crash or a
+            # resume replaces its earlier row in the same transaction.
+            conn.execute(
+                "DELETE FROM generated_plans WHERE job_id = ? AND file_id = ?",
+                (job_id, file_id),
+            )
         conn.execute(
             """
-            INSERT INTO generated_plans (id, source, request_payload, plan_json, docx_id, metadata, created_at, generation_ms)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO generated_plans (
+                id, source, request_payload, plan_json, docx_id, metadata, created_at,
+                generation_ms, job_id, file_id
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 plan_id,
@@ -48,6 +60,8 @@ def save_plan(
                 metadata_json,
                 now,
                 generation_ms,
+                job_id,
+                file_id,
             ),
         )
         conn.commit()
@@ -138,3 +152,36 @@ def get_plan(plan_id: str) -> Dict[str, Any]:
         "created_at": row["created_at"],
         "generation_ms": row["generation_ms"],
     }
+
+
+def count_job_plans(job_id: str) -> int:
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) AS plans FROM generated_plans WHERE job_id = ?", (job_id,)
+        ).fetchone()
+    return row["plans"]
+
+
+def list_job_plans(job_id: str) -> List[Dict[str, Any]]:
+    """Plans stored by a job, oldest first."""
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, file_id, plan_json, docx_id, metadata, created_at
+            FROM generated_plans
+            WHERE job_id = ?
+            ORDER BY rowid
+            """,
+            (job_id,),
+        ).fetchall()
+    return [
+        {
+            "id": row["id"],
+            "file_id": row["file_id"],
+            "plan": CleaningPlan.model_validate_json(row["plan_json"]),
+            "docx_id": row["docx_id"],
+            "metadata": json.loads(row["metadata"]) if row["metadata"] else None,
+            "created_at": row["created_at"],
+        }
+        for row in rows
+    ]
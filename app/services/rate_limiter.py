@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_MINUTE = 60
+MIN_REQUESTS_PER_MINUTE = 2
+# Additive-increase step as a share of the configured rate, applied per
+# successful call after a throttle.
+RECOVERY_FRACTION = 0.05
+THROTTLE_FACTOR = 0.5
+
+
+class AdaptiveRateLimiter:
+    """Token bucket shared by every Gemini call of one client.
+
+    The refill rate starts at the configured requests-per-minute, halves on
+    every observed 429 and creeps back up on success (AIMD). A retry-after hint
+    pauses the whole bucket, so concurrent jobs back off together instead of
+    stampeding the quota the moment it resets.
+    """
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE) -> None:
+        self._max_rate = max(requests_per_minute, MIN_REQUESTS_PER_MINUTE) / 60.0
+        self._rate = self._max_rate
+        self._capacity = max(1.0, self._max_rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def requests_per_minute(self) -> float:
+        return self._rate * 60.0
+
+    def configure(self, requests_per_minute: float) -> None:
+        max_rate = max(requests_per_minute, MIN_REQUESTS_PER_MINUTE) / 60.0
+        if max_rate == self._max_rate:
+            return
+        self._max_rate = max_rate
+        self._rate = max_rate
+        self._capacity = max(1.0, max_rate)
+        self._tokens = min(self._tokens, self._capacity)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so tokens are handed out in arrival order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self._paused_until > now:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def on_success(self) -> None:
+        if self._rate < self._max_rate:
+            self._rate = min(self._max_rate, self._rate + self._max_rate * RECOVERY_FRACTION)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        min_rate = MIN_REQUESTS_PER_MINUTE / 60.0
+        self._rate = max(min_rate, self._rate * THROTTLE_FACTOR)
+        self._tokens = min(self._tokens, 0.0)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(
+            "Gemini quota exceeded; throttling to %.1f requests/min (retry after %s s)",
+            self.requests_per_minute,
+            retry_after,
+        )
+
+
+def backoff_delay(
+    attempt: int,
+    *,
+    base: float = 1.0,
+    cap: float = 60.0,
+    retry_after: Optional[float] = None,
+) -> float:
+    """Full-jitter exponential backoff, never shorter than a server hint."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
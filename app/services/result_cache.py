@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.db.database import get_connection, init_db
+
+init_db()
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts: Any) -> str:
+    payload = json.dumps(parts, ensure_ascii=True, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed key/value cache with TTL, entry and byte bounds.
+
+    Entries are evicted least-recently-used first once a bound is exceeded.
+    Hit/miss counters are persisted per namespace.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _record(self, conn, column: str) -> None:
+        conn.execute(
+            """
+            INSERT INTO result_cache_stats (namespace, hits, misses)
+            VALUES (?, 0, 0)
+            ON CONFLICT(namespace) DO NOTHING
+            """,
+            (self.namespace,),
+        )
+        conn.execute(
+            f"UPDATE result_cache_stats SET {column} = {column} + 1 WHERE namespace = ?",
+            (self.namespace,),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM result_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row and self.ttl_seconds and now - row["created_at"] > self.ttl_seconds:
+                conn.execute(
+                    "DELETE FROM result_cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                row = None
+            if row is None:
+                self._record(conn, "misses")
+                conn.commit()
+                return None
+            conn.execute(
+                "UPDATE result_cache SET last_used_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._record(conn, "hits")
+            conn.commit()
+        return row["value"]
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO result_cache (namespace, key, value, size_bytes, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(namespace, key) DO UPDATE
+                SET value=excluded.value,
+                    size_bytes=excluded.size_bytes,
+                    created_at=excluded.created_at,
+                    last_used_at=excluded.last_used_at
+                """,
+                (self.namespace, key, value, size, now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now: float) -> None:
+        if self.ttl_seconds:
+            conn.execute(
+                "DELETE FROM result_cache WHERE namespace = ? AND created_at < ?",
+                (self.namespace, now - self.ttl_seconds),
+            )
+        if self.max_entries:
+            conn.execute(
+                """
+                DELETE FROM result_cache
+                WHERE namespace = ? AND key IN (
+                    SELECT key FROM result_cache
+                    WHERE namespace = ?
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.namespace, self.namespace, self.max_entries),
+            )
+        if self.max_bytes:
+            conn.execute(
+                """
+                DELETE FROM result_cache
+                WHERE namespace = ? AND key IN (
+                    SELECT key FROM (
+                        SELECT key,
+                               SUM(size_bytes) OVER (ORDER BY last_used_at DESC) AS running
+                        FROM result_cache
+                        WHERE namespace = ?
+                    )
+                    WHERE running > ?
+                )
+                """,
+                (self.namespace, self.namespace, self.max_bytes),
+            )
+
+    def purge(self) -> int:
+        with get_connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM result_cache WHERE namespace = ?", (self.namespace,)
+            )
+            conn.commit()
+        logger.info("Purged %s entries from %s cache", cursor.rowcount, self.namespace)
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with get_connection() as conn:
+            totals = conn.execute(
+                """
+                SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size_bytes
+                FROM result_cache WHERE namespace = ?
+                """,
+                (self.namespace,),
+            ).fetchone()
+            counters = conn.execute(
+                "SELECT hits, misses FROM result_cache_stats WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+        hits = counters["hits"] if counters else 0
+        misses = counters["misses"] if counters else 0
+        lookups = hits + misses
+        return {
+            "namespace": self.namespace,
+            "entries": totals["entries"],
+            "size_bytes": totals["size_bytes"],
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,52 @@
+"""Per-call request preparation overhead in GeminiClient.
+
+Compares building a stage's instruction, response schema and
+GenerateContentConfig on every call (what each model call did before the
+artifacts were precompiled) with reading the precompiled artifacts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_request_artifacts [iterations]
+"""
+
+from __future__ import annotations
+
+import sys
+import timeit
+
+from app.services import config_store
+from app.services.gemini_client import STAGE_SPECS, GeminiClient
+
+
+def _prepare(client: GeminiClient, stage: str) -> None:
+    # What one model call needs before it can send: its stage artifacts, the
+    # concrete config and the retry/concurrency settings.
+    client._stage_artifacts(stage)
+    client._generation_config(stage, "cachedContents/bench")
+    client._settings()
+
+
+def _prepare_uncached(client: GeminiClient, stage: str) -> None:
+    settings = config_store.get_gemini_config()
+    artifacts = client._compile_stage(stage, client._get_prompt_text(), settings)
+    artifacts.config.model_copy(update={"cached_content": "cachedContents/bench"})
+    config_store.get_gemini_config()
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    client = GeminiClient()
+    print(f"{'stage':<12}{'rebuilt (us)':>15}{'precompiled (us)':>19}{'speedup':>10}")
+    for stage in STAGE_SPECS:
+        _prepare(client, stage)
+        rebuilt = timeit.timeit(lambda: _prepare_uncached(client, stage), number=iterations)
+        cached = timeit.timeit(lambda: _prepare(client, stage), number=iterations)
+        rebuilt_us = rebuilt / iterations * 1e6
+        cached_us = cached / iterations * 1e6
+        print(
+            f"{stage:<12}{rebuilt_us:>15.1f}{cached_us:>19.1f}{rebuilt_us / cached_us:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -31,7 +31,6 @@ const PLAN_CATEGORIES = planCategories.map((category) => ({
 }));
 const DETECTING_CATEGORY_VALUE = '__detecting__';
 const DEFAULT_PLAN_CATEGORY = PLAN_CATEGORIES[0]?.value || '';
-const PLAN_STATUS_POLL_MS = 10000;
 const MIN_WAIT_MS = 60 * 1000;
 const getLoadingMessage = () =>
   Math.random() < 0.25 ? 'Analyserer plantegning' : 'Genererer renholdsplan';
@@ -295,7 +294,8 @@ const GeneratorView = () => {
   const [isDetectingCategory, setIsDetectingCategory] = useState(false);
   const [categoryDetectionError, setCategoryDetectionError] = useState('');
   const [hasManualCategory, setHasManualCategory] = useState(false);
-  const planStatusTimerRef = useRef(null);
+  const [streamRows, setStreamRows] = useState([]);
+  const planStreamRef = useRef(null);
   const hasManualCategoryRef = useRef(false);
 
   useEffect(() => {
@@ -316,7 +316,9 @@ const GeneratorView = () => {
     activeJob?.status === 'pending'
       ? 'Jobb i kø...'
       : activeJob?.status === 'running'
-        ? 'Jobb kjører...'
+        ? activeJob.stage === 'extraction' && activeJob.total_files > 0
+          ? `${activeJob.processed_files}/${activeJob.total_files} etasjer analysert`
+          : 'Jobb kjører...'
         : '';
   const loadingHeadline = statusMessage || jobHeadline || 'Genererer renholdsplan';
   const uploadCountDescription = fileIds.length === 1 ? '1 plantegning' : `${fileIds.length} plantegninger`;
@@ -346,16 +348,16 @@ const GeneratorView = () => {
     fetchHistory();
   }, [fetchHistory]);
 
-  const stopPlanPolling = useCallback(() => {
-    if (planStatusTimerRef.current) {
-      clearInterval(planStatusTimerRef.current);
-      planStatusTimerRef.current = null;
+  const stopPlanEvents = useCallback(() => {
+    if (planStreamRef.current) {
+      planStreamRef.current.close();
+      planStreamRef.current = null;
     }
   }, []);
 
   useEffect(() => {
-    return () => stopPlanPolling();
-  }, [stopPlanPolling]);
+    return () => stopPlanEvents();
+  }, [stopPlanEvents]);
 
   const detectPlanCategory = useCallback(
     async (fileId) => {
@@ -397,59 +399,108 @@ const GeneratorView = () => {
     detectPlanCategory(fileIds[0]);
   }, [fileIds, detectPlanCategory]);
 
-  const pollJobStatus = useCallback(
+  const finishPlanJob = useCallback(
+    (plan, docxPath) => {
+      setPlanRows(normalizePlanEntries(plan));
+      setPlanMeta({
+        totalArea: plan?.total_area_m2,
+        templateName: plan?.template_name
+      });
+      setDocxUrl(docxPath ? `${API_BASE}${docxPath}` : '');
+      setProcessingProgress(100);
+      setProcessingStartTime(null);
+      setStep(4);
+      setIsGenerating(false);
+      setStatusMessage('');
+      setActiveJob(null);
+      fetchHistory();
+    },
+    [fetchHistory]
+  );
+
+  const failPlanJob = useCallback((message) => {
+    setError(message || 'Generering mislyktes');
+    setProcessingProgress(0);
+    setProcessingStartTime(null);
+    setIsGenerating(false);
+    setStatusMessage('');
+    setActiveJob(null);
+    setStep(2);
+  }, []);
+
+  // One status request, for when the event stream ends without a result
+  // (e.g. the job finished before we connected) or cannot be opened.
+  const fetchPlanResult = useCallback(
+    async (jobId) => {
+      try {
+        const response = await fetch(`${API_BASE}/generate-plan/status/${jobId}`);
+        const data = await parseApiResponse(response, 'Kunne ikke hente jobbstatus');
+        if (data.job.status === 'success') {
+          finishPlanJob(data.plan, data.docx_url);
+        } else if (data.job.status === 'failed') {
+          failPlanJob(data.job.detail?.message || data.job.detail?.error || data.job.message);
+        } else {
+          failPlanJob('Mistet forbindelsen til jobben');
+        }
+      } catch (err) {
+        failPlanJob(err.message);
+      }
+    },
+    [finishPlanJob, failPlanJob]
+  );
+
+  const followPlanJob = useCallback(
     (jobId) => {
-      const run = async () => {
-        try {
-          const response = await fetch(`${API_BASE}/generate-plan/status/${jobId}`);
-          const data = await parseApiResponse(response, 'Kunne ikke hente jobbstatus');
-          setActiveJob(data.job);
-          if (data.job.status === 'success') {
-            stopPlanPolling();
-            setPlanRows(normalizePlanEntries(data.plan));
-            setPlanMeta({
-              totalArea: data.plan?.total_area_m2,
-              templateName: data.plan?.template_name
-            });
-            setDocxUrl(data.docx_url ? `${API_BASE}${data.docx_url}` : '');
-            setProcessingProgress(100);
-            setProcessingStartTime(null);
-            setStep(4);
-            setIsGenerating(false);
-            setStatusMessage('');
-            setActiveJob(null);
-            fetchHistory();
-          } else if (data.job.status === 'failed') {
-            stopPlanPolling();
-            const jobMessage =
-              data.job.detail?.message ||
-              data.job.detail?.error ||
-              data.job.message ||
-              'Generering mislyktes';
-            setError(jobMessage);
-            setProcessingProgress(0);
-            setProcessingStartTime(null);
-            setIsGenerating(false);
-            setStatusMessage('');
-            setActiveJob(null);
-            setStep(2);
-          }
-        } catch (err) {
-          stopPlanPolling();
-          setError(err.message);
-          setProcessingProgress(0);
-          setProcessingStartTime(null);
-          setIsGenerating(false);
-          setStatusMessage('');
-          setActiveJob(null);
-          setStep(2);
+      if (typeof window === 'undefined' || !window.EventSource) {
+        fetchPlanResult(jobId);
+        return;
+      }
+      setStreamRows([]);
+      let finished = false;
+      // The browser reconnects on its own and resumes from Last-Event-ID.
+      const source = new window.EventSource(`${API_BASE}/generate-plan/stream/${jobId}`);
+      const close = () => {
+        finished = true;
+        source.close();
+        if (planStreamRef.current === source) {
+          planStreamRef.current = null;
         }
       };
-      run();
-      const schedule = typeof window === 'undefined' ? setInterval : window.setInterval;
-      planStatusTimerRef.current = schedule(run, PLAN_STATUS_POLL_MS);
+      source.addEventListener('status', (event) => {
+        const job = safeJsonParse(event.data);
+        if (job) setActiveJob(job);
+      });
+      source.addEventListener('entry', (event) => {
+        const entry = safeJsonParse(event.data);
+        if (!entry) return;
+        setStreamRows((prev) => [
+          ...prev,
+          ...normalizePlanEntries({ entries: [entry] }).map((row) => ({ ...row, id: prev.length + 1 }))
+        ]);
+      });
+      source.addEventListener('plan', (event) => {
+        const data = safeJsonParse(event.data) || {};
+        close();
+        finishPlanJob(data.plan, data.docx_url);
+      });
+      source.addEventListener('error', (event) => {
+        if (event.data) {
+          const data = safeJsonParse(event.data) || {};
+          close();
+          failPlanJob(data.detail?.message || data.detail?.error || data.message);
+        } else if (!finished && source.readyState === window.EventSource.CLOSED) {
+          close();
+          fetchPlanResult(jobId);
+        }
+      });
+      source.addEventListener('end', () => {
+        if (finished) return;
+        close();
+        fetchPlanResult(jobId);
+      });
+      planStreamRef.current = source;
     },
-    [fetchHistory, stopPlanPolling]
+    [fetchPlanResult, finishPlanJob, failPlanJob]
   );
 
   const DEFAULT_WAIT_MS = 3 * 60 * 1000;
@@ -533,7 +584,7 @@ const GeneratorView = () => {
   };
 
   const clearFiles = () => {
-    stopPlanPolling();
+    stopPlanEvents();
     setActiveJob(null);
     setUploads([]);
     setPlanRows([]);
@@ -573,7 +624,7 @@ const GeneratorView = () => {
       return;
     }
     setError(null);
-    stopPlanPolling();
+    stopPlanEvents();
     setActiveJob(null);
     setIsGenerating(true);
     setProcessingProgress(5);
@@ -595,7 +646,8 @@ const GeneratorView = () => {
           !options.planCategory || options.planCategory === DETECTING_CATEGORY_VALUE
             ? null
             : options.planCategory
-      }
+      },
+      stream: true
     };
 
     try {
@@ -606,7 +658,7 @@ const GeneratorView = () => {
       });
       const data = await parseApiResponse(response, 'Kunne ikke starte jobben');
       setActiveJob(data.job);
-      pollJobStatus(data.job.id);
+      followPlanJob(data.job.id);
     } catch (err) {
       setError(err.message);
       setProcessingProgress(0);
@@ -947,6 +999,15 @@ const GeneratorView = () => {
         </Card>
       )}
 
+      {step === 3 && streamRows.length > 0 && (
+        <Card className="overflow-hidden mt-6">
+          <div className="p-4 border-b border-gray-100 text-sm text-gray-500">
+            Forhåndsvisning – {streamRows.length} områder generert så langt
+          </div>
+          <PlanTable rows={streamRows} readOnly />
+        </Card>
+      )}
+
       {step === 4 && (
         <div className="space-y-6 animate-in fade-in">
           <div className="flex items-center justify-between">
@@ -1129,30 +1190,53 @@ const BatchView = () => {
 
   const fileIds = useMemo(() => uploads.map((file) => file.id), [uploads]);
 
+  const batchJobId = batchJob?.id;
+  // Bumped on resume, so the same job's event stream is reopened.
+  const [batchRun, setBatchRun] = useState(0);
+  const canResumeBatch =
+    batchJob &&
+    ['success', 'failed'].includes(batchJob.status) &&
+    batchJob.processed_files < batchJob.total_files;
+
   useEffect(() => {
-    if (!batchJob || ['success', 'failed'].includes(batchJob.status)) {
-      return;
+    if (!batchJobId || typeof window === 'undefined' || !window.EventSource) {
+      return undefined;
     }
-    const interval = setInterval(async () => {
+    let finished = false;
+    const source = new window.EventSource(`${API_BASE}/batch/stream/${batchJobId}`);
+    // Results are fetched once, after the job's last event.
+    const loadResults = async () => {
+      finished = true;
+      source.close();
       try {
-        const response = await fetch(`${API_BASE}/batch/status/${batchJob.id}`);
-        const data = await parseApiResponse(response, 'Kunne ikke hente batchstatus');
+        const response = await fetch(`${API_BASE}/batch/results/${batchJobId}`);
+        const data = await parseApiResponse(response, 'Kunne ikke hente batchresultater');
         setBatchJob(data.job);
+        setBatchPlans(data.plans || []);
         if (data.job.status === 'failed' && data.job.message) {
           setError(data.job.message);
-          return;
-        }
-        if (data.job.status === 'success') {
-          const resultsResponse = await fetch(`${API_BASE}/batch/results/${data.job.id}`);
-          const results = await parseApiResponse(resultsResponse, 'Kunne ikke hente batchresultater');
-          setBatchPlans(results.plans || []);
         }
       } catch (err) {
         setError(err.message);
       }
-    }, 2000);
-    return () => clearInterval(interval);
-  }, [batchJob]);
+    };
+    source.addEventListener('status', (event) => {
+      const job = safeJsonParse(event.data);
+      if (job) setBatchJob(job);
+    });
+    source.addEventListener('end', () => {
+      if (!finished) loadResults();
+    });
+    source.addEventListener('error', () => {
+      if (!finished && source.readyState === window.EventSource.CLOSED) {
+        loadResults();
+      }
+    });
+    return () => {
+      finished = true;
+      source.close();
+    };
+  }, [batchJobId, batchRun]);
 
   const handleBatchUpload = async (event) => {
     const selectedFiles = Array.from(event.target.files || []);
@@ -1209,6 +1293,19 @@ const BatchView = () => {
     }
   };
 
+  const resumeBatchJob = async () => {
+    if (!batchJob) return;
+    setError(null);
+    try {
+      const response = await fetch(`${API_BASE}/batch/${batchJob.id}/resume`, { method: 'POST' });
+      const data = await parseApiResponse(response, 'Kunne ikke gjenoppta batchjobb');
+      setBatchJob(data.job);
+      setBatchRun((prev) => prev + 1);
+    } catch (err) {
+      setError(err.message);
+    }
+  };
+
   return (
     <div className="max-w-6xl mx-auto space-y-6">
       {error && <ErrorBanner message={error} />}
@@ -1257,6 +1354,17 @@ const BatchView = () => {
                     {batchJob.status === 'failed' ? 'Feil:' : 'Info:'} {batchJob.message}
                   </p>
                 )}
+                {batchJob.success_rate != null && (
+                  <p className="text-xs text-gray-500 mt-1">
+                    {Math.round(batchJob.success_rate * 100)}% vellykket
+                    {batchJob.files_per_minute != null && ` · ${batchJob.files_per_minute} filer/min`}
+                  </p>
+                )}
+                {canResumeBatch && (
+                  <Button variant="secondary" className="mt-3" icon={RefreshCw} onClick={resumeBatchJob}>
+                    Gjenoppta ubehandlede filer
+                  </Button>
+                )}
               </div>
             )}
           </div>
@@ -1318,7 +1426,15 @@ const AdminDashboard = () => {
   const [promptMeta, setPromptMeta] = useState({ updated_at: null, is_overridden: false });
   const [isPromptLoading, setIsPromptLoading] = useState(true);
   const [isPromptSaving, setIsPromptSaving] = useState(false);
-  const [geminiConfig, setGeminiConfig] = useState({ temperature: '', top_p: '', media_resolution: '' });
+  const [geminiConfig, setGeminiConfig] = useState({
+    temperature: '',
+    top_p: '',
+    media_resolution: '',
+    extraction_concurrency: ''
+  });
+  // Settings without a field here are sent back unchanged: the endpoint
+  // replaces the whole config.
+  const storedGeminiConfig = useRef({});
   const [isGeminiConfigLoading, setIsGeminiConfigLoading] = useState(true);
   const [isGeminiConfigSaving, setIsGeminiConfigSaving] = useState(false);
 
@@ -1365,10 +1481,12 @@ const AdminDashboard = () => {
       }
       const data = await response.json();
       const cfg = data.config || {};
+      storedGeminiConfig.current = cfg;
       setGeminiConfig({
         temperature: cfg.temperature ?? '',
         top_p: cfg.top_p ?? '',
-        media_resolution: cfg.media_resolution || ''
+        media_resolution: cfg.media_resolution || '',
+        extraction_concurrency: cfg.extraction_concurrency ?? ''
       });
     } catch (err) {
       setError(err.message || 'Ukjent feil ved henting av Gemini-konfigurasjon');
@@ -1492,9 +1610,14 @@ const AdminDashboard = () => {
     try {
       setIsGeminiConfigSaving(true);
       const payload = {
+        ...storedGeminiConfig.current,
         temperature: geminiConfig.temperature === '' ? null : Number(geminiConfig.temperature),
         top_p: geminiConfig.top_p === '' ? null : Number(geminiConfig.top_p),
-        media_resolution: geminiConfig.media_resolution || null
+        media_resolution: geminiConfig.media_resolution || null,
+        extraction_concurrency:
+          geminiConfig.extraction_concurrency === ''
+            ? null
+            : Number(geminiConfig.extraction_concurrency)
       };
       const response = await fetch(`${API_BASE}/admin/gemini-config`, {
         method: 'POST',
@@ -1506,10 +1629,12 @@ const AdminDashboard = () => {
       }
       const data = await response.json();
       const cfg = data.config || {};
+      storedGeminiConfig.current = cfg;
       setGeminiConfig({
         temperature: cfg.temperature ?? '',
         top_p: cfg.top_p ?? '',
-        media_resolution: cfg.media_resolution || ''
+        media_resolution: cfg.media_resolution || '',
+        extraction_concurrency: cfg.extraction_concurrency ?? ''
       });
       setMessage('Gemini-konfigurasjonen er lagret.');
     } catch (err) {
@@ -1666,6 +1791,26 @@ const AdminDashboard = () => {
                     Gjelder analyse av bilder/PDF.
                   </p>
                 </div>
+                <div>
+                  <label className="block text-xs font-semibold text-slate-400 mb-1 tracking-wide">
+                    PARALLELLE ETASJER
+                  </label>
+                  <input
+                    type="number"
+                    step="1"
+                    min="1"
+                    max="16"
+                    className="w-full bg-slate-950 border border-slate-800 rounded-lg px-3 py-2 text-sm focus:border-indigo-500 focus:ring-0"
+                    placeholder="Standard (4)"
+                    value={geminiConfig.extraction_concurrency}
+                    onChange={(e) =>
+                      setGeminiConfig((prev) => ({ ...prev, extraction_concurrency: e.target.value }))
+                    }
+                  />
+                  <p className="text-[11px] text-slate-500 mt-1">
+                    Antall plantegninger som analyseres samtidig.
+                  </p>
+                </div>
               </div>
               <div className="flex items-center justify-end">
                 <Button
@@ -10,6 +10,7 @@ PORT="${PORT:-8000}"
 VENV_PATH="${VENV_PATH:-$ROOT_DIR/.venv}"
 ENV_FILE="${ENV_FILE:-$ROOT_DIR/.env}"
 RELOAD="${RELOAD:-0}"
+WORKERS="${WORKERS:-1}"
 RELOAD_DIRS="${RELOAD_DIRS:-app frontend.jsx}"
 RELOAD_EXCLUDES="${RELOAD_EXCLUDES:-.venv storage}"
 
@@ -44,6 +45,9 @@ fi
 echo "Starting CleanSync API → http://$HOST:$PORT"
 
 UVICORN_ARGS=(--host "$HOST" --port "$PORT")
+if [[ "$RELOAD" != "1" && "$WORKERS" -gt 1 ]]; then
+  UVICORN_ARGS+=(--workers "$WORKERS")
+fi
 if [[ "$RELOAD" == "1" ]]; then
   UVICORN_ARGS+=(--reload)
   for dir in $RELOAD_DIRS; do
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from app.db import database
+
+# Every store module runs init_db() at import, so the database has to point
+# at a throwaway file before any of them is imported.
+database.DB_PATH = Path(tempfile.mkdtemp(prefix="cleansync-tests-")) / "cleansync.db"
+
+from app.db.database import get_connection  # noqa: E402
+from app.services import config_store  # noqa: E402
+from app.services.gemini_client import GeminiClient  # noqa: E402
+from app.services.gemini_files import FileReferenceRegistry, LocalFilesBackend  # noqa: E402
+
+
+@pytest.fixture
+def gemini_client(monkeypatch):
+    """A client that never reaches Gemini: local Files API, no context caches."""
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    client = GeminiClient()
+    client.file_refs = FileReferenceRegistry(LocalFilesBackend())
+
+    async def no_context_cache(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(client, "_ensure_cached_instruction", no_context_cache)
+    yield client
+    config_store.set_gemini_config({})
+
+
+@pytest.fixture
+def empty_job_queue():
+    """The ``job_queue`` table without rows left over from other tests."""
+    with get_connection() as conn:
+        conn.execute("DELETE FROM job_queue")
+        conn.commit()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.models.schemas import BatchJob, BatchJobStatus, CleaningPlan, FloorPlanOptions
+from app.services import batch_items, batch_runner, gemini_batches, plan_store
+from app.services.batch_runner import BatchRunner
+from app.services.gemini_client import GeminiServiceError
+from app.services.job_events import END_EVENT, InMemoryJobEventStore, JobEventLog
+from app.services.job_queue import ABANDONED_JOB_MESSAGE, JobQueue
+from app.services.job_state import InMemoryJobStateStore
+
+pytestmark = pytest.mark.usefixtures("empty_job_queue")
+
+
+@pytest.fixture
+def runner(gemini_client, monkeypatch):
+    monkeypatch.setattr(batch_runner, "BATCH_ITEM_RETRIES", 3)
+    monkeypatch.setattr(batch_runner, "backoff_delay", lambda attempt, retry_after=None: 0)
+    return BatchRunner(
+        gemini_client,
+        JobQueue(),
+        state=InMemoryJobStateStore(),
+        events=JobEventLog(InMemoryJobEventStore(), poll_seconds=0.01),
+    )
+
+
+def _stored_job(runner: BatchRunner, job_id: str) -> BatchJob:
+    return BatchJob.model_validate_json(runner._state.load(job_id, "batch"))
+
+
+def test_direct_batch_fails_files_alone_and_retries_only_retryable_errors(
+    runner, monkeypatch
+):
+    attempts = {"ok": 0, "flaky": 0, "broken": 0}
+
+    async def process(file_id: str, options: FloorPlanOptions) -> CleaningPlan:
+        attempts[file_id] += 1
+        if file_id == "flaky" and attempts[file_id] < 2:
+            raise GeminiServiceError("busy", status_code=503, is_retryable=True)
+        if file_id == "broken":
+            raise ValueError("not a floor plan")
+        return CleaningPlan(entries=[], total_area_m2=0)
+
+    monkeypatch.setattr(runner, "_process_file", process)
+
+    async def run():
+        job = await runner.start_job(["ok", "flaky", "broken", "ok"], FloorPlanOptions())
+        queued = runner._queue.claim("tests")
+        assert queued is not None and queued.id == job.id
+        await runner.run_queued(queued)
+        return job.id
+
+    job_id = asyncio.run(run())
+
+    job = _stored_job(runner, job_id)
+    assert job.status == BatchJobStatus.success
+    assert (job.total_files, job.processed_files, job.failed_files) == (3, 2, 1)
+    assert attempts == {"ok": 1, "flaky": 2, "broken": 1}
+    assert {item["file_id"]: item["status"] for item in batch_items.list_items(job_id)} == {
+        "ok": "success",
+        "flaky": "success",
+        "broken": "failed",
+    }
+    # The plan rows record the item's outcome, not the job's status mid-run.
+    assert {
+        stored["file_id"]: stored["metadata"] for stored in plan_store.list_job_plans(job_id)
+    } == {
+        "ok": {"status": "success", "attempts": 1},
+        "flaky": {"status": "success", "attempts": 2},
+    }
+    assert len(runner.get_results(job_id)) == 2
+
+
+def test_batch_api_items_are_running_once_submitted(runner, monkeypatch):
+    async def submit(file_paths, options, *, display_name):
+        return "batches/submitted"
+
+    monkeypatch.setattr(runner._client, "submit_extraction_batch", submit)
+    monkeypatch.setattr(batch_runner, "get_file_path", lambda file_id: file_id)
+
+    async def run():
+        job = await runner.start_job(["a", "b"], FloorPlanOptions(), use_batch_api=True)
+        await runner.run_queued(runner._queue.claim("tests"))
+        return job.id
+
+    job_id = asyncio.run(run())
+    gemini_batches.mark_finished("batches/submitted")
+
+    assert [(item["status"], item["attempts"]) for item in batch_items.list_items(job_id)] == [
+        ("running", 1),
+        ("running", 1),
+    ]
+
+
+def test_abandoned_job_is_failed_and_its_stream_closed(runner):
+    async def run():
+        return await runner.start_job(["a"], FloorPlanOptions())
+
+    job = asyncio.run(run())
+    runner.abandon(job.id)
+
+    stored = _stored_job(runner, job.id)
+    assert stored.status == BatchJobStatus.failed
+    assert stored.message == ABANDONED_JOB_MESSAGE
+    assert [event for _, event, _ in runner.events.events(job.id)][-1] == END_EVENT
+
+
+def test_resume_only_reruns_files_without_a_plan(runner, monkeypatch):
+    attempts = {"a": 0, "b": 0, "c": 0}
+    broken = {"b"}
+
+    async def process(file_id: str, options: FloorPlanOptions) -> CleaningPlan:
+        attempts[file_id] += 1
+        if file_id in broken:
+            raise ValueError("not a floor plan")
+        return CleaningPlan(entries=[], total_area_m2=0)
+
+    monkeypatch.setattr(runner, "_process_file", process)
+
+    async def run_next():
+        queued = runner._queue.claim("tests")
+        runner._queue.finish(queued.id, "tests", error=await runner.run_queued(queued))
+
+    async def run():
+        job = await runner.start_job(["a", "b", "c"], FloorPlanOptions())
+        await run_next()
+        broken.clear()
+        resumed = runner.resume_job(job.id)
+        await run_next()
+        return job.id, resumed
+
+    job_id, resumed = asyncio.run(run())
+
+    assert (resumed.processed_files, resumed.message) == (2, "Gjenopptar 1 av 3 filer")
+    assert attempts == {"a": 1, "b": 2, "c": 1}
+    job = _stored_job(runner, job_id)
+    assert (job.status, job.processed_files, job.failed_files) == (BatchJobStatus.success, 3, 0)
+
+    # Once evicted, the status comes from the queue and the stored plans.
+    runner.jobs.pop(job_id)
+    runner._state.delete(job_id)
+    evicted = runner.get_status(job_id)
+    assert (evicted.status, evicted.processed_files, evicted.failed_files) == (
+        BatchJobStatus.success,
+        3,
+        0,
+    )
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.domain.cleaning_rules import plan_standard_rooms, rules_from_prompt
+from app.models.schemas import Room
+
+PROMPT_TEXT = Path("prompt.txt").read_text(encoding="utf-8")
+
+
+def _room(name: str, room_type: str = "", floor: str = "1") -> Room:
+    return Room(id=name, name=name, type=room_type, floor=floor, area_m2=10.0)
+
+
+def test_descriptions_come_from_the_prompt():
+    rules = {rule.group: rule.description for rule in rules_from_prompt(PROMPT_TEXT)}
+
+    assert set(rules) == {"wc", "kitchen", "wardrobe", "standard"}
+    assert rules["kitchen"].startswith("Tilgjengelige gulvflater")
+    assert "arbeidsbenker" in rules["kitchen"]
+    # The prompt's stray double full stop and double spaces are tidied up.
+    assert rules["wardrobe"].endswith("tømmes.")
+    assert "  " not in rules["wc"]
+
+
+def test_edited_prompt_changes_the_local_plan():
+    edited = PROMPT_TEXT.replace("Avfallsbeholdere tømmes.”", "Avfall tømmes.”", 1)
+
+    entries, _ = plan_standard_rooms([_room("Kontor 1")], edited)
+
+    assert entries[0].description.endswith("Avfall tømmes.")
+
+
+def test_room_types_without_a_prompt_description_go_to_the_model():
+    prompt_text = PROMPT_TEXT.replace("For kjøkken:", "Kjøkken:")
+
+    entries, unclassified = plan_standard_rooms(
+        [_room("Tekjøkken"), _room("WC", "wc")], prompt_text
+    )
+
+    assert [entry.room_name for entry in entries] == ["WC"]
+    assert [room.name for room in unclassified] == ["Tekjøkken"]
+
+
+def test_playrooms_follow_the_standard_text_in_every_category():
+    for category in (None, "office", "kindergarten"):
+        entries, unclassified = plan_standard_rooms(
+            [_room("Lekerom"), _room("Grupperom 2")], PROMPT_TEXT, category
+        )
+
+        assert len(entries) == 2 and not unclassified
+        assert entries[0].floor == "1 ETG"
+
+
+def test_restaurant_kitchens_go_to_the_model():
+    _, unclassified = plan_standard_rooms([_room("Kjøkken")], PROMPT_TEXT, "bar_restaurant")
+
+    assert [room.name for room in unclassified] == ["Kjøkken"]
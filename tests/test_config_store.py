@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from app.db.database import get_connection
+from app.services import config_store
+
+
+def _write_from_another_worker(name: str, value: str, *, bump_version: bool) -> None:
+    with get_connection() as conn:
+        conn.execute("UPDATE settings SET value = ? WHERE name = ?", (value, name))
+        if bump_version:
+            conn.execute("UPDATE config_version SET version = version + 1 WHERE id = 1")
+        conn.commit()
+
+
+def test_reads_are_served_from_memory_until_the_version_changes(monkeypatch):
+    config_store.set_setting("tests-cached", "1")
+    assert config_store.get_setting("tests-cached")["value"] == "1"
+    monkeypatch.setattr(config_store, "CONFIG_VERSION_CHECK_SECONDS", 0.0)
+
+    _write_from_another_worker("tests-cached", "2", bump_version=False)
+    assert config_store.get_setting("tests-cached")["value"] == "1"
+
+    _write_from_another_worker("tests-cached", "3", bump_version=True)
+    assert config_store.get_setting("tests-cached")["value"] == "3"
+
+
+def test_local_writes_invalidate_at_once(monkeypatch):
+    monkeypatch.setattr(config_store, "CONFIG_VERSION_CHECK_SECONDS", 3600.0)
+    config_store.set_setting("tests-local", "before")
+    assert config_store.get_setting("tests-local")["value"] == "before"
+    version = config_store.config_version()
+
+    config_store.set_setting("tests-local", "after")
+    config_store.delete_setting("tests-gone")
+
+    assert config_store.get_setting("tests-local")["value"] == "after"
+    assert config_store.config_version() == version + 2
+
+
+def test_api_keys_are_cached_and_invalidated(monkeypatch):
+    monkeypatch.setattr(config_store, "CONFIG_VERSION_CHECK_SECONDS", 3600.0)
+    config_store.set_api_key("tests-key", "first")
+    assert config_store.get_api_key_value("Tests-Key ") == "first"
+
+    config_store.set_api_key("tests-key", "second")
+    assert config_store.get_api_key_value("tests-key") == "second"
+
+    config_store.delete_api_key("tests-key")
+    assert config_store.get_api_key_value("tests-key") is None
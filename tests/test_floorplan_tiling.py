@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+from PIL import Image
+
+from app.services import floorplan_tiling
+from app.services.floorplan_tiling import cut_tiles, image_size
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_pillow_guard_is_untouched_outside_tiling(monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    data = _encode(Image.new("L", (100, 100), 255), "PNG")
+
+    # Above Pillow's limit (and twice it): the size still comes from the header.
+    assert image_size(data) == (100, 100)
+    assert Image.MAX_IMAGE_PIXELS == 1000
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(io.BytesIO(data))
+
+
+def test_tiles_cover_the_raster_with_overlap():
+    data = _encode(Image.new("L", (250, 120), 255), "PNG")
+
+    tiles = cut_tiles(data, edge=100, overlap=20)
+
+    assert [(tile.left, tile.top) for tile in tiles] == [
+        (0, 0), (80, 0), (150, 0),
+        (0, 20), (80, 20), (150, 20),
+    ]
+    assert all((tile.width, tile.height) == (100, 100) for tile in tiles)
+
+
+def test_rasters_over_the_memory_budget_are_refused(monkeypatch):
+    monkeypatch.setattr(floorplan_tiling, "TILE_MEMORY_BUDGET_BYTES", 100 * 100)
+    data = _encode(Image.new("RGB", (200, 200), "white"), "PNG")
+
+    with pytest.raises(ValueError):
+        cut_tiles(data, edge=100, overlap=20)
+
+
+def test_large_jpegs_are_decoded_at_reduced_scale(monkeypatch):
+    monkeypatch.setattr(floorplan_tiling, "TILE_MEMORY_BUDGET_BYTES", 200 * 200)
+    data = _encode(Image.new("RGB", (400, 400), "white"), "JPEG")
+
+    tiles = cut_tiles(data, edge=300, overlap=20)
+
+    assert [(tile.width, tile.height) for tile in tiles] == [(200, 200)]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from google.genai import types
+from PIL import Image
+
+from app.models.schemas import FloorPlanOptions
+from app.services import gemini_batches
+from app.services.gemini_batches import LocalBatchesBackend
+
+
+def _drawing(path, shade: int):
+    image = Image.new("RGB", (64, 48), "white")
+    image.paste((shade, shade, shade), (8, 8, 40, 30))
+    image.save(path, format="PNG")
+    return path
+
+
+def _extraction_responder(request):
+    text = "".join(part.text or "" for part in request.contents[0].parts)
+    if "fail" in text:
+        raise RuntimeError("model overloaded")
+    return json.dumps({"rooms": [{"id": "r1", "name": "Kontor", "type": "office"}]})
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(gemini_batches, "BATCH_POLL_INITIAL_SECONDS", 0.0)
+
+
+def test_extraction_batch_round_trip(gemini_client, tmp_path):
+    backend = LocalBatchesBackend(_extraction_responder, polls_until_done=3)
+    gemini_client.batch_backend = backend
+    files = [_drawing(tmp_path / f"plan{index}.png", 40 * index) for index in range(3)]
+
+    async def run():
+        name = await gemini_client.submit_extraction_batch(files, FloorPlanOptions())
+        return name, await gemini_client.wait_for_batch(name)
+
+    name, remote = asyncio.run(run())
+    items = gemini_client.extraction_batch_results(remote)
+
+    assert len(backend.jobs[name]) == 3
+    assert gemini_client.file_refs.backend.upload_count == 3
+    assert [[room.name for room in rooms] for rooms in items] == [["Kontor"]] * 3
+
+
+
+def test_failed_batch_items_stay_per_item(gemini_client):
+    backend = LocalBatchesBackend(_extraction_responder)
+    gemini_client.batch_backend = backend
+
+    async def run():
+        requests = [
+            types.InlinedRequest(
+                model=gemini_client.model_name,
+                contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+            )
+            for text in ("ok", "fail", "ok")
+        ]
+        name = await gemini_client._create_batch(requests, "tests")
+        return await gemini_client.wait_for_batch(name)
+
+    items = gemini_client.extraction_batch_results(asyncio.run(run()))
+
+    assert not isinstance(items[0], Exception)
+    assert isinstance(items[1], RuntimeError)
+    assert "overloaded" in str(items[1])
+    assert not isinstance(items[2], Exception)
+
+
+def test_polling_survives_transport_errors(monkeypatch):
+    backend = LocalBatchesBackend(_extraction_responder)
+    real_get = backend.get
+    polls = []
+
+    async def get(name):
+        polls.append(name)
+        if len(polls) == 1:
+            raise httpx.ConnectError("connection reset")
+        return await real_get(name)
+
+    async def run():
+        job = await backend.create("model", [], "tests")
+        backend.get = get
+        return await gemini_batches.poll_batch(backend, job.name)
+
+    remote = asyncio.run(run())
+
+    assert remote.done
+    assert len(polls) == 2
+
+def test_claim_is_kept_while_a_batch_is_finished(monkeypatch):
+    monkeypatch.setattr(gemini_batches, "BATCH_CLAIM_LEASE_SECONDS", 0.06)
+    gemini_batches.save_batch(
+        "batches/finishing", job_id="finishing", stage="extraction", file_ids=["f1"]
+    )
+
+    async def finish_slowly():
+        # Fallback calls that take several leases.
+        async with gemini_batches.keep_claim("batches/finishing"):
+            await asyncio.sleep(0.2)
+
+    asyncio.run(finish_slowly())
+    claimed = gemini_batches.claim_stale_batches()
+
+    assert "batches/finishing" not in [record["name"] for record in claimed]
+    gemini_batches.mark_finished("batches/finishing")
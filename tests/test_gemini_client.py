@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import time
+
+import pytest
+from google.genai import errors as genai_errors
+from PIL import Image
+
+from app.services import config_store, gemini_client as gemini_client_module
+from app.services.call_ledger import CallRecord
+from app.models.schemas import FloorPlanOptions
+from app.services.gemini_client import GeminiServiceError
+
+
+def _api_error(code: int, status: str) -> genai_errors.APIError:
+    error_type = genai_errors.ServerError if code >= 500 else genai_errors.ClientError
+    return error_type(code, {"error": {"code": code, "message": status, "status": status}})
+
+
+def _configure(**settings) -> None:
+    # A generous rate so the token bucket never delays the tests.
+    config_store.set_gemini_config({"requests_per_minute": 60_000, **settings})
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(gemini_client_module, "backoff_delay", lambda *args, **kwargs: 0)
+
+
+def _send_sequence(outcomes):
+    calls = []
+
+    async def send(cached=None):
+        calls.append(time.perf_counter())
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, float):
+            await asyncio.sleep(outcome)
+            return "slow"
+        return outcome
+
+    return send, calls
+
+
+def test_retryable_errors_are_retried(gemini_client, no_backoff):
+    _configure(max_retries=3)
+    send, calls = _send_sequence(
+        [_api_error(503, "UNAVAILABLE"), _api_error(500, "INTERNAL"), "ok"]
+    )
+    record = CallRecord(stage="tests", model="test")
+
+    result = asyncio.run(gemini_client._with_retries(send, record=record))
+
+    assert result == "ok"
+    assert len(calls) == 3
+    assert record.retries == 2
+    assert record.outcome == "success"
+
+
+def test_non_retryable_errors_fail_at_once(gemini_client, no_backoff):
+    _configure(max_retries=3)
+    send, calls = _send_sequence([_api_error(400, "INVALID_ARGUMENT"), "ok"])
+    record = CallRecord(stage="tests", model="test")
+
+    with pytest.raises(GeminiServiceError) as raised:
+        asyncio.run(gemini_client._with_retries(send, record=record))
+
+    assert raised.value.status_code == 400
+    assert len(calls) == 1
+    assert record.outcome == "error"
+
+
+def test_retries_stop_at_max_retries(gemini_client, no_backoff):
+    _configure(max_retries=1)
+    send, calls = _send_sequence([_api_error(503, "UNAVAILABLE")] * 3)
+
+    with pytest.raises(GeminiServiceError):
+        asyncio.run(
+            gemini_client._with_retries(send, record=CallRecord(stage="tests", model="test"))
+        )
+
+    assert len(calls) == 2
+
+
+def test_slow_call_hits_the_deadline(gemini_client, no_backoff):
+    _configure(call_deadline_seconds=0.05)
+    send, calls = _send_sequence([0.5])
+    record = CallRecord(stage="tests", model="test")
+
+    with pytest.raises(GeminiServiceError) as raised:
+        asyncio.run(gemini_client._with_retries(send, record=record))
+
+    assert raised.value.reason == "DEADLINE_EXCEEDED"
+    assert len(calls) == 1
+    assert record.outcome == "timeout"
+
+
+def test_waiting_for_a_call_slot_does_not_count_against_the_deadline(gemini_client):
+    # One slot, each call takes 0.15 s of a 0.25 s deadline: the second call
+    # queues behind the first for longer than its own deadline allows in total.
+    _configure(call_deadline_seconds=0.25, max_concurrent_calls=1)
+    records = [CallRecord(stage="tests", model="test") for _ in range(2)]
+
+    async def run():
+        async def call(record):
+            send, _ = _send_sequence([0.15])
+            return await gemini_client._with_retries(send, record=record)
+
+        return await asyncio.gather(*(call(record) for record in records))
+
+    started = time.perf_counter()
+    assert asyncio.run(run()) == ["slow", "slow"]
+    # Ledger latency starts when the call is sent, not when it is queued.
+    assert records[1].started - started >= 0.14
+
+
+def test_vanished_context_cache_is_retried_once_without_it(gemini_client, monkeypatch):
+    _configure(max_retries=0)
+    forgotten = []
+    monkeypatch.setattr(gemini_client.context_cache, "forget", forgotten.append)
+    sent_with = []
+
+    async def send(cached):
+        sent_with.append(cached)
+        if cached:
+            raise _api_error(404, "NOT_FOUND")
+        return "ok"
+
+    record = CallRecord(stage="tests", model="test")
+    result = asyncio.run(
+        gemini_client._with_retries(send, record=record, cached_content="cachedContents/x")
+    )
+
+    assert result == "ok"
+    assert sent_with == ["cachedContents/x", None]
+    assert forgotten == ["cachedContents/x"]
+    assert record.outcome == "success"
+
+
+def test_extractions_are_cached_by_content(gemini_client, monkeypatch):
+    gemini_client.extraction_cache.purge()
+    calls = []
+
+    async def fake_call(parts, data, mime, display_name, media_kwargs, **kwargs):
+        calls.append(display_name)
+        return json.dumps({"rooms": [{"id": "r1", "name": "Kontor", "type": "office"}]})
+
+    monkeypatch.setattr(gemini_client, "_call_model_with_document", fake_call)
+    drawing = io.BytesIO()
+    Image.new("L", (64, 48), 255).save(drawing, format="PNG")
+
+    def extract(name, **options):
+        return asyncio.run(
+            gemini_client._extract_document_rooms(
+                drawing.getvalue(), "image/png", name, FloorPlanOptions(**options)
+            )
+        )
+
+    first = extract("a.png")
+    # Same bytes under another name, and a category the extraction ignores.
+    second = extract("b.png", plan_category="office")
+    # Options that change the extraction prompt miss the cache.
+    extract("c.png", has_area=False, reference_width=2.0)
+
+    assert [room.name for room in second] == [room.name for room in first] == ["Kontor"]
+    assert calls == ["a.png", "c.png"]
+
+
+def test_rejected_file_handle_is_uploaded_again(gemini_client, monkeypatch):
+    sent_uris = []
+
+    async def fake_call_model(contents, **kwargs):
+        file_uri = contents[0].parts[-1].file_data.file_uri
+        sent_uris.append(file_uri)
+        if len(sent_uris) == 1:
+            # The Files API dropped the upload before its expiry time.
+            raise GeminiServiceError("File not found", status_code=404)
+        return "ok"
+
+    monkeypatch.setattr(gemini_client, "_call_model", fake_call_model)
+    drawing = io.BytesIO()
+    Image.new("L", (32, 32), 17).save(drawing, format="PNG")
+
+    result = asyncio.run(
+        gemini_client._call_model_with_document(
+            [], drawing.getvalue(), "image/png", "expired.png", {}, stage="extraction"
+        )
+    )
+
+    assert result == "ok"
+    assert gemini_client.file_refs.backend.upload_count == 2
+    assert sent_uris[0] != sent_uris[1]
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import io
+
+from PIL import Image
+
+from app.services.gemini_files import (
+    EXPIRY_MARGIN_SECONDS,
+    FileReferenceRegistry,
+    LocalFilesBackend,
+)
+
+
+def _png(shade: int = 255) -> bytes:
+    data = io.BytesIO()
+    Image.new("L", (10, 10), shade).save(data, format="PNG")
+    return data.getvalue()
+
+
+def test_each_drawing_is_uploaded_once():
+    backend = LocalFilesBackend()
+    registry = FileReferenceRegistry(backend)
+    data = _png()
+
+    async def resolve_twice():
+        first = await registry.resolve(data, "image/png", "a.png", scope="tests-once")
+        second = await registry.resolve(data, "image/png", "b.png", scope="tests-once")
+        return first, second
+
+    first, second = asyncio.run(resolve_twice())
+
+    assert backend.upload_count == 1
+    assert first == second
+    assert backend.files[first.name] == data
+
+
+def test_handles_are_shared_through_the_database():
+    data = _png(128)
+    asyncio.run(
+        FileReferenceRegistry(LocalFilesBackend()).resolve(
+            data, "image/png", "a.png", scope="tests-shared"
+        )
+    )
+    # Another worker, or this one after a restart.
+    backend = LocalFilesBackend()
+
+    asyncio.run(
+        FileReferenceRegistry(backend).resolve(data, "image/png", "a.png", scope="tests-shared")
+    )
+
+    assert backend.upload_count == 0
+
+
+def test_handles_near_expiry_are_uploaded_again():
+    backend = LocalFilesBackend(ttl_seconds=EXPIRY_MARGIN_SECONDS)
+    registry = FileReferenceRegistry(backend)
+    data = _png(64)
+
+    async def resolve_twice():
+        first = await registry.resolve(data, "image/png", "a.png", scope="tests-expiry")
+        second = await registry.resolve(data, "image/png", "a.png", scope="tests-expiry")
+        return first, second
+
+    first, second = asyncio.run(resolve_twice())
+
+    assert backend.upload_count == 2
+    assert first.name != second.name
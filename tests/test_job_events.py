@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.services.job_events import (
+    END_EVENT,
+    InMemoryJobEventStore,
+    JobEventLog,
+    SQLiteJobEventStore,
+    sse_stream,
+)
+
+
+def _collect(log: JobEventLog, job_id: str, after: int = 0, **kwargs) -> list:
+    async def run():
+        return [item async for item in log.subscribe(job_id, after, **kwargs)]
+
+    return asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+
+def test_subscribe_replays_until_the_end_event():
+    log = JobEventLog(InMemoryJobEventStore(), poll_seconds=0.01)
+    log.publish("job", "status", {"status": "running"})
+    log.publish("job", "status", {"status": "success"})
+    log.close("job")
+
+    events = _collect(log, "job")
+
+    assert [(event_id, event) for event_id, event, _ in events] == [
+        (1, "status"),
+        (2, "status"),
+        (3, END_EVENT),
+    ]
+    assert events[1][2] == {"status": "success"}
+
+
+def test_subscribe_resumes_after_last_event_id():
+    log = JobEventLog(InMemoryJobEventStore(), poll_seconds=0.01)
+    for status in ("pending", "running", "success"):
+        log.publish("job", "status", {"status": status})
+    log.close("job")
+
+    assert [event_id for event_id, _, _ in _collect(log, "job", after=2)] == [3, 4]
+    assert _collect(log, "job", after=4) == []
+
+
+def test_end_event_followed_by_more_events_is_skipped():
+    log = JobEventLog(InMemoryJobEventStore(), poll_seconds=0.01)
+    log.publish("job", "status", {"status": "failed"})
+    log.close("job")
+    # Resumed: the job publishes again and ends a second time.
+    log.publish("job", "status", {"status": "success"})
+    log.close("job")
+
+    events = _collect(log, "job")
+
+    assert [(event_id, event) for event_id, event, _ in events] == [
+        (1, "status"),
+        (3, "status"),
+        (4, END_EVENT),
+    ]
+
+
+def test_subscriber_is_woken_by_publish():
+    log = JobEventLog(InMemoryJobEventStore(), poll_seconds=60)
+
+    async def run():
+        subscriber = asyncio.create_task(
+            asyncio.wait_for(_drain(log.subscribe("job")), timeout=5)
+        )
+        await asyncio.sleep(0.01)
+        log.publish("job", "plan", {"entries": []})
+        log.close("job")
+        return await subscriber
+
+    assert [event for _, event, _ in asyncio.run(run())] == ["plan", END_EVENT]
+
+
+def test_sse_stream_ends_discarded_jobs():
+    log = JobEventLog(InMemoryJobEventStore(), poll_seconds=0.01)
+
+    async def run():
+        return [chunk async for chunk in sse_stream(log, "gone", finished=True)]
+
+    assert asyncio.run(run()) == [f"event: {END_EVENT}\ndata: {{}}\n\n"]
+
+
+def test_other_workers_read_the_shared_table():
+    owner = JobEventLog(SQLiteJobEventStore(), poll_seconds=0.01)
+    reader = JobEventLog(SQLiteJobEventStore(), poll_seconds=0.01)
+    owner.publish("shared-job", "status", {"status": "running"})
+    owner.close("shared-job")
+
+    assert [(event_id, event) for event_id, event, _ in _collect(reader, "shared-job")] == [
+        (1, "status"),
+        (2, END_EVENT),
+    ]
+    owner.discard("shared-job")
+    assert reader.events("shared-job") == []
+
+
+async def _drain(events):
+    return [item async for item in events]
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.job_queue import ABANDONED_ERROR, JobQueue, WorkerPool
+
+pytestmark = pytest.mark.usefixtures("empty_job_queue")
+
+
+def test_expired_lease_is_claimed_again():
+    queue = JobQueue(lease_seconds=0.05)
+    queue.enqueue("crashed", "plan", {"n": 1})
+
+    first = queue.claim("worker-a")
+    assert queue.claim("worker-b") is None
+    time.sleep(0.06)
+    # worker-a died without renewing: the job is recovered by another worker.
+    second = queue.claim("worker-b")
+
+    assert (first.id, first.recovered) == ("crashed", False)
+    assert (second.id, second.attempts, second.recovered) == ("crashed", 2, True)
+    assert not queue.renew("crashed", "worker-a")
+    assert queue.renew("crashed", "worker-b")
+
+
+def test_job_is_abandoned_after_max_attempts():
+    queue = JobQueue(lease_seconds=0.01, max_attempts=1)
+    abandoned = []
+    queue.on_abandoned = lambda job_id, kind: abandoned.append((job_id, kind))
+    queue.enqueue("poison", "batch", {})
+
+    assert queue.claim("worker-a").id == "poison"
+    time.sleep(0.02)
+
+    assert queue.claim("worker-b") is None
+    assert abandoned == [("poison", "batch")]
+    record = queue.get("poison")
+    assert (record["status"], record["error"]) == ("failed", ABANDONED_ERROR)
+
+
+def test_released_job_keeps_its_attempts():
+    queue = JobQueue()
+    queue.enqueue("deploy", "plan", {})
+    queue.claim("worker-a")
+
+    queue.release("deploy", "worker-a")
+
+    assert queue.get("deploy")["status"] == "queued"
+    assert queue.claim("worker-b").attempts == 1
+
+
+def test_plan_jobs_get_a_worker_while_batches_run():
+    queue = JobQueue()
+    batches_done = asyncio.Event()
+    ran = []
+
+    async def run_batch(job):
+        ran.append(job.id)
+        await batches_done.wait()
+
+    async def run_plan(job):
+        ran.append(job.id)
+
+    async def run():
+        pool = WorkerPool(
+            queue,
+            {"batch": run_batch, "plan": run_plan},
+            size=2,
+            kind_limits={"batch": 1},
+        )
+        for job_id in ("batch-1", "batch-2"):
+            queue.enqueue(job_id, "batch", {})
+        queue.enqueue("plan-1", "plan", {})
+        pool.start()
+        while "plan-1" not in ran:
+            await asyncio.sleep(0.01)
+        statuses = {job_id: queue.get(job_id)["status"] for job_id in ran + ["batch-2"]}
+        batches_done.set()
+        await pool.stop()
+        return statuses
+
+    statuses = asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+    assert ran == ["batch-1", "plan-1"]
+    assert statuses == {"batch-1": "running", "plan-1": "done", "batch-2": "queued"}
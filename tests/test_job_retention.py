@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import json
+import time
+
+from app.services.job_events import JobEventLog, SQLiteJobEventStore
+from app.services.job_retention import purge_finished_jobs
+from app.services.job_state import SQLiteJobStateStore
+
+
+def _job(state: SQLiteJobStateStore, events: JobEventLog, job_id: str, status: str) -> None:
+    state.save(job_id, "plan", json.dumps({"id": job_id, "status": status}))
+    events.publish(job_id, "status", {"status": status})
+
+
+def test_purge_drops_only_long_finished_jobs():
+    state = SQLiteJobStateStore()
+    events = JobEventLog(SQLiteJobEventStore())
+    _job(state, events, "purge-done", "success")
+    _job(state, events, "purge-failed", "failed")
+    # A Batch API job can wait for hours without a state update.
+    _job(state, events, "purge-waiting", "running")
+
+    # Not yet old enough.
+    assert purge_finished_jobs(ttl_seconds=60) == 0
+    purged = purge_finished_jobs(ttl_seconds=60, now=time.time() + 120)
+
+    assert purged >= 2
+    assert state.load("purge-done", "plan") is None
+    assert events.events("purge-done") == []
+    assert state.load("purge-waiting", "plan") is not None
+    assert [event for _, event, _ in events.events("purge-waiting")] == ["status"]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+
+from app.services.json_stream import JsonArrayItemParser
+
+DOCUMENT = json.dumps(
+    {
+        "notes": [{"text": "ikke en oppføring"}],
+        "entries": [
+            {"room_name": "Gang {1}", "description": 'Sier "hei" \\\\ ]', "frequency": {"MAN": True}},
+            {"room_name": "WC", "tags": [{"entries": []}]},
+        ],
+        "after": [{"room_name": "ignored"}],
+    },
+    ensure_ascii=False,
+)
+
+
+def _feed(parser: JsonArrayItemParser, chunks: list[str]) -> list[list[dict]]:
+    return [parser.feed(chunk) for chunk in chunks]
+
+
+def test_items_are_emitted_as_soon_as_they_close():
+    parser = JsonArrayItemParser("entries")
+
+    batches = _feed(parser, list(DOCUMENT))
+
+    emitted = [item for batch in batches for item in batch]
+    assert emitted == json.loads(DOCUMENT)["entries"]
+    assert parser.emitted == 2
+    # Each object is handed over on the chunk holding its closing brace.
+    closing = [index for index, batch in enumerate(batches) if batch]
+    assert len(closing) == 2
+
+
+def test_chunk_boundaries_do_not_matter():
+    whole = JsonArrayItemParser("entries").feed(DOCUMENT)
+
+    for size in (3, 7, 64):
+        chunks = [DOCUMENT[start : start + size] for start in range(0, len(DOCUMENT), size)]
+        parser = JsonArrayItemParser("entries")
+        assert [item for batch in _feed(parser, chunks) for item in batch] == whole
+
+
+def test_missing_key_emits_nothing():
+    parser = JsonArrayItemParser("rooms")
+
+    assert parser.feed(DOCUMENT) == []
+    assert parser.emitted == 0
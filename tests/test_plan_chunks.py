@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from app.domain.plan_chunks import chunk_rooms, merge_plans
+from app.models.schemas import CleaningPlan, CleaningPlanEntry, Room
+from app.services import config_store
+
+
+def _rooms(count: int, floors: int = 3, prefix: str = "Rom") -> list[Room]:
+    per_floor = -(-count // floors)
+    return [
+        Room(
+            id=f"r{index}",
+            name=f"{prefix} {index}",
+            type="office",
+            floor=str(index // per_floor + 1),
+            area_m2=10.0 + index,
+        )
+        for index in range(count)
+    ]
+
+
+def _entry(room: dict) -> dict:
+    return {
+        "room_name": room["name"],
+        "area_m2": room["area_m2"],
+        "floor": room["floor"],
+        "description": "Støvsuging og gulvvask",
+        "frequency": {"MAN": True, "ONS": True, "FRE": True},
+    }
+
+
+def test_chunk_rooms_keeps_floors_together():
+    rooms = _rooms(12, floors=3)
+
+    chunks = chunk_rooms(rooms, 8)
+
+    assert [len(chunk) for chunk in chunks] == [8, 4]
+    assert [room.id for chunk in chunks for room in chunk] == [room.id for room in rooms]
+    assert {room.floor for room in chunks[1]} == {"3"}
+
+
+def test_chunk_rooms_splits_floors_larger_than_a_chunk():
+    rooms = _rooms(10, floors=1)
+
+    chunks = chunk_rooms(rooms, 4)
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+
+def test_merge_plans_recomputes_total_area():
+    first = CleaningPlan(
+        entries=[CleaningPlanEntry(**_entry({"name": "A", "area_m2": 10.5, "floor": "1"}))],
+        total_area_m2=999,
+        template_name="Mal",
+    )
+    second = CleaningPlan(
+        entries=[CleaningPlanEntry(**_entry({"name": "B", "area_m2": 4.25, "floor": "2"}))],
+        total_area_m2=0,
+    )
+
+    merged = merge_plans([first, second])
+
+    assert [entry.room_name for entry in merged.entries] == ["A", "B"]
+    assert merged.total_area_m2 == 14.75
+    assert merged.template_name == "Mal"
+
+
+def test_chunked_generation_matches_single_call(gemini_client, monkeypatch):
+    calls: list[int] = []
+
+    async def fake_call_model(contents, **kwargs):
+        payload = next(
+            json.loads(part.text)
+            for part in contents[0].parts
+            if part.text and part.text.startswith('{"rooms"')
+        )
+        calls.append(len(payload["rooms"]))
+        entries = [_entry(room) for room in payload["rooms"]]
+        return json.dumps(
+            {
+                "entries": entries,
+                "total_area_m2": sum(room["area_m2"] for room in payload["rooms"]),
+                "template_name": "Cleansync Standard",
+            }
+        )
+
+    monkeypatch.setattr(gemini_client, "_call_model", fake_call_model)
+    rooms = _rooms(11, prefix="Chunket rom")
+
+    def generate(chunk_size: int) -> CleaningPlan:
+        config_store.set_gemini_config(
+            {"plan_chunk_size": chunk_size, "local_plan_rules": False}
+        )
+        return asyncio.run(gemini_client.generate_plan(rooms))
+
+    single = generate(100)
+    assert calls == [11]
+    calls.clear()
+    chunked = generate(4)
+    assert len(calls) > 1 and sum(calls) == 11
+
+    assert chunked.model_dump() == single.model_dump()
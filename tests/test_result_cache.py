@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import time
+
+from app.services.result_cache import ResultCache
+
+
+def test_hits_and_misses_are_counted():
+    cache = ResultCache("tests-counters")
+
+    assert cache.get("a") is None
+    cache.put("a", "value")
+    assert cache.get("a") == "value"
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 1, 0.5)
+
+
+def test_expired_entries_are_misses():
+    cache = ResultCache("tests-ttl", ttl_seconds=0.01)
+    cache.put("a", "value")
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = ResultCache("tests-lru", max_entries=2)
+    cache.put("a", "1")
+    time.sleep(0.001)
+    cache.put("b", "2")
+    time.sleep(0.001)
+    cache.get("a")
+    time.sleep(0.001)
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+
+
+def test_byte_bound_keeps_the_newest_entries():
+    cache = ResultCache("tests-bytes", max_bytes=10)
+    cache.put("a", "x" * 6)
+    time.sleep(0.001)
+    cache.put("b", "y" * 6)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 6
+    assert cache.purge() == 1
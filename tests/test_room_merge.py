@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from app.domain.room_merge import merge_rooms, merge_tile_rooms
+from app.models.schemas import Room, TiledRoom
+
+
+def _room(room_id: str, floor: Optional[str] = None, area: Optional[float] = None) -> Room:
+    return Room(id=room_id, name="WC", type="wc", floor=floor, area_m2=area)
+
+
+def test_rooms_without_floor_or_area_are_kept_apart():
+    merged = merge_rooms([[_room("a")], [_room("b")]])
+
+    assert [room.id for room in merged] == ["a", "b"]
+
+
+def test_stacked_rooms_on_unlabelled_pages_are_kept_apart():
+    # One page per floor, no floor labels: same name and area, different rooms.
+    merged = merge_rooms([[_room("wc-1", area=4.0)], [_room("wc-2", area=4.0)]])
+
+    assert len(merged) == 2
+
+
+def test_same_id_merges_without_a_floor():
+    merged = merge_rooms([[_room("wc-1")], [_room("wc-1", area=4.0)]])
+
+    assert len(merged) == 1
+    assert merged[0].area_m2 == 4.0
+
+
+def test_same_known_floor_merges_and_fills_missing_area():
+    merged = merge_rooms([[_room("a", floor="1")], [_room("b", floor="1", area=6.0)]])
+
+    assert len(merged) == 1
+    assert merged[0].id == "a"
+    assert merged[0].area_m2 == 6.0
+
+
+def test_different_areas_on_the_same_floor_are_kept_apart():
+    merged = merge_rooms([[_room("a", floor="1", area=6.0)], [_room("a", floor="1", area=9.0)]])
+
+    assert [room.id for room in merged] == ["a", "a-2"]
+
+
+def test_same_named_rooms_in_one_source_never_merge():
+    merged = merge_rooms([[_room("a", floor="1"), _room("b", floor="1")]])
+
+    assert len(merged) == 2
+
+
+def _office(room_id: str, bbox: list[float]) -> TiledRoom:
+    return TiledRoom(id=room_id, name="Kontor", type="office", bbox=bbox)
+
+
+def test_adjacent_tile_rooms_are_not_merged():
+    tile_a = [_office("101", [0, 0, 1000, 800]), _office("102", [1000, 0, 2000, 800])]
+    tile_b = [_office("102", [1005, 0, 2000, 800]), _office("103", [2000, 0, 3000, 800])]
+
+    merged = merge_tile_rooms([tile_a, tile_b])
+
+    assert [(room.id, room.bbox) for room in merged] == [
+        ("101", [0, 0, 1000, 800]),
+        ("102", [1000, 0, 2000, 800]),
+        ("103", [2000, 0, 3000, 800]),
+    ]
+
+
+def test_room_cut_by_a_tile_edge_is_joined():
+    # Tile A ends at x=3072, tile B starts at x=2688: both see the band.
+    merged = merge_tile_rooms(
+        [[_office("110", [2500, 0, 3072, 600])], [_office("110", [2688, 0, 3400, 600])]]
+    )
+
+    assert [(room.id, room.bbox) for room in merged] == [("110", [2500, 0, 3400, 600])]
+
+
+def test_best_overlapping_tile_room_wins():
+    tile_a = [_office("", [0, 0, 1000, 800]), _office("", [700, 0, 1700, 800])]
+    tile_b = [_office("", [600, 0, 1700, 800])]
+
+    merged = merge_tile_rooms([tile_a, tile_b])
+
+    assert [room.bbox for room in merged] == [[0, 0, 1000, 800], [600, 0, 1700, 800]]